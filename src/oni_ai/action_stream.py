@@ -0,0 +1,130 @@
+import json
+import re
+
+
+# Section headers ``codex exec`` prints around the transcript: only text under
+# ``codex`` is the model's own message; the echoed prompt (``user``), tool
+# output (``exec``, ``tool``), reasoning and patches must never yield actions.
+SECTION_HEADER_PATTERN = re.compile(
+    r"^(?:\[[^\]]*\]\s*)?(codex|user|thinking|exec|tool|apply_patch|file update|turn diff|plan update|tokens used)(?:[\s:].*)?$",
+    re.IGNORECASE,
+)
+AGENT_SECTION = "codex"
+# Header lines are short; longer lines are not worth remembering for the check.
+MAX_HEADER_CHARS = 200
+
+
+class ActionStreamParser:
+    """Incrementally pick complete objects out of a plan's top-level ``"actions": [...]`` array.
+
+    Text is fed in arbitrary chunks (typically stdout lines). Only JSON
+    documents that start with ``{`` at the beginning of a line are scanned,
+    and only the ``actions`` key of their outermost object counts, so prose,
+    nested arrays and JSON quoted inside other text are ignored. A ``{`` in
+    column 0 always starts a new document, dropping any unfinished one. Every
+    array element object is returned as soon as its closing brace arrives,
+    long before the surrounding plan JSON is complete. Elements that do not
+    parse are skipped, and identical actions seen twice (the model echoing its
+    plan) are only returned once.
+    """
+
+    def __init__(self) -> None:
+        self._muted = False
+        self._line: list[str] = []
+        self._line_blank = True
+        self._seen: set[str] = set()
+        self._reset_document()
+
+    def _reset_document(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: list[str] = []
+        self._last_key: str | None = None
+        self._pending_key: str | None = None
+        self._in_actions = False
+        self._element: list[str] = []
+
+    def feed(self, text: str) -> list[dict]:
+        completed: list[dict] = []
+        for char in text:
+            if char == "\n":
+                self._end_line()
+                continue
+            column_zero = not self._line
+            if len(self._line) < MAX_HEADER_CHARS:
+                self._line.append(char)
+            starts_line = self._line_blank and not char.isspace()
+            if not char.isspace():
+                self._line_blank = False
+
+            if char == "{" and not self._muted and (starts_line if self._depth == 0 else column_zero):
+                self._reset_document()
+            elif self._depth == 0:
+                continue
+            self._scan(char, completed)
+        return completed
+
+    def _end_line(self) -> None:
+        match = SECTION_HEADER_PATTERN.match("".join(self._line).rstrip())
+        if match is not None and not self._in_string:
+            self._muted = match.group(1).lower() != AGENT_SECTION
+            self._reset_document()
+        self._line = []
+        self._line_blank = True
+
+    def _scan(self, char: str, completed: list[dict]) -> None:
+        if self._element:
+            self._element.append(char)
+
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_key = "".join(self._string)
+            elif self._depth == 1:
+                self._string.append(char)
+            return
+
+        if char.isspace():
+            return
+        pending_key, self._pending_key = self._pending_key, None
+        if char == '"':
+            self._in_string = True
+            self._string = []
+        elif char == ":" and self._depth == 1:
+            self._pending_key = self._last_key
+        elif char in "{[":
+            if self._depth == 1 and char == "[" and pending_key == "actions":
+                self._in_actions = True
+            elif self._in_actions and self._depth == 2 and char == "{":
+                self._element = [char]
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            if self._in_actions and self._depth == 2 and self._element:
+                self._emit("".join(self._element), completed)
+                self._element = []
+            elif self._depth == 1:
+                self._in_actions = False
+            elif self._depth <= 0:
+                self._reset_document()
+
+    def _emit(self, raw: str, completed: list[dict]) -> None:
+        try:
+            action = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(action, dict):
+            return
+        if not str(action.get("type", "")).strip() and str(action.get("action", "")).strip():
+            action["type"] = str(action["action"]).strip()
+        fingerprint = json.dumps(action, sort_keys=True, ensure_ascii=False)
+        if fingerprint in self._seen:
+            return
+        self._seen.add(fingerprint)
+        completed.append(action)
@@ -1,28 +1,96 @@
 #!/usr/bin/env python3
 import json
 import logging
+import math
 import os
 import re
 import shlex
 import shutil
-import subprocess
+import tempfile
 import threading
 import time
 import uuid
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import urlsplit
-
-
+from urllib.parse import parse_qs, urlsplit
+
+from oni_ai import metrics
+from oni_ai.action_stream import ActionStreamParser
+from oni_ai.asset_staging import ASSET_STAGING_MODES, AssetCache, link_asset
+from oni_ai.autopilot import Autopilot, AutopilotPolicy
+from oni_ai.backends import (
+    DECISION_BACKENDS,
+    DecisionBackend,
+    DecisionRequest,
+    ExecBackend,
+    FakeBackend,
+    close_worker_backends,
+    get_worker_backend,
+    load_fake_response,
+)
+from oni_ai.cells import CellInspector, RecordedCellInspector, clear_cell_caches, get_cell_cache
+from oni_ai.client import OniApiClient, close_api_clients, get_api_client
+from oni_ai.decision_cache import DEFAULT_EXCLUDE_FIELDS, DecisionCache, fingerprint_payload, parse_field_list
+from oni_ai.live_state import (
+    DEFAULT_LIVE_STATE_ENDPOINTS,
+    LIVE_STATE_FILE_NAME,
+    LiveStatePrefetch,
+    fetched_endpoints,
+    parse_endpoint_specs,
+    write_live_state,
+)
+from oni_ai.plan_optimizer import optimize_plan
+from oni_ai.plan_validator import VALIDATION_MODES, PlanValidator, load_action_validators, repair_points
+from oni_ai.retention import RetentionPolicy, RetentionService
+from oni_ai.state_diff import STATE_DIFF_FILE_NAME, diff_states, write_state_diff
+from oni_ai.state_digest import STATE_DIGEST_FILE_NAME, build_state_digest, encoded_size, write_state_digest
+from oni_ai.screenshot_wait import SCREENSHOT_WATCHERS, wait_for_file_ready
+
+
+# Written to ``<request_dir>/logs`` next to the codex output so runs can be replayed offline.
+REQUEST_PAYLOAD_FILE_NAME = "request_payload.json"
+BRIDGE_RESPONSE_FILE_NAME = "bridge_response.json"
+VALIDATION_CELLS_FILE_NAME = "validation_cells.json"
 LOGGER = logging.getLogger("oni_ai")
 SERVER_STARTED_AT = time.monotonic()
 RUNTIME_STATE_LOCK = threading.Lock()
 RUNTIME_STATE: dict[str, object] = {
     "last_request": None,
     "last_response": None,
+    # session key -> (request_id, state snapshot) of the previous analyze call, oldest first.
+    "sessions": OrderedDict(),
 }
 JOB_STATE_LOCK = threading.Lock()
-JOB_STATE: dict[str, dict[str, object]] = {}
+JOB_STATE: "OrderedDict[str, dict[str, object]]" = OrderedDict()
+JOB_STORE_STATS = {"evicted": 0, "expired": 0, "spilled": 0, "spill_loads": 0}
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+JOB_TERMINAL_STATUSES = {"completed", "failed"}
+JOB_EVENT_HISTORY_LIMIT = 512
+JOB_CONTEXT = threading.local()
+JOB_QUEUE_POLICIES = {"reject", "coalesce"}
+JOB_SCHEDULER_LOCK = threading.Lock()
+JOB_SCHEDULER: "JobScheduler | None" = None
+DECISION_CACHE_LOCK = threading.Lock()
+DECISION_CACHE: DecisionCache | None = None
+ASSET_CACHE_LOCK = threading.Lock()
+ASSET_CACHE: AssetCache | None = None
+RETENTION_SERVICE: RetentionService | None = None
+AUTOPILOT: Autopilot | None = None
+
+
+def read_int_env(var_name: str, default: int, minimum: int = 0) -> int:
+    raw_value = (os.getenv(var_name) or "").strip()
+    if not raw_value:
+        return default
+
+    try:
+        value = int(raw_value)
+    except ValueError:
+        LOGGER.warning("invalid %s=%s; using %s", var_name, raw_value, default)
+        return default
+
+    return max(minimum, value)
 
 
 def is_truthy_env(var_name: str, default: bool) -> bool:
@@ -97,9 +165,24 @@ def reset_runtime_state_for_tests() -> None:
     with RUNTIME_STATE_LOCK:
         RUNTIME_STATE["last_request"] = None
         RUNTIME_STATE["last_response"] = None
+        RUNTIME_STATE["sessions"] = OrderedDict()
 
     with JOB_STATE_LOCK:
         JOB_STATE.clear()
+        JOB_EVENTS.clear()
+        for key in JOB_STORE_STATS:
+            JOB_STORE_STATS[key] = 0
+
+    reset_job_scheduler()
+
+    global DECISION_CACHE
+    with DECISION_CACHE_LOCK:
+        DECISION_CACHE = None
+
+    close_worker_backends()
+    close_api_clients()
+    clear_cell_caches()
+    metrics.REGISTRY.reset()
 
 
 def create_job(payload: dict, trace_id: str) -> dict[str, object]:
@@ -114,20 +197,244 @@ def create_job(payload: dict, trace_id: str) -> dict[str, object]:
         "request_dir": request_dir,
         "status": "queued",
         "progress": 0,
+        "stage": "queued",
         "created_at": now,
         "started_at": None,
         "finished_at": None,
         "response": None,
         "summary": None,
+        "validation": None,
+        "streamed_actions": [],
         "error": None,
     }
 
     with JOB_STATE_LOCK:
         JOB_STATE[job_id] = job
+        JOB_EVENTS[job_id] = JobEventLog()
+        JOB_EVENTS[job_id].append("status", {"status": "queued", "progress": 0, "stage": "queued"})
 
+    prune_job_state()
     return job
 
 
+def get_request_root() -> Path:
+    default_root = os.path.join(tempfile.gettempdir(), "oni_ai_assistant", "requests")
+    return Path(os.getenv("ONI_AI_REQUEST_ROOT", default_root).strip() or default_root)
+
+
+def get_job_spill_dir() -> Path | None:
+    if not is_truthy_env("ONI_AI_JOB_SPILL", False):
+        return None
+    return get_request_root() / ".job_index"
+
+
+def prune_job_state(now: float | None = None) -> None:
+    """Drop finished jobs past ``ONI_AI_JOB_TTL_SECONDS`` or beyond ``ONI_AI_JOB_MAX_ENTRIES``.
+
+    Queued and running jobs are never evicted. Evicted jobs are written to the
+    spill index when ``ONI_AI_JOB_SPILL`` is enabled, so they stay pollable.
+    """
+    now = time.time() if now is None else now
+    ttl_seconds = read_int_env("ONI_AI_JOB_TTL_SECONDS", 3600)
+    max_entries = read_int_env("ONI_AI_JOB_MAX_ENTRIES", 256, minimum=1)
+
+    evicted: list[dict[str, object]] = []
+    with JOB_STATE_LOCK:
+        finished_ids = [
+            job_id for job_id, job in JOB_STATE.items() if job.get("status") in JOB_TERMINAL_STATUSES
+        ]
+
+        if ttl_seconds > 0:
+            for job_id in finished_ids:
+                finished_at = JOB_STATE[job_id].get("finished_at")
+                if isinstance(finished_at, (int, float)) and now - finished_at > ttl_seconds:
+                    evicted.append(JOB_STATE.pop(job_id))
+                    JOB_EVENTS.pop(job_id, None)
+                    JOB_STORE_STATS["expired"] += 1
+
+        # JOB_STATE is kept in least-recently-used order by get_job_state.
+        for job_id in finished_ids:
+            if len(JOB_STATE) <= max_entries:
+                break
+            if job_id in JOB_STATE:
+                evicted.append(JOB_STATE.pop(job_id))
+                JOB_EVENTS.pop(job_id, None)
+                JOB_STORE_STATS["evicted"] += 1
+
+    spill_dir = get_job_spill_dir()
+    if spill_dir is None or not evicted:
+        return
+
+    try:
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        for job in evicted:
+            spill_path = spill_dir / f"{job['job_id']}.json"
+            spill_path.write_text(json.dumps(job, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        LOGGER.exception("failed spilling evicted jobs to %s", spill_dir)
+        return
+
+    with JOB_STATE_LOCK:
+        JOB_STORE_STATS["spilled"] += len(evicted)
+
+
+def active_request_dirs() -> set[Path]:
+    with JOB_STATE_LOCK:
+        request_dirs = [
+            str(job.get("request_dir") or "")
+            for job in JOB_STATE.values()
+            if job.get("status") not in JOB_TERMINAL_STATUSES
+        ]
+    return {Path(request_dir).resolve() for request_dir in request_dirs if request_dir}
+
+
+def start_retention_service() -> RetentionService | None:
+    global RETENTION_SERVICE
+    # Opt-in: the sweep deletes request dirs, which are also the only record of past runs.
+    if not is_truthy_env("ONI_AI_RETENTION", False):
+        return None
+
+    policy = RetentionPolicy(
+        max_age_seconds=read_int_env("ONI_AI_RETENTION_MAX_AGE_SECONDS", RetentionPolicy.max_age_seconds),
+        max_total_bytes=read_int_env("ONI_AI_RETENTION_MAX_TOTAL_MB", 1024) * 1024 * 1024,
+        max_count=read_int_env("ONI_AI_RETENTION_MAX_COUNT", RetentionPolicy.max_count),
+        archive_after_seconds=read_int_env("ONI_AI_RETENTION_ARCHIVE_AFTER_SECONDS", 0),
+        interval_seconds=read_int_env("ONI_AI_RETENTION_INTERVAL_SECONDS", RetentionPolicy.interval_seconds, minimum=1),
+    )
+    service = RetentionService(
+        get_request_root(),
+        policy,
+        is_protected=lambda path: path.resolve() in active_request_dirs(),
+    )
+    service.start()
+    RETENTION_SERVICE = service
+    LOGGER.warning("request-dir retention enabled, old request dirs under %s will be deleted: %s", service.root, service.stats())
+    return service
+
+
+def discard_empty_request_dir(request_dir: str | Path) -> None:
+    """Remove a request dir no job will run in; anything already written to it is kept."""
+    if not str(request_dir):
+        return
+    try:
+        os.rmdir(request_dir)
+    except OSError:
+        return
+    LOGGER.info("removed unused request dir %s", request_dir)
+
+
+def submit_autopilot_job(snapshot: dict, reasons: list[str]) -> str | None:
+    request_id = f"autopilot_{uuid.uuid4().hex[:12]}"
+    request_dir = get_request_root() / request_id
+    request_dir.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "request_id": request_id,
+        "request_dir": str(request_dir),
+        "api_base_url": snapshot.get("api_base_url"),
+        "session_id": "autopilot",
+        "requested_at_utc": snapshot.get("fetched_at_utc"),
+        "autopilot": {"reasons": reasons},
+    }
+    # The dir must exist before a worker can pick the job up, so it is removed again when the job does not get it.
+    job, admission = submit_job(payload, request_id)
+    if admission in {"rejected", "deduplicated"}:
+        discard_empty_request_dir(request_dir)
+    LOGGER.info("request=%s autopilot submitted admission=%s reasons=%s", request_id, admission, reasons)
+    return str(job["job_id"]) if job is not None else None
+
+
+def get_bridge_api_client(api_base_url: str) -> OniApiClient:
+    return get_api_client(api_base_url, validate_responses=is_truthy_env("ONI_AI_API_VALIDATE_RESPONSES", False))
+
+
+def autopilot_job_busy(job_id: str) -> bool:
+    job = get_job_state(job_id)
+    return job is not None and job.get("status") not in JOB_TERMINAL_STATUSES
+
+
+def start_autopilot() -> Autopilot | None:
+    global AUTOPILOT
+    if not is_truthy_env("ONI_AI_AUTOPILOT", False):
+        return None
+
+    api_base_url = (os.getenv("ONI_AI_AUTOPILOT_API_BASE_URL") or "http://127.0.0.1:8766").strip()
+    min_interval = read_int_env("ONI_AI_AUTOPILOT_MIN_INTERVAL_SECONDS", 10, minimum=1)
+    policy = AutopilotPolicy(
+        min_interval_seconds=min_interval,
+        max_interval_seconds=max(min_interval, read_int_env("ONI_AI_AUTOPILOT_MAX_INTERVAL_SECONDS", 120, minimum=1)),
+        cooldown_seconds=read_int_env("ONI_AI_AUTOPILOT_COOLDOWN_SECONDS", 30),
+        stress_threshold=read_int_env("ONI_AI_AUTOPILOT_STRESS_THRESHOLD", 60),
+        breath_threshold=read_int_env("ONI_AI_AUTOPILOT_BREATH_THRESHOLD", 50),
+    )
+    try:
+        client = get_bridge_api_client(api_base_url)
+    except ValueError:
+        LOGGER.error("autopilot disabled: invalid ONI_AI_AUTOPILOT_API_BASE_URL=%s", api_base_url)
+        return None
+    autopilot = Autopilot(client, submit_autopilot_job, autopilot_job_busy, policy)
+    autopilot.start()
+    AUTOPILOT = autopilot
+    LOGGER.info("autopilot started %s", autopilot.stats())
+    return autopilot
+
+
+def load_spilled_job(job_id: str) -> dict[str, object] | None:
+    spill_dir = get_job_spill_dir()
+    if spill_dir is None or not JOB_ID_PATTERN.match(job_id):
+        return None
+
+    spill_path = spill_dir / f"{job_id}.json"
+    try:
+        job = json.loads(spill_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError):
+        LOGGER.exception("failed loading spilled job=%s path=%s", job_id, spill_path)
+        return None
+
+    with JOB_STATE_LOCK:
+        JOB_STORE_STATS["spill_loads"] += 1
+    return job if isinstance(job, dict) else None
+
+
+def get_job_store_stats() -> dict[str, object]:
+    spill_dir = get_job_spill_dir()
+    with JOB_STATE_LOCK:
+        active = sum(1 for job in JOB_STATE.values() if job.get("status") not in JOB_TERMINAL_STATUSES)
+        return {
+            "size": len(JOB_STATE),
+            "active": active,
+            "max_entries": read_int_env("ONI_AI_JOB_MAX_ENTRIES", 256, minimum=1),
+            "ttl_seconds": read_int_env("ONI_AI_JOB_TTL_SECONDS", 3600),
+            "spill_dir": str(spill_dir) if spill_dir is not None else None,
+            **JOB_STORE_STATS,
+        }
+
+
+class JobEventLog:
+    """Bounded, sequence-numbered event history for one job.
+
+    All access happens under ``JOB_STATE_LOCK``; ``condition`` shares that lock
+    so long-poll and SSE readers wake up as soon as the job changes.
+    """
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition(JOB_STATE_LOCK)
+        self.events: deque[dict[str, object]] = deque(maxlen=JOB_EVENT_HISTORY_LIMIT)
+        self.next_seq = 1
+
+    def append(self, event_type: str, data: dict[str, object]) -> None:
+        self.events.append({"seq": self.next_seq, "event": event_type, "data": data})
+        self.next_seq += 1
+        self.condition.notify_all()
+
+    def since(self, seq: int) -> list[dict[str, object]]:
+        return [event for event in self.events if int(event["seq"]) > seq]
+
+
+JOB_EVENTS: dict[str, JobEventLog] = {}
+
+
 def set_job_state(job_id: str, **updates: object) -> None:
     with JOB_STATE_LOCK:
         job = JOB_STATE.get(job_id)
@@ -135,13 +442,345 @@ def set_job_state(job_id: str, **updates: object) -> None:
             return
         job.update(updates)
 
+        events = JOB_EVENTS.get(job_id)
+        if events is not None and ("status" in updates or "progress" in updates or "stage" in updates):
+            events.append(
+                "status",
+                {"status": job.get("status"), "progress": job.get("progress"), "stage": job.get("stage")},
+            )
 
-def get_job_state(job_id: str) -> dict[str, object] | None:
+
+def current_job_id() -> str | None:
+    return getattr(JOB_CONTEXT, "job_id", None)
+
+
+def report_job_progress(progress: int, stage: str) -> None:
+    job_id = current_job_id()
+    if job_id is not None:
+        set_job_state(job_id, progress=progress, stage=stage)
+
+
+def append_job_output(job_id: str, stream: str, line: str) -> None:
+    with JOB_STATE_LOCK:
+        events = JOB_EVENTS.get(job_id)
+        if events is not None:
+            events.append(stream, {"line": line})
+
+
+def publish_streamed_action(job_id: str, action: dict) -> int | None:
+    """Expose one action parsed from live backend output before the final plan exists."""
     with JOB_STATE_LOCK:
         job = JOB_STATE.get(job_id)
         if job is None:
             return None
-        return dict(job)
+        # Replace rather than append so snapshots handed out earlier never change underneath readers.
+        streamed = [*(job.get("streamed_actions") or []), action]
+        job["streamed_actions"] = streamed
+        events = JOB_EVENTS.get(job_id)
+        if events is not None:
+            # Cell checks only run on the final plan; say so on every early action.
+            events.append("action", {"index": len(streamed) - 1, "action": action, "unvalidated": True})
+        return len(streamed) - 1
+
+
+def wait_for_job(job_id: str, timeout_seconds: float) -> dict[str, object] | None:
+    """Block until the job finishes or ``timeout_seconds`` pass, then return its state."""
+    with JOB_STATE_LOCK:
+        events = JOB_EVENTS.get(job_id)
+        if events is not None and timeout_seconds > 0:
+            events.condition.wait_for(
+                lambda: JOB_STATE.get(job_id, {}).get("status") in JOB_TERMINAL_STATUSES,
+                timeout=timeout_seconds,
+            )
+
+    return get_job_state(job_id)
+
+
+def wait_for_job_events(
+    job_id: str,
+    after_seq: int,
+    timeout_seconds: float,
+) -> tuple[list[dict[str, object]], bool] | None:
+    """Return ``(events newer than after_seq, job_finished)`` waiting up to ``timeout_seconds``."""
+    with JOB_STATE_LOCK:
+        events = JOB_EVENTS.get(job_id)
+        if events is None:
+            return None
+
+        def has_news() -> bool:
+            finished = JOB_STATE.get(job_id, {}).get("status") in JOB_TERMINAL_STATUSES
+            return finished or events.next_seq - 1 > after_seq
+
+        events.condition.wait_for(has_news, timeout=timeout_seconds)
+        finished = JOB_STATE.get(job_id, {}).get("status") in JOB_TERMINAL_STATUSES
+        return events.since(after_seq), finished
+
+
+def get_job_state(job_id: str) -> dict[str, object] | None:
+    with JOB_STATE_LOCK:
+        job = JOB_STATE.get(job_id)
+        if job is not None:
+            JOB_STATE.move_to_end(job_id)
+            snapshot = dict(job)
+
+    if job is None:
+        spilled = load_spilled_job(job_id)
+        if spilled is None:
+            return None
+        spilled["queue_position"] = None
+        return spilled
+
+    scheduler = JOB_SCHEDULER
+    if snapshot.get("status") == "queued" and scheduler is not None:
+        snapshot["queue_position"] = scheduler.queue_position(job_id)
+    else:
+        snapshot["queue_position"] = None
+    return snapshot
+
+
+def job_dedup_keys(payload: dict) -> list[str]:
+    keys = []
+    request_id = str(payload.get("request_id", "")).strip()
+    request_dir = str(payload.get("request_dir", "")).strip()
+    if request_id or request_dir:
+        keys.append(f"request:{request_id}:{request_dir}")
+
+    context = payload.get("context")
+    if isinstance(context, dict) and context.get("cycle") is not None:
+        keys.append(f"state:{context.get('cycle')}:{fingerprint_payload(payload)}")
+
+    return keys
+
+
+class JobScheduler:
+    """Fixed-size worker pool fed by a bounded FIFO admission queue.
+
+    When the queue is full, the ``reject`` policy refuses new jobs while
+    ``coalesce`` folds the new payload into the newest queued job, so the
+    freshest colony snapshot is analyzed without growing the backlog.
+    Payloads matching a queued or running job (same request or same colony
+    snapshot) attach to that job instead of starting another codex run.
+    """
+
+    def __init__(self, worker_count: int, queue_size: int, policy: str, dedup: bool = True) -> None:
+        self.worker_count = max(1, worker_count)
+        self.queue_size = max(0, queue_size)
+        self.policy = policy if policy in JOB_QUEUE_POLICIES else "reject"
+        self.dedup = dedup
+        self._condition = threading.Condition()
+        self._pending: deque[str] = deque()
+        self._payloads: dict[str, dict] = {}
+        self._inflight_keys: dict[str, str] = {}
+        self._job_keys: dict[str, list[str]] = {}
+        self._workers: list[threading.Thread] = []
+        self._running = 0
+        self._closed = False
+        self._accepted = 0
+        self._rejected = 0
+        self._coalesced = 0
+        self._dedup_hits = 0
+
+    def submit(self, payload: dict, trace_id: str) -> tuple[dict[str, object] | None, str]:
+        """Admit ``payload`` and return ``(job, admission)``.
+
+        ``admission`` is one of ``queued``, ``deduplicated``, ``coalesced`` or
+        ``rejected``; ``job`` is None only when rejected.
+        """
+        keys = job_dedup_keys(payload) if self.dedup else []
+        with self._condition:
+            if self._closed:
+                return None, "rejected"
+
+            for key in keys:
+                job_id = self._inflight_keys.get(key)
+                job = self._attach_duplicate(job_id) if job_id is not None else None
+                if job is not None:
+                    self._dedup_hits += 1
+                    return job, "deduplicated"
+
+            self._ensure_workers()
+            idle_workers = self.worker_count - self._running - len(self._pending)
+            if len(self._pending) < self.queue_size or idle_workers > 0:
+                job = create_job(payload, trace_id)
+                job_id = str(job["job_id"])
+                self._pending.append(job_id)
+                self._payloads[job_id] = payload
+                self._track_keys(job_id, keys)
+                self._accepted += 1
+                self._condition.notify()
+                return job, "queued"
+
+            if self.policy == "coalesce" and self._pending:
+                job_id = self._pending[-1]
+                superseded_dir = str(self._payloads[job_id].get("request_dir", "")).strip()
+                self._payloads[job_id] = payload
+                self._track_keys(job_id, keys)
+                self._coalesced += 1
+                request_tag = str(payload.get("request_id", "")).strip() or trace_id
+                with JOB_STATE_LOCK:
+                    job = JOB_STATE.get(job_id)
+                    if job is not None:
+                        job["request_id"] = request_tag
+                        job["request_dir"] = str(payload.get("request_dir", "")).strip()
+                        job["coalesced_count"] = int(job.get("coalesced_count") or 0) + 1
+                        job = dict(job)
+                if job is not None:
+                    if superseded_dir != job["request_dir"]:
+                        discard_empty_request_dir(superseded_dir)
+                    return job, "coalesced"
+
+            self._rejected += 1
+            return None, "rejected"
+
+    def queue_position(self, job_id: str) -> int | None:
+        with self._condition:
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return None
+
+    def stats(self) -> dict[str, object]:
+        with self._condition:
+            return {
+                "workers": self.worker_count,
+                "queue_size": self.queue_size,
+                "policy": self.policy,
+                "running": self._running,
+                "queued": len(self._pending),
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "coalesced": self._coalesced,
+                "dedup_enabled": self.dedup,
+                "dedup_hits": self._dedup_hits,
+            }
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._payloads.clear()
+            self._inflight_keys.clear()
+            self._job_keys.clear()
+            self._condition.notify_all()
+
+    def _attach_duplicate(self, job_id: str) -> dict[str, object] | None:
+        with JOB_STATE_LOCK:
+            job = JOB_STATE.get(job_id)
+            if job is None or job.get("status") not in {"queued", "running"}:
+                return None
+            job["dedup_hits"] = int(job.get("dedup_hits") or 0) + 1
+            return dict(job)
+
+    def _track_keys(self, job_id: str, keys: list[str]) -> None:
+        self._release_keys(job_id)
+        for key in keys:
+            self._inflight_keys[key] = job_id
+        self._job_keys[job_id] = keys
+
+    def _release_keys(self, job_id: str) -> None:
+        for key in self._job_keys.pop(job_id, []):
+            if self._inflight_keys.get(key) == job_id:
+                del self._inflight_keys[key]
+
+    def _ensure_workers(self) -> None:
+        while len(self._workers) < self.worker_count:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"oni-ai-job-worker-{len(self._workers) + 1}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                job_id = self._pending.popleft()
+                payload = self._payloads.pop(job_id)
+                self._running += 1
+
+            try:
+                run_job(job_id, payload)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._release_keys(job_id)
+
+
+def reset_job_scheduler() -> None:
+    """Shut the shared scheduler down so the next job builds one from the current ``ONI_AI_JOB_*`` env."""
+    global JOB_SCHEDULER
+    with JOB_SCHEDULER_LOCK:
+        scheduler = JOB_SCHEDULER
+        JOB_SCHEDULER = None
+
+    if scheduler is not None:
+        scheduler.shutdown()
+
+
+def get_job_scheduler() -> JobScheduler:
+    global JOB_SCHEDULER
+    with JOB_SCHEDULER_LOCK:
+        if JOB_SCHEDULER is None:
+            policy = (os.getenv("ONI_AI_JOB_QUEUE_POLICY", "reject") or "reject").strip().lower()
+            if policy not in JOB_QUEUE_POLICIES:
+                LOGGER.warning("invalid ONI_AI_JOB_QUEUE_POLICY=%s; using reject", policy)
+                policy = "reject"
+            JOB_SCHEDULER = JobScheduler(
+                worker_count=read_int_env("ONI_AI_JOB_WORKERS", 2, minimum=1),
+                queue_size=read_int_env("ONI_AI_JOB_QUEUE_SIZE", 8),
+                policy=policy,
+                dedup=is_truthy_env("ONI_AI_JOB_DEDUP", True),
+            )
+        return JOB_SCHEDULER
+
+
+def submit_job(payload: dict, trace_id: str) -> tuple[dict[str, object] | None, str]:
+    return get_job_scheduler().submit(payload, trace_id)
+
+
+def get_decision_cache() -> DecisionCache | None:
+    global DECISION_CACHE
+    if not is_truthy_env("ONI_AI_DECISION_CACHE", False):
+        return None
+
+    with DECISION_CACHE_LOCK:
+        if DECISION_CACHE is None:
+            persist_dir = None
+            if is_truthy_env("ONI_AI_DECISION_CACHE_PERSIST", False):
+                persist_dir = get_request_root() / ".decision_cache"
+            DECISION_CACHE = DecisionCache(
+                max_entries=read_int_env("ONI_AI_DECISION_CACHE_MAX_ENTRIES", 128, minimum=1),
+                ttl_seconds=read_int_env("ONI_AI_DECISION_CACHE_TTL_SECONDS", 600),
+                persist_dir=persist_dir,
+            )
+        return DECISION_CACHE
+
+
+def decision_cache_key(payload: dict) -> str:
+    include = parse_field_list(os.getenv("ONI_AI_DECISION_CACHE_INCLUDE"))
+    exclude = parse_field_list(os.getenv("ONI_AI_DECISION_CACHE_EXCLUDE")) or DEFAULT_EXCLUDE_FIELDS
+    # The prompt and backend shape the plan as much as the state does.
+    return fingerprint_payload(
+        {
+            "state": fingerprint_payload(payload, include, exclude),
+            "prompt": os.getenv("ONI_AI_PROMPT", ""),
+            "backend": os.getenv("ONI_AI_DECISION_BACKEND", "exec"),
+        },
+        exclude=(),
+    )
+
+
+def count_actions(normalized_response: str) -> int:
+    try:
+        actions = json.loads(normalized_response).get("actions")
+    except (json.JSONDecodeError, AttributeError):
+        return 0
+    return len(actions) if isinstance(actions, list) else 0
 
 
 def run_job(job_id: str, payload: dict) -> None:
@@ -150,22 +789,39 @@ def run_job(job_id: str, payload: dict) -> None:
         return
 
     request_tag = str(job.get("request_id") or "-")
-    set_job_state(job_id, status="running", progress=5, started_at=time.time())
+    started_at = time.time()
+    set_job_state(job_id, status="running", progress=5, stage="starting", started_at=started_at)
+    metrics.observe_stage("queue_wait", started_at - float(job.get("created_at") or started_at))
+    JOB_CONTEXT.job_id = job_id
+    status = "failed"
 
     try:
-        command = call_codex_exec(payload, request_tag=request_tag)
-        if not isinstance(command, str) or not command.strip():
-            command = json.dumps({"actions": []}, ensure_ascii=False)
+        cache = get_decision_cache()
+        cache_key = decision_cache_key(payload) if cache is not None else None
+        command = cache.get(cache_key) if cache is not None and cache_key is not None else None
+        if command is not None:
+            LOGGER.info("request=%s job=%s decision cache hit key=%s", request_tag, job_id, cache_key[:12])
+            set_job_state(job_id, decision_cache="hit")
+        else:
+            command = call_codex_exec(payload, request_tag=request_tag)
+            if not isinstance(command, str) or not command.strip():
+                command = json.dumps({"actions": []}, ensure_ascii=False)
+            if cache is not None and cache_key is not None:
+                set_job_state(job_id, decision_cache="miss")
+                if count_actions(command) > 0:
+                    cache.put(cache_key, command)
 
         set_last_analyze_payload(payload, command)
         set_job_state(
             job_id,
             status="completed",
             progress=100,
+            stage="done",
             response=command,
             summary=summarize_actions(command),
             finished_at=time.time(),
         )
+        status = "completed"
         LOGGER.info("request=%s job=%s completed summary=%s", request_tag, job_id, summarize_actions(command))
     except Exception as exc:  # defensive outer layer for worker
         LOGGER.exception("request=%s job=%s failed", request_tag, job_id)
@@ -173,9 +829,14 @@ def run_job(job_id: str, payload: dict) -> None:
             job_id,
             status="failed",
             progress=100,
+            stage="done",
             error=str(exc),
             finished_at=time.time(),
         )
+    finally:
+        JOB_CONTEXT.job_id = None
+        metrics.JOBS_FINISHED.inc(labels={"status": status})
+        metrics.observe_stage("end_to_end", time.time() - float(job.get("created_at") or started_at))
 
 
 def strip_fence(text: str) -> str:
@@ -188,6 +849,7 @@ def strip_fence(text: str) -> str:
 def normalize_action(raw_output: str, request_tag: str = "-") -> str:
     if not isinstance(raw_output, str) or not raw_output.strip():
         LOGGER.warning("request=%s normalize_action got empty output", request_tag)
+        metrics.NOOP_FALLBACKS.inc(labels={"reason": "empty_output"})
         return json.dumps({"actions": []}, ensure_ascii=False)
 
     cleaned = strip_fence(raw_output)
@@ -198,6 +860,7 @@ def normalize_action(raw_output: str, request_tag: str = "-") -> str:
             action = str(parsed.get("action", "")).strip().lower()
             if action == "resume" or action == "keep_paused":
                 LOGGER.info("request=%s mapped legacy action=%s to noop", request_tag, action)
+                metrics.NOOP_FALLBACKS.inc(labels={"reason": "legacy_noop"})
                 return json.dumps({"actions": []}, ensure_ascii=False)
             if action == "set_speed":
                 speed = parsed.get("speed", 0)
@@ -230,6 +893,7 @@ def normalize_action(raw_output: str, request_tag: str = "-") -> str:
     upper = cleaned.upper()
     if "KEEP_PAUSED" in upper:
         LOGGER.info("request=%s mapped KEEP_PAUSED to noop", request_tag)
+        metrics.NOOP_FALLBACKS.inc(labels={"reason": "legacy_noop"})
         return json.dumps({"actions": []}, ensure_ascii=False)
 
     speed_match = re.search(r"SET_SPEED\s*:\s*([1-3])", upper)
@@ -239,13 +903,21 @@ def normalize_action(raw_output: str, request_tag: str = "-") -> str:
 
     if "RESUME" in upper:
         LOGGER.info("request=%s mapped RESUME to noop", request_tag)
+        metrics.NOOP_FALLBACKS.inc(labels={"reason": "legacy_noop"})
         return json.dumps({"actions": []}, ensure_ascii=False)
 
     LOGGER.warning("request=%s failed to map output; returning noop. preview=%s", request_tag, preview_text(cleaned, 500))
+    metrics.NOOP_FALLBACKS.inc(labels={"reason": "unmapped"})
     return json.dumps({"actions": []}, ensure_ascii=False)
 
 
-def build_prompt(payload: dict, has_screenshot: bool) -> str:
+def build_prompt(
+    payload: dict,
+    has_screenshot: bool,
+    live_state_endpoints: list[str] | None = None,
+    has_state_digest: bool = False,
+    state_diff: dict | None = None,
+) -> str:
     api_base_url = str(payload.get("api_base_url", "")).strip()
     if api_base_url:
         api_base_url = api_base_url.rstrip("/")
@@ -275,6 +947,8 @@ def build_prompt(payload: dict, has_screenshot: bool) -> str:
             "Assign a reasonable amount of actions and optionally update action priorities when execution order should change. "
             "Be foreseeable and predictive: push the colony toward final goals of sustainable living and advanced technologies, including aerospace. "
             "Use cancel when a previously proposed action is unsafe or conflicts with survival goals. "
+            "Earlier plans may have merged actions before applying them: a merged action's id is listed under merged_ids "
+            "of the action that absorbed it, so cancel that action's id instead. "
             "Always include stable action ids and concrete params. "
             "Do not run broad exploratory shell scans or commands that print huge outputs. "
             "Do not dump or enumerate full state payload keys. "
@@ -285,7 +959,7 @@ def build_prompt(payload: dict, has_screenshot: bool) -> str:
             "When state context is paused and api_base_url is available, you may submit immediate updates via concrete endpoints such as "
             "POST /speed, POST /pause, POST /build, POST /dig, POST /deconstruct, POST /research, and POST /priorities while planning. "
             "If you do live POST, keep it minimal, survival-focused, and still return final JSON plan. "
-            "After reading openapi.yaml, first call GET /state, GET /priorities, and GET /speed, then plan. "
+            "After reading openapi.yaml, read the live state first (./live_state.json when staged, otherwise call GET /state, GET /priorities, and GET /speed), then plan. "
             "Return ONLY JSON with top-level keys in this order: analysis, suggestions, actions, notes. "
             "analysis should summarize colony risk and why the plan helps survival. "
             "suggestions should be concise human-readable bullets as an array of strings."
@@ -306,49 +980,331 @@ def build_prompt(payload: dict, has_screenshot: bool) -> str:
             "Use request payload fields as fallback state input."
         )
 
+    if live_state_endpoints:
+        fetched = ", ".join(f"GET {path}" for path in live_state_endpoints)
+        api_note += (
+            f"\n./{LIVE_STATE_FILE_NAME} was fetched by the bridge just before this run and holds the responses of "
+            f"{fetched} under endpoints.<path>.body; read it instead of calling those endpoints, "
+            "and only re-fetch after you have made a live POST."
+        )
+    if has_state_digest:
+        api_note += (
+            f"\n./{STATE_DIGEST_FILE_NAME} is a compact digest of the colony state (context, duplicant chores and stats, "
+            "most urgent pending actions, priority ranges, nearby elements). Plan from it first and open the full "
+            "state only for specific details the digest leaves out."
+        )
+    if state_diff is not None:
+        if state_diff.get("unchanged"):
+            change_summary = "nothing in duplicants, pending actions or priorities changed"
+        else:
+            change_summary = "it lists added/removed duplicants, chore and priority changes and new or changed pending actions"
+        api_note += (
+            f"\n./{STATE_DIFF_FILE_NAME} compares this state with the previous request "
+            f"{state_diff.get('previous_request_id')} (cycle delta {state_diff.get('cycle_delta')}); {change_summary}. "
+            "Focus the plan on what changed and do not repeat actions that are still pending."
+        )
+
+    autopilot = payload.get("autopilot")
+    if isinstance(autopilot, dict) and autopilot.get("reasons"):
+        reasons = ", ".join(str(reason) for reason in autopilot["reasons"])
+        api_note += (
+            f"\nThis run was started by the bridge autopilot, not by the player, because of: {reasons}. "
+            "Address those changes first and keep the plan short when the rest of the colony is stable."
+        )
+
     screenshot_note = "screenshot.png is available." if has_screenshot else "screenshot.png is not available."
     return f"{custom_prompt}\n\n{api_note}\nNote: {screenshot_note}\n"
 
 
+def start_live_state_prefetch(payload: dict, request_tag: str) -> LiveStatePrefetch | None:
+    api_base_url = str(payload.get("api_base_url", "")).strip()
+    if not api_base_url or not is_truthy_env("ONI_AI_LIVE_STATE", True):
+        return None
+
+    endpoints = parse_endpoint_specs(
+        os.getenv("ONI_AI_LIVE_STATE_ENDPOINTS") or DEFAULT_LIVE_STATE_ENDPOINTS,
+        read_int_env("ONI_AI_LIVE_STATE_TIMEOUT_MS", 1500, minimum=1),
+    )
+    try:
+        client = get_bridge_api_client(api_base_url)
+    except ValueError:
+        LOGGER.warning("request=%s skipping live state prefetch for api_base_url=%s", request_tag, api_base_url)
+        return None
+    return LiveStatePrefetch(client, endpoints).start()
+
+
+def stage_live_state(prefetch: LiveStatePrefetch | None, request_dir: str, request_tag: str) -> dict | None:
+    if prefetch is None:
+        return None
+
+    with metrics.time_stage("live_state_wait"):
+        snapshot = prefetch.collect()
+    write_live_state(request_dir, snapshot)
+    LOGGER.info(
+        "request=%s staged %s fetched=%s elapsed_ms=%s",
+        request_tag,
+        LIVE_STATE_FILE_NAME,
+        fetched_endpoints(snapshot),
+        snapshot["elapsed_ms"],
+    )
+    return snapshot
+
+
+def select_state_source(payload: dict, live_state: dict | None) -> dict:
+    # Prefer the freshly fetched /state; the mod's request payload is the fallback snapshot.
+    if live_state is not None and "/state" in fetched_endpoints(live_state):
+        live_body = live_state["endpoints"]["/state"].get("body")
+        if isinstance(live_body, dict):
+            return live_body["state"] if isinstance(live_body.get("state"), dict) else live_body
+    return payload
+
+
+def stage_state_digest(state: dict, request_dir: str, request_tag: str) -> bool:
+    if not is_truthy_env("ONI_AI_STATE_DIGEST", True):
+        return False
+
+    digest = build_state_digest(
+        state,
+        max_bytes=read_int_env("ONI_AI_STATE_DIGEST_MAX_BYTES", 8192, minimum=0),
+        top_n=read_int_env("ONI_AI_STATE_DIGEST_TOP_N", 10, minimum=1),
+    )
+    write_state_digest(request_dir, digest)
+    LOGGER.info(
+        "request=%s staged %s bytes=%s source_bytes=%s truncated=%s",
+        request_tag,
+        STATE_DIGEST_FILE_NAME,
+        encoded_size(digest),
+        encoded_size(state),
+        bool(digest.get("truncated")),
+    )
+    return True
+
+
+def session_key(payload: dict) -> str:
+    return str(payload.get("session_id") or payload.get("api_base_url") or "default").strip()
+
+
+def swap_session_state(key: str, request_id: str, state: dict) -> tuple[str, dict] | None:
+    """Record ``state`` as the latest snapshot of session ``key`` and return the one it replaces."""
+    max_sessions = read_int_env("ONI_AI_STATE_DIFF_MAX_SESSIONS", 8, minimum=1)
+    with RUNTIME_STATE_LOCK:
+        sessions = RUNTIME_STATE["sessions"]
+        previous = sessions.pop(key, None)
+        last_request = RUNTIME_STATE.get("last_request")
+        if previous is None and isinstance(last_request, dict) and session_key(last_request) == key:
+            previous = (str(last_request.get("request_id") or ""), last_request)
+        sessions[key] = (request_id, state)
+        while len(sessions) > max_sessions:
+            sessions.popitem(last=False)
+    return previous
+
+
+def stage_state_diff(payload: dict, state: dict, request_dir: str, request_tag: str) -> dict | None:
+    if not is_truthy_env("ONI_AI_STATE_DIFF", True):
+        return None
+
+    previous = swap_session_state(session_key(payload), str(payload.get("request_id") or request_tag), state)
+    if previous is None:
+        return None
+
+    previous_request_id, previous_state = previous
+    diff = diff_states(
+        previous_state,
+        state,
+        max_bytes=read_int_env("ONI_AI_STATE_DIFF_MAX_BYTES", 4096, minimum=0),
+        previous_request_id=previous_request_id,
+    )
+    write_state_diff(request_dir, diff)
+    LOGGER.info(
+        "request=%s staged %s previous=%s cycle_delta=%s unchanged=%s bytes=%s",
+        request_tag,
+        STATE_DIFF_FILE_NAME,
+        previous_request_id,
+        diff["cycle_delta"],
+        diff["unchanged"],
+        encoded_size(diff),
+    )
+    return diff
+
+
+def get_plan_validator(
+    payload: dict, request_tag: str, inspector: CellInspector | RecordedCellInspector | None = None
+) -> PlanValidator | None:
+    mode = (os.getenv("ONI_AI_PLAN_VALIDATION", "drop") or "drop").strip().lower()
+    if mode not in VALIDATION_MODES:
+        LOGGER.warning("request=%s invalid ONI_AI_PLAN_VALIDATION=%s; using drop", request_tag, mode)
+        mode = "drop"
+    if mode == "off":
+        return None
+
+    api_base_url = str(payload.get("api_base_url", "")).strip()
+    if inspector is None and api_base_url and is_truthy_env("ONI_AI_PLAN_VALIDATION_CELLS", True):
+        try:
+            inspector = CellInspector(
+                get_bridge_api_client(api_base_url),
+                cache=get_cell_cache(api_base_url),
+                timeout_seconds=read_int_env("ONI_AI_PLAN_VALIDATION_TIMEOUT_MS", 2000, minimum=1) / 1000.0,
+            )
+        except ValueError:
+            LOGGER.warning("request=%s skipping cell validation for api_base_url=%s", request_tag, api_base_url)
+    return PlanValidator(load_action_validators(), inspector, mode)
+
+
+def validate_plan(
+    normalized: str,
+    payload: dict,
+    state: dict,
+    request_tag: str,
+    logs_dir: Path | None = None,
+    inspector: CellInspector | RecordedCellInspector | None = None,
+) -> str:
+    """Run the normalized plan through schema and cell checks before the game sees it.
+
+    The cell facts the checks used are saved to ``logs_dir`` so a replay can
+    repeat them through a :class:`RecordedCellInspector`.
+    """
+    validator = get_plan_validator(payload, request_tag, inspector)
+    if validator is None:
+        return normalized
+    try:
+        plan = json.loads(normalized)
+    except json.JSONDecodeError:
+        return normalized
+    if not isinstance(plan, dict) or not plan.get("actions"):
+        return normalized
+
+    report_job_progress(95, "validating")
+    context = state.get("context") if isinstance(state.get("context"), dict) else {}
+    with metrics.time_stage("validation"):
+        validated, report = validator.validate(plan, cycle=context.get("cycle"))
+    for rejected in report.rejected:
+        outcome = "dropped" if rejected["dropped"] else "flagged"
+        metrics.PLAN_ACTIONS_REJECTED.inc(labels={"type": str(rejected["type"]), "outcome": outcome})
+    LOGGER.info(
+        "request=%s validated plan mode=%s checked=%s repaired=%s rejected=%s cells_checked=%s cells_error=%s",
+        request_tag,
+        report.mode,
+        report.checked,
+        report.repaired,
+        len(report.rejected),
+        report.cells_checked,
+        report.cells_error,
+    )
+    validated["validation"] = report.as_dict()
+    if logs_dir is not None and report.cells:
+        with open(logs_dir / VALIDATION_CELLS_FILE_NAME, "w", encoding="utf-8") as file:
+            json.dump(list(report.cells.values()), file, ensure_ascii=False)
+    job_id = current_job_id()
+    if job_id is not None:
+        set_job_state(job_id, validation=validated["validation"])
+    return json.dumps(validated, ensure_ascii=False)
+
+
+def prepare_streamed_action(action: dict, request_tag: str) -> dict | None:
+    """Repair and schema-check a streamed action; cell checks wait for the final plan."""
+    if isinstance(action.get("params"), dict):
+        action = {**action, "params": repair_points(action["params"])}
+    mode = (os.getenv("ONI_AI_PLAN_VALIDATION", "drop") or "drop").strip().lower()
+    validator = (load_action_validators() or {}).get(str(action.get("type", ""))) if mode != "off" else None
+    if validator is not None:
+        errors = validator(action.get("params") if action.get("params") is not None else {})
+        if errors:
+            LOGGER.info("request=%s held back streamed action id=%s errors=%s", request_tag, action.get("id"), list(errors))
+            return None
+    return action
+
+
+def optimize_plan_output(normalized: str, request_tag: str) -> str:
+    """Merge and reorder plan actions so the game applies them in fewer main-thread calls."""
+    if not is_truthy_env("ONI_AI_PLAN_OPTIMIZE", False):
+        return normalized
+    try:
+        plan = json.loads(normalized)
+    except json.JSONDecodeError:
+        return normalized
+    if not isinstance(plan, dict) or not plan.get("actions"):
+        return normalized
+
+    with metrics.time_stage("optimization"):
+        optimized, report = optimize_plan(plan, reorder=is_truthy_env("ONI_AI_PLAN_OPTIMIZE_REORDER", False))
+    LOGGER.info(
+        "request=%s optimized plan actions=%s->%s merged=%s deduplicated=%s reordered=%s",
+        request_tag,
+        report.input_actions,
+        report.output_actions,
+        report.merged,
+        report.deduplicated,
+        report.reordered,
+    )
+    optimized["optimization"] = report.as_dict()
+    return json.dumps(optimized, ensure_ascii=False)
+
+
 def wait_for_screenshot(request_dir: str, payload: dict, request_tag: str) -> bool:
     screenshot_hint = str(payload.get("screenshot_path", "")).strip() or "screenshot.png"
     screenshot_path = screenshot_hint if os.path.isabs(screenshot_hint) else os.path.join(request_dir, screenshot_hint)
     wait_ms = int(os.getenv("ONI_AI_SCREENSHOT_WAIT_MS", "500"))
     poll_ms = int(os.getenv("ONI_AI_SCREENSHOT_POLL_MS", "50"))
+    watcher = (os.getenv("ONI_AI_SCREENSHOT_WATCHER", "auto") or "auto").strip().lower()
+    validate_png = is_truthy_env("ONI_AI_SCREENSHOT_VALIDATE_PNG", True)
 
     if wait_ms < 0:
         wait_ms = 0
     if poll_ms <= 0:
         poll_ms = 50
-
-    has_screenshot = os.path.exists(screenshot_path)
-    if has_screenshot or wait_ms == 0:
-        return has_screenshot
+    if watcher not in SCREENSHOT_WATCHERS:
+        LOGGER.warning("request=%s invalid ONI_AI_SCREENSHOT_WATCHER=%s; using auto", request_tag, watcher)
+        watcher = "auto"
 
     started_at = time.monotonic()
-    deadline = started_at + (wait_ms / 1000.0)
-
-    while time.monotonic() < deadline:
-        time.sleep(poll_ms / 1000.0)
-        if os.path.exists(screenshot_path):
+    has_screenshot, method = wait_for_file_ready(
+        screenshot_path,
+        timeout_seconds=wait_ms / 1000.0,
+        poll_seconds=poll_ms / 1000.0,
+        watcher=watcher if wait_ms > 0 else "poll",
+        validate_png=validate_png,
+    )
+    if has_screenshot:
+        if method != "immediate":
             elapsed_ms = int((time.monotonic() - started_at) * 1000)
             LOGGER.info(
-                "request=%s screenshot became available after wait=%sms path=%s",
+                "request=%s screenshot became available after wait=%sms via=%s path=%s",
                 request_tag,
                 elapsed_ms,
+                method,
                 screenshot_path,
             )
-            return True
+        return True
 
-    LOGGER.warning(
-        "request=%s screenshot unavailable after waiting %sms path=%s",
-        request_tag,
-        wait_ms,
-        screenshot_path,
-    )
+    if wait_ms == 0:
+        return False
+
+    if os.path.exists(screenshot_path):
+        LOGGER.warning(
+            "request=%s screenshot incomplete after waiting %sms path=%s",
+            request_tag,
+            wait_ms,
+            screenshot_path,
+        )
+    else:
+        LOGGER.warning(
+            "request=%s screenshot unavailable after waiting %sms path=%s",
+            request_tag,
+            wait_ms,
+            screenshot_path,
+        )
     return False
 
 
+def get_asset_cache() -> AssetCache:
+    global ASSET_CACHE
+    cache_dir = get_request_root() / ".asset_cache"
+    with ASSET_CACHE_LOCK:
+        if ASSET_CACHE is None or ASSET_CACHE.cache_dir != cache_dir:
+            ASSET_CACHE = AssetCache(cache_dir)
+        return ASSET_CACHE
+
+
 def copy_reference_assets_to_request_dir(request_dir: str, request_tag: str) -> None:
     project_root = Path(__file__).resolve().parents[2]
 
@@ -358,15 +1314,33 @@ def copy_reference_assets_to_request_dir(request_dir: str, request_tag: str) ->
         project_root / "examples" / "request_idle" / "response.json": Path(request_dir) / "response.example.json",
     }
 
-    copied = 0
+    staging_mode = (os.getenv("ONI_AI_ASSET_STAGING", "link") or "link").strip().lower()
+    if staging_mode not in ASSET_STAGING_MODES:
+        LOGGER.warning("request=%s invalid ONI_AI_ASSET_STAGING=%s; using copy", request_tag, staging_mode)
+        staging_mode = "copy"
+
+    methods: dict[str, int] = {}
     missing = []
     for source_path, target_path in source_to_target.items():
         if not source_path.exists():
             missing.append(str(source_path))
             continue
 
-        shutil.copy2(source_path, target_path)
-        copied += 1
+        method = "copy"
+        if staging_mode != "copy":
+            try:
+                method = link_asset(get_asset_cache().materialize(source_path), target_path, staging_mode)
+            except OSError:
+                LOGGER.exception("request=%s failed staging %s via asset cache; copying", request_tag, source_path)
+                method = "copy"
+                if target_path.is_symlink():
+                    target_path.unlink()
+                shutil.copy2(source_path, target_path)
+        else:
+            if target_path.is_symlink() or target_path.exists():
+                target_path.unlink()
+            shutil.copy2(source_path, target_path)
+        methods[method] = methods.get(method, 0) + 1
 
     if missing:
         LOGGER.warning(
@@ -377,9 +1351,10 @@ def copy_reference_assets_to_request_dir(request_dir: str, request_tag: str) ->
         )
 
     LOGGER.info(
-        "request=%s staged reference assets copied=%s request_dir=%s",
+        "request=%s staged reference assets mode=%s methods=%s request_dir=%s",
         request_tag,
-        copied,
+        staging_mode,
+        methods,
         request_dir,
     )
 
@@ -405,18 +1380,69 @@ def read_last_message_output(last_message_path: Path, request_tag: str) -> str:
     return text
 
 
-def call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+def get_decision_backend(request_tag: str = "-") -> DecisionBackend | None:
+    backend_name = (os.getenv("ONI_AI_DECISION_BACKEND", "exec") or "exec").strip().lower()
+    if backend_name not in DECISION_BACKENDS:
+        LOGGER.warning("request=%s invalid ONI_AI_DECISION_BACKEND=%s; using exec", request_tag, backend_name)
+        backend_name = "exec"
+
+    if backend_name == "fake":
+        try:
+            response_text = load_fake_response()
+        except OSError:
+            LOGGER.exception("request=%s failed reading ONI_AI_FAKE_RESPONSE_PATH", request_tag)
+            return None
+        latency_seconds = read_int_env("ONI_AI_FAKE_LATENCY_MS", 0) / 1000.0
+        return FakeBackend(response_text, latency_seconds)
+
+    if backend_name == "worker":
+        worker_cmd_raw = os.getenv("ONI_AI_WORKER_CMD", "").strip()
+        try:
+            worker_cmd_parts = shlex.split(worker_cmd_raw)
+        except ValueError:
+            LOGGER.exception("request=%s invalid ONI_AI_WORKER_CMD=%s", request_tag, worker_cmd_raw)
+            return None
+        if not worker_cmd_parts:
+            LOGGER.error("request=%s ONI_AI_DECISION_BACKEND=worker requires ONI_AI_WORKER_CMD", request_tag)
+            return None
+        return get_worker_backend(worker_cmd_parts)
+
     codex_cmd_raw = os.getenv("ONI_AI_CODEX_CMD", "codex").strip() or "codex"
     try:
         codex_cmd_parts = shlex.split(codex_cmd_raw)
     except ValueError:
         LOGGER.exception("request=%s invalid ONI_AI_CODEX_CMD=%s", request_tag, codex_cmd_raw)
-        return json.dumps({"actions": []}, ensure_ascii=False)
+        return None
 
     if not codex_cmd_parts:
         codex_cmd_parts = ["codex"]
 
     skip_git_repo_check = is_truthy_env("ONI_AI_CODEX_SKIP_GIT_REPO_CHECK", True)
+    codex_sandbox_mode = os.getenv("ONI_AI_CODEX_SANDBOX", "danger-full-access").strip() or "danger-full-access"
+    return ExecBackend(codex_cmd_parts, codex_sandbox_mode, skip_git_repo_check)
+
+
+def record_bridge_response(logs_dir: Path, normalized: str) -> str:
+    with open(logs_dir / BRIDGE_RESPONSE_FILE_NAME, "w", encoding="utf-8") as file:
+        file.write(normalized)
+    return normalized
+
+
+def call_codex_exec(
+    payload: dict,
+    request_tag: str = "-",
+    backend: DecisionBackend | None = None,
+    cell_inspector: RecordedCellInspector | None = None,
+) -> str:
+    """Run the analyze pipeline for one request.
+
+    ``backend`` overrides the env-selected decision backend and
+    ``cell_inspector`` answers plan validation's cell checks instead of the game.
+    """
+    backend = backend or get_decision_backend(request_tag)
+    if backend is None:
+        return json.dumps({"actions": []}, ensure_ascii=False)
+
     timeout_raw = (os.getenv("ONI_AI_CODEX_TIMEOUT_SECONDS", "0") or "0").strip()
     try:
         timeout_seconds = int(timeout_raw)
@@ -429,104 +1455,90 @@ def call_codex_exec(payload: dict, request_tag: str = "-") -> str:
         timeout_seconds = 0
     if timeout_seconds < 0:
         timeout_seconds = 0
-    codex_sandbox_mode = os.getenv("ONI_AI_CODEX_SANDBOX", "danger-full-access").strip() or "danger-full-access"
-
 
     request_dir = str(payload.get("request_dir", "")).strip()
     if not request_dir or not os.path.isdir(request_dir):
         LOGGER.error("request=%s invalid request_dir=%s", request_tag, request_dir)
         return json.dumps({"actions": []}, ensure_ascii=False)
 
-    copy_reference_assets_to_request_dir(request_dir, request_tag)
-
-    has_screenshot = wait_for_screenshot(request_dir, payload, request_tag)
+    job_id = current_job_id()
+    # Fetch live state in the background while assets are staged and the screenshot lands.
+    live_state_prefetch = start_live_state_prefetch(payload, request_tag)
+    report_job_progress(10, "staging_assets")
+    with metrics.time_stage("asset_staging"):
+        copy_reference_assets_to_request_dir(request_dir, request_tag)
+
+    report_job_progress(15, "waiting_screenshot")
+    with metrics.time_stage("screenshot_wait"):
+        has_screenshot = wait_for_screenshot(request_dir, payload, request_tag)
+    live_state = stage_live_state(live_state_prefetch, request_dir, request_tag)
+    live_state_endpoints = fetched_endpoints(live_state) if live_state is not None else []
+    state = select_state_source(payload, live_state)
+    has_state_digest = stage_state_digest(state, request_dir, request_tag)
+    state_diff = stage_state_diff(payload, state, request_dir, request_tag)
     logs_dir = Path(request_dir) / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
     last_message_path = logs_dir / "codex_last_message.json"
+    with open(logs_dir / REQUEST_PAYLOAD_FILE_NAME, "w", encoding="utf-8") as file:
+        json.dump(payload, file, ensure_ascii=False)
 
     LOGGER.info(
-        "request=%s invoking codex cmd=%s timeout=%s request_dir=%s has_screenshot=%s skip_git_repo_check=%s sandbox=%s",
+        "request=%s invoking codex backend=%s timeout=%s request_dir=%s has_screenshot=%s",
         request_tag,
-        shlex.join(codex_cmd_parts),
+        backend.describe(),
         f"{timeout_seconds}s" if timeout_seconds > 0 else "disabled",
         request_dir,
         has_screenshot,
-        skip_git_repo_check,
-        codex_sandbox_mode,
     )
 
-    prompt = build_prompt(payload, has_screenshot)
+    prompt = build_prompt(payload, has_screenshot, live_state_endpoints, has_state_digest, state_diff)
     LOGGER.debug("request=%s prompt_preview=%s", request_tag, preview_text(prompt, 500))
-    command = [*codex_cmd_parts, "exec", "-s", codex_sandbox_mode, "-o", str(last_message_path)]
-    if skip_git_repo_check:
-        command.append("--skip-git-repo-check")
-    command.append(prompt)
-    started_at = time.monotonic()
-
-    stdout_chunks: list[str] = []
-    stderr_chunks: list[str] = []
-
-    def stream_reader(stream, is_stderr: bool) -> None:
-        if stream is None:
-            return
-
-        level = logging.WARNING if is_stderr else logging.INFO
-        prefix = "stderr" if is_stderr else "stdout"
-
-        for raw_line in iter(stream.readline, ""):
-            line = raw_line.rstrip("\n")
-            if is_stderr:
-                stderr_chunks.append(raw_line)
-            else:
-                stdout_chunks.append(raw_line)
+    decision_request = DecisionRequest(
+        request_tag=request_tag,
+        request_dir=request_dir,
+        prompt=prompt,
+        last_message_path=last_message_path,
+        timeout_seconds=timeout_seconds,
+    )
 
-            if line:
-                LOGGER.log(level, "request=%s codex %s | %s", request_tag, prefix, line)
+    action_stream = (
+        ActionStreamParser() if job_id is not None and is_truthy_env("ONI_AI_STREAM_ACTIONS", False) else None
+    )
 
-        stream.close()
+    def on_output(stream: str, line: str) -> None:
+        level = logging.WARNING if stream == "stderr" else logging.INFO
+        LOGGER.log(level, "request=%s codex %s | %s", request_tag, stream, line)
+        if job_id is not None:
+            append_job_output(job_id, stream, line)
+        if action_stream is not None and stream == "stdout":
+            for action in action_stream.feed(line + "\n"):
+                prepared = prepare_streamed_action(action, request_tag)
+                if prepared is not None:
+                    index = publish_streamed_action(job_id, prepared)
+                    LOGGER.info("request=%s streamed action index=%s id=%s", request_tag, index, prepared.get("id"))
 
-    timed_out = False
-    try:
-        process = subprocess.Popen(
-            command,
-            cwd=request_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-        )
-        stdout_thread = threading.Thread(target=stream_reader, args=(process.stdout, False), daemon=True)
-        stderr_thread = threading.Thread(target=stream_reader, args=(process.stderr, True), daemon=True)
-        stdout_thread.start()
-        stderr_thread.start()
+    started_at = time.monotonic()
+    report_job_progress(20, "codex_running")
+    result = backend.run(decision_request, on_output)
+    elapsed_seconds = time.monotonic() - started_at
+    elapsed_ms = int(elapsed_seconds * 1000)
+    metrics.observe_stage("codex", elapsed_seconds)
 
-        try:
-            if timeout_seconds > 0:
-                process.wait(timeout=timeout_seconds)
-            else:
-                process.wait()
-        except subprocess.TimeoutExpired:
-            timed_out = True
-            LOGGER.error("request=%s codex timed out after %ss; terminating process", request_tag, timeout_seconds)
-            process.kill()
-            process.wait()
-
-        stdout_thread.join(timeout=5)
-        stderr_thread.join(timeout=5)
-
-        if timed_out:
-            stderr_chunks.append(f"Timed out after {timeout_seconds} seconds\n")
-    except (subprocess.SubprocessError, OSError, ValueError) as exc:
-        elapsed_ms = int((time.monotonic() - started_at) * 1000)
+    if result.invoke_error is not None:
         with open(logs_dir / "codex_invoke_error.txt", "w", encoding="utf-8") as file:
-            file.write(str(exc))
-        LOGGER.exception("request=%s codex invocation failed after %sms", request_tag, elapsed_ms)
+            file.write(result.invoke_error)
+        LOGGER.error(
+            "request=%s codex invocation failed after %sms error=%s",
+            request_tag,
+            elapsed_ms,
+            result.invoke_error,
+        )
         return json.dumps({"actions": []}, ensure_ascii=False)
 
-    elapsed_ms = int((time.monotonic() - started_at) * 1000)
-    return_code = process.returncode if process.returncode is not None else -1
-    stdout_text = "".join(stdout_chunks)
-    stderr_text = "".join(stderr_chunks)
+    timed_out = result.timed_out
+    return_code = result.return_code
+    stdout_text = result.stdout
+    stderr_text = result.stderr
 
     with open(logs_dir / "codex_stdout.txt", "w", encoding="utf-8") as file:
         file.write(stdout_text)
@@ -548,13 +1560,17 @@ def call_codex_exec(payload: dict, request_tag: str = "-") -> str:
         LOGGER.warning("request=%s codex stderr preview=%s", request_tag, preview_text(stderr_text, 500))
 
     raw_last_message = read_last_message_output(last_message_path, request_tag)
+    report_job_progress(90, "normalizing")
 
     if timed_out:
+        metrics.CODEX_TIMEOUTS.inc()
         raise RuntimeError(f"codex_timed_out timeout_seconds={timeout_seconds} return_code={return_code}")
 
     if return_code != 0:
+        metrics.CODEX_NONZERO_EXITS.inc()
         combined = raw_last_message or (stdout_text + "\n" + stderr_text)
-        normalized = normalize_action(combined, request_tag=request_tag)
+        with metrics.time_stage("normalization"):
+            normalized = normalize_action(combined, request_tag=request_tag)
         LOGGER.info("request=%s normalized nonzero-exit output => %s", request_tag, summarize_actions(normalized))
 
         try:
@@ -567,43 +1583,155 @@ def call_codex_exec(payload: dict, request_tag: str = "-") -> str:
         if action_count <= 0:
             raise RuntimeError(f"codex_nonzero_exit return_code={return_code} without actionable output")
 
-        return normalized
+        validated = validate_plan(normalized, payload, state, request_tag, logs_dir, cell_inspector)
+        return record_bridge_response(logs_dir, optimize_plan_output(validated, request_tag))
 
-    normalized = normalize_action(raw_last_message or stdout_text, request_tag=request_tag)
+    with metrics.time_stage("normalization"):
+        normalized = normalize_action(raw_last_message or stdout_text, request_tag=request_tag)
     LOGGER.info("request=%s normalized success output => %s", request_tag, summarize_actions(normalized))
-    return normalized
+    validated = validate_plan(normalized, payload, state, request_tag, logs_dir, cell_inspector)
+    return record_bridge_response(logs_dir, optimize_plan_output(validated, request_tag))
+
+
+metrics.REGISTRY.gauge("oni_ai_jobs_queued", "Analyze jobs waiting for a worker.", lambda: get_job_scheduler().stats()["queued"])
+metrics.REGISTRY.gauge("oni_ai_jobs_running", "Analyze jobs currently running.", lambda: get_job_scheduler().stats()["running"])
 
 
 class OniAiHandler(BaseHTTPRequestHandler):
-    def send_json(self, status_code: int, payload: dict) -> None:
+    # HTTP/1.1 keeps the mod's polling connections alive; every response must
+    # therefore carry Content-Length. Idle keep-alive sockets are dropped after
+    # ``timeout`` seconds so they do not pin server threads forever.
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY the body of
+    # every keep-alive response waits ~40ms for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    timeout = read_int_env("ONI_AI_BRIDGE_KEEPALIVE_SECONDS", 30, minimum=1)
+
+    def send_json(self, status_code: int, payload: dict, headers: dict[str, str] | None = None) -> int:
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def send_text(self, status_code: int, text: str, content_type: str) -> int:
+        body = text.encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
+        return len(body)
+
+    def send_empty(self, status_code: int) -> None:
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def stream_job_events(self, job_id: str, trace_id: str) -> None:
+        last_event_id = (self.headers.get("Last-Event-ID") or "").strip()
+        after_seq = int(last_event_id) if last_event_id.isdigit() else 0
+        heartbeat_seconds = read_int_env("ONI_AI_SSE_HEARTBEAT_SECONDS", 15, minimum=1)
+
+        # Event streams have no Content-Length, so the connection ends with the stream.
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        try:
+            while True:
+                result = wait_for_job_events(job_id, after_seq, heartbeat_seconds)
+                # Jobs evicted from memory (or served from the spill index) have no event log left.
+                events, finished = result if result is not None else ([], True)
+                chunks = []
+                for event in events:
+                    after_seq = int(event["seq"])
+                    data = json.dumps(event["data"], ensure_ascii=False)
+                    chunks.append(f"id: {after_seq}\nevent: {event['event']}\ndata: {data}\n\n")
+
+                if finished:
+                    job = get_job_state(job_id) or {"job_id": job_id}
+                    chunks.append(f"event: result\ndata: {json.dumps(job, ensure_ascii=False)}\n\n")
+                elif not chunks:
+                    chunks.append(": keepalive\n\n")
+
+                self.wfile.write("".join(chunks).encode("utf-8"))
+                self.wfile.flush()
+                if finished:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            LOGGER.info("trace=%s job=%s event stream client disconnected", trace_id, job_id)
 
     def do_GET(self):
         trace_id = uuid.uuid4().hex[:8]
-        path = urlsplit(self.path).path
+        url = urlsplit(self.path)
+        path = url.path
 
         if path.startswith("/analyze/"):
-            job_id = path[len("/analyze/") :].strip("/").strip()
+            job_path = path[len("/analyze/") :].strip("/").strip()
+            job_id, _, sub_resource = job_path.partition("/")
             if not job_id:
                 self.send_json(400, {"error": "job_id_required"})
                 return
 
+            if sub_resource not in {"", "events"}:
+                self.send_empty(404)
+                return
+
             job = get_job_state(job_id)
             if job is None:
                 self.send_json(404, {"error": "job_not_found", "job_id": job_id})
                 return
 
+            if sub_resource == "events":
+                self.stream_job_events(job_id, trace_id)
+                return
+
+            wait_raw = (parse_qs(url.query).get("wait") or [""])[0].strip()
+            if wait_raw and job.get("status") not in JOB_TERMINAL_STATUSES:
+                try:
+                    wait_seconds = float(wait_raw)
+                except ValueError:
+                    wait_seconds = math.nan
+                # nan/inf would slip past the clamp below and wait with no deadline.
+                if not math.isfinite(wait_seconds):
+                    self.send_json(400, {"error": "invalid_wait", "wait": wait_raw})
+                    return
+
+                max_wait_seconds = read_int_env("ONI_AI_LONG_POLL_MAX_SECONDS", 60, minimum=1)
+                job = wait_for_job(job_id, min(max(wait_seconds, 0.0), max_wait_seconds)) or job
+
             self.send_json(200, job)
             return
 
         if path == "/health":
+            prune_job_state()
+            decision_cache = get_decision_cache()
             uptime_seconds = int(time.monotonic() - SERVER_STARTED_AT)
-            self.send_json(200, {"ok": True, "service": "oni_ai", "uptime_seconds": uptime_seconds})
+            self.send_json(
+                200,
+                {
+                    "ok": True,
+                    "service": "oni_ai",
+                    "uptime_seconds": uptime_seconds,
+                    "jobs": get_job_scheduler().stats(),
+                    "job_store": get_job_store_stats(),
+                    "decision_cache": decision_cache.stats() if decision_cache is not None else {"enabled": False},
+                    "retention": RETENTION_SERVICE.stats() if RETENTION_SERVICE is not None else {"enabled": False},
+                    "autopilot": AUTOPILOT.stats() if AUTOPILOT is not None else {"enabled": False},
+                },
+            )
+            return
+
+        if path == "/metrics":
+            self.send_text(200, metrics.REGISTRY.render(), metrics.PROMETHEUS_CONTENT_TYPE)
             return
 
         if path == "/state":
@@ -617,8 +1745,7 @@ class OniAiHandler(BaseHTTPRequestHandler):
             return
 
         LOGGER.warning("trace=%s path=%s method=GET => 404", trace_id, path)
-        self.send_response(404)
-        self.end_headers()
+        self.send_empty(404)
 
     def do_POST(self):
         started_at = time.monotonic()
@@ -627,8 +1754,9 @@ class OniAiHandler(BaseHTTPRequestHandler):
 
         if path.rstrip("/") != "/analyze":
             LOGGER.warning("trace=%s path=%s method=POST => 404", trace_id, path)
-            self.send_response(404)
-            self.end_headers()
+            # The body was not consumed, so the connection cannot be reused.
+            self.close_connection = True
+            self.send_empty(404)
             return
 
         content_length = int(self.headers.get("Content-Length", "0"))
@@ -641,6 +1769,7 @@ class OniAiHandler(BaseHTTPRequestHandler):
         except (json.JSONDecodeError, UnicodeDecodeError):
             LOGGER.exception("trace=%s invalid JSON body", trace_id)
             self.send_response(400)
+            self.send_header("Content-Length", str(len(b"Invalid JSON")))
             self.end_headers()
             self.wfile.write(b"Invalid JSON")
             return
@@ -655,33 +1784,34 @@ class OniAiHandler(BaseHTTPRequestHandler):
             request_dir,
         )
 
-        job = create_job(payload, trace_id)
-        job_id = str(job["job_id"])
+        job, admission = submit_job(payload, trace_id)
+        if job is None:
+            LOGGER.warning("trace=%s request=%s rejected: job queue full", trace_id, request_tag)
+            self.send_json(503, {"error": "queue_full", "request_id": request_tag}, headers={"Retry-After": "1"})
+            return
 
-        worker = threading.Thread(target=run_job, args=(job_id, payload), daemon=True)
-        worker.start()
+        job_id = str(job["job_id"])
+        if admission != "queued":
+            LOGGER.info("trace=%s request=%s %s into job=%s", trace_id, request_tag, admission, job_id)
 
         status_payload = {
             "job_id": job_id,
             "request_id": request_tag,
-            "status": "queued",
-            "progress": 0,
+            "status": job.get("status", "queued"),
+            "progress": job.get("progress", 0),
+            "queue_position": get_job_scheduler().queue_position(job_id),
+            "admission": admission,
             "status_url": f"/analyze/{job_id}",
         }
 
-        body = json.dumps(status_payload, ensure_ascii=False).encode("utf-8")
-        self.send_response(202)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        response_bytes = self.send_json(202, status_payload)
 
         elapsed_ms = int((time.monotonic() - started_at) * 1000)
         LOGGER.info(
             "trace=%s request=%s response_status=202 response_bytes=%s elapsed_ms=%s job=%s",
             trace_id,
             request_tag,
-            len(body),
+            response_bytes,
             elapsed_ms,
             job_id,
         )
@@ -690,13 +1820,20 @@ class OniAiHandler(BaseHTTPRequestHandler):
         return
 
 
+class BridgeHTTPServer(ThreadingHTTPServer):
+    """Thread-per-connection server so slow clients never stall status polls."""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
 def main():
     configure_logging()
 
     bind_host = os.getenv("ONI_AI_BRIDGE_HOST", "127.0.0.1")
     bind_port = int(os.getenv("ONI_AI_BRIDGE_PORT", "8765"))
 
-    server = HTTPServer((bind_host, bind_port), OniAiHandler)
+    server = BridgeHTTPServer((bind_host, bind_port), OniAiHandler)
     LOGGER.info("ONI AI bridge listening on %s:%s", bind_host, bind_port)
     LOGGER.info(
         "Logging configured level=%s codex_cmd_default=%s timeout_default=%s",
@@ -704,7 +1841,19 @@ def main():
         os.getenv("ONI_AI_CODEX_CMD", "codex").strip() or "codex",
         os.getenv("ONI_AI_CODEX_TIMEOUT_SECONDS", "0"),
     )
-    server.serve_forever()
+    # Compile the plan validators now so the first analyze request does not pay for parsing openapi.yaml.
+    validators = load_action_validators()
+    LOGGER.info("Plan validators compiled action_types=%s", sorted(validators) if validators is not None else "disabled")
+    retention = start_retention_service()
+    autopilot = start_autopilot()
+    try:
+        server.serve_forever()
+    finally:
+        if autopilot is not None:
+            autopilot.stop()
+        if retention is not None:
+            retention.stop()
+        close_worker_backends()
 
 
 if __name__ == "__main__":
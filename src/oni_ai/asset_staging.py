@@ -0,0 +1,115 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import sys
+import threading
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("oni_ai")
+ASSET_STAGING_MODES = {"link", "symlink", "copy"}
+# Linux FICLONE ioctl: share extents copy-on-write (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+
+class AssetCache:
+    """Content-hashed, read-only copies of reference assets shared by request dirs.
+
+    Each source is hashed once per (mtime, size) signature; a changed source
+    gets a new digest and therefore a new cache entry, which invalidates the
+    old one for subsequent requests.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._signatures: dict[Path, tuple[int, int, Path, int]] = {}
+
+    def materialize(self, source_path: Path) -> Path:
+        source_stat = source_path.stat()
+        with self._lock:
+            known = self._signatures.get(source_path)
+            if known is not None and known[:2] == (source_stat.st_mtime_ns, source_stat.st_size):
+                cache_stat = self._stat_or_none(known[2])
+                # A hardlinked copy written through from a request dir changes the cache mtime.
+                if cache_stat is not None and (cache_stat.st_size, cache_stat.st_mtime_ns) == (known[1], known[3]):
+                    return known[2]
+                known[2].unlink(missing_ok=True)
+
+            digest = hashlib.sha256(source_path.read_bytes()).hexdigest()
+            cache_path = self.cache_dir / f"{digest[:16]}_{source_path.name}"
+            cache_stat = self._stat_or_none(cache_path)
+            if cache_stat is None or cache_stat.st_size != source_stat.st_size or cache_stat.st_mode & stat.S_IWUSR:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+                shutil.copyfile(source_path, temp_path)
+                os.chmod(temp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(temp_path, cache_path)
+                cache_stat = cache_path.stat()
+                LOGGER.info("materialized reference asset source=%s cache=%s", source_path, cache_path)
+
+            self._signatures[source_path] = (
+                source_stat.st_mtime_ns,
+                source_stat.st_size,
+                cache_path,
+                cache_stat.st_mtime_ns,
+            )
+            return cache_path
+
+    @staticmethod
+    def _stat_or_none(path: Path) -> os.stat_result | None:
+        try:
+            return path.stat()
+        except FileNotFoundError:
+            return None
+
+
+def _reflink(source_path: Path, target_path: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink unsupported on this platform")
+
+    import fcntl
+
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            target_path.unlink(missing_ok=True)
+            raise
+
+
+def link_asset(cache_path: Path, target_path: Path, mode: str) -> str:
+    """Place ``cache_path`` at ``target_path`` and return the method used.
+
+    ``link`` tries hardlink, reflink, symlink and finally copy; ``symlink``
+    skips straight to a symlink. The target is always unlinked first so a
+    writer can never reach through an old hardlink into the shared cache.
+    """
+    if target_path.is_symlink() or target_path.exists():
+        target_path.unlink()
+
+    if mode == "link":
+        try:
+            os.link(cache_path, target_path)
+            return "hardlink"
+        except OSError:
+            pass
+        try:
+            _reflink(cache_path, target_path)
+            return "reflink"
+        except OSError:
+            pass
+
+    if mode in {"link", "symlink"}:
+        try:
+            target_path.symlink_to(cache_path)
+            return "symlink"
+        except OSError:
+            pass
+
+    shutil.copyfile(cache_path, target_path)
+    return "copy"
@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from oni_ai.client import OniApiClient
+from oni_ai.live_state import LiveStatePrefetch
+from oni_ai.state_digest import summarize_duplicants
+
+
+LOGGER = logging.getLogger("oni_ai")
+AUTOPILOT_ENDPOINTS = ("/state", "/actions/pending", "/speed")
+
+
+@dataclass
+class AutopilotPolicy:
+    min_interval_seconds: float = 10.0
+    max_interval_seconds: float = 120.0
+    backoff_factor: float = 2.0
+    cooldown_seconds: float = 30.0
+    stress_threshold: float = 60.0
+    breath_threshold: float = 50.0
+    request_timeout_seconds: float = 3.0
+
+
+@dataclass
+class Observation:
+    """The few colony signals the change detector looks at, reduced from one poll."""
+
+    cycle: int | None = None
+    idle: frozenset[str] = frozenset()
+    max_stress: float | None = None
+    min_breath: float | None = None
+    pending_count: int | None = None
+    paused: bool | None = None
+
+
+def _body(snapshot: dict, path: str) -> dict | None:
+    result = (snapshot.get("endpoints") or {}).get(path)
+    if not isinstance(result, dict) or result.get("status") != 200 or not isinstance(result.get("body"), dict):
+        return None
+    return result["body"]
+
+
+def observe(snapshot: dict) -> Observation | None:
+    """Reduce a ``/state`` + ``/actions/pending`` + ``/speed`` poll; ``None`` when ``/state`` failed."""
+    state_body = _body(snapshot, "/state")
+    if state_body is None:
+        return None
+    state = state_body["state"] if isinstance(state_body.get("state"), dict) else state_body
+    context = state.get("context") if isinstance(state.get("context"), dict) else {}
+    duplicants = summarize_duplicants(state.get("duplicants") or [], top_n=1)
+    stats = duplicants["stats"]
+
+    pending_body = _body(snapshot, "/actions/pending")
+    pending = pending_body.get("pending_actions") if pending_body is not None else state.get("pending_actions")
+    speed_body = _body(snapshot, "/speed")
+    paused = speed_body.get("paused") if speed_body is not None else context.get("paused")
+    cycle = context.get("cycle")
+    return Observation(
+        cycle=int(cycle) if isinstance(cycle, (int, float)) and not isinstance(cycle, bool) else None,
+        idle=frozenset(duplicants["idle"]),
+        max_stress=stats["stress"]["max"] if "stress" in stats else None,
+        min_breath=stats["breath"]["min"] if "breath" in stats else None,
+        pending_count=len(pending) if isinstance(pending, list) else None,
+        paused=paused if isinstance(paused, bool) else None,
+    )
+
+
+class ChangeDetector:
+    """Report why a new observation deserves a model run, relative to the last one that got one."""
+
+    def __init__(self, policy: AutopilotPolicy) -> None:
+        self.policy = policy
+        self.baseline: Observation | None = None
+
+    def reasons(self, current: Observation) -> list[str]:
+        baseline = self.baseline
+        if baseline is None:
+            return ["initial"]
+
+        reasons = []
+        if current.cycle is not None and baseline.cycle is not None and current.cycle > baseline.cycle:
+            reasons.append("new_cycle")
+        if current.idle - baseline.idle:
+            reasons.append("idle_duplicants")
+        if current.max_stress is not None and current.max_stress >= self.policy.stress_threshold:
+            if baseline.max_stress is None or baseline.max_stress < self.policy.stress_threshold:
+                reasons.append("high_stress")
+        if current.min_breath is not None and current.min_breath < self.policy.breath_threshold:
+            if baseline.min_breath is None or baseline.min_breath >= self.policy.breath_threshold:
+                reasons.append("low_oxygen")
+        if current.pending_count == 0 and (baseline.pending_count or 0) > 0:
+            reasons.append("queue_drained")
+        return reasons
+
+    def accept(self, current: Observation) -> None:
+        self.baseline = current
+
+
+@dataclass
+class AutopilotStats:
+    polls: int = 0
+    poll_errors: int = 0
+    triggers: int = 0
+    skipped_busy: int = 0
+    skipped_cooldown: int = 0
+    skipped_rejected: int = 0
+    stable_polls: int = 0
+    interval_seconds: float = 0.0
+    last_reasons: list[str] = field(default_factory=list)
+    last_job_id: str | None = None
+
+
+class Autopilot:
+    """Bridge-driven control loop: poll the ONI API, run analysis only when the colony changed.
+
+    The poll interval starts at ``min_interval_seconds``, grows by
+    ``backoff_factor`` after every poll that finds nothing new (or fails) up
+    to ``max_interval_seconds``, and snaps back to the minimum whenever a run
+    is triggered. ``submit(snapshot, reasons)`` starts an analyze job and
+    returns its id; ``is_busy(job_id)`` keeps the loop from stacking runs.
+    """
+
+    def __init__(
+        self,
+        client: OniApiClient,
+        submit: Callable[[dict, list[str]], str | None],
+        is_busy: Callable[[str], bool],
+        policy: AutopilotPolicy | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.client = client
+        self.submit = submit
+        self.is_busy = is_busy
+        self.policy = policy or AutopilotPolicy()
+        self.detector = ChangeDetector(self.policy)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._interval = self.policy.min_interval_seconds
+        self._last_trigger_at: float | None = None
+        self._stats = AutopilotStats(interval_seconds=self._interval)
+
+    def poll(self) -> dict:
+        endpoints = [(path, self.policy.request_timeout_seconds) for path in AUTOPILOT_ENDPOINTS]
+        return LiveStatePrefetch(self.client, endpoints).start().collect()
+
+    def _back_off(self) -> float:
+        self._interval = min(self.policy.max_interval_seconds, self._interval * self.policy.backoff_factor)
+        return self._interval
+
+    def tick(self) -> float:
+        """Run one poll/decide step and return how long to wait before the next one."""
+        with self._lock:
+            job_id = self._stats.last_job_id
+        if job_id is not None and self.is_busy(job_id):
+            with self._lock:
+                self._stats.skipped_busy += 1
+            return self.policy.min_interval_seconds
+
+        snapshot = self.poll()
+        current = observe(snapshot)
+        with self._lock:
+            self._stats.polls += 1
+            if current is None:
+                self._stats.poll_errors += 1
+                self._stats.interval_seconds = self._back_off()
+                return self._interval
+
+            reasons = self.detector.reasons(current)
+            if not reasons:
+                self._stats.stable_polls += 1
+                self._stats.interval_seconds = self._back_off()
+                return self._interval
+
+            now = self.clock()
+            if self._last_trigger_at is not None:
+                remaining = self.policy.cooldown_seconds - (now - self._last_trigger_at)
+                if remaining > 0:
+                    self._stats.skipped_cooldown += 1
+                    return max(remaining, 0.1)
+
+        job_id = self.submit(snapshot, reasons)
+        if job_id is None:
+            # The job queue turned the run down; keep the baseline so the same change fires again.
+            LOGGER.info("autopilot submission rejected reasons=%s cycle=%s", reasons, current.cycle)
+            with self._lock:
+                self._stats.skipped_rejected += 1
+                self._stats.interval_seconds = self._back_off()
+                return self._interval
+
+        LOGGER.info("autopilot triggered reasons=%s job=%s cycle=%s", reasons, job_id, current.cycle)
+        with self._lock:
+            self.detector.accept(current)
+            self._last_trigger_at = self.clock()
+            self._interval = self.policy.min_interval_seconds
+            self._stats.triggers += 1
+            self._stats.last_reasons = reasons
+            self._stats.last_job_id = job_id
+            self._stats.interval_seconds = self._interval
+            return self._interval
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="oni-ai-autopilot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                wait_seconds = self.tick()
+            except Exception:  # keep the loop alive across unexpected API or job errors
+                LOGGER.exception("autopilot tick failed base_url=%s", self.client.base_url)
+                with self._lock:
+                    self._stats.poll_errors += 1
+                    wait_seconds = self._back_off()
+            self._stop.wait(wait_seconds)
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            stats = self._stats
+            return {
+                "base_url": self.client.base_url,
+                "polls": stats.polls,
+                "poll_errors": stats.poll_errors,
+                "triggers": stats.triggers,
+                "skipped_busy": stats.skipped_busy,
+                "skipped_cooldown": stats.skipped_cooldown,
+                "skipped_rejected": stats.skipped_rejected,
+                "stable_polls": stats.stable_polls,
+                "interval_seconds": stats.interval_seconds,
+                "last_reasons": list(stats.last_reasons),
+                "last_job_id": stats.last_job_id,
+            }
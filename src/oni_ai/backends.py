@@ -0,0 +1,465 @@
+import json
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+
+LOGGER = logging.getLogger("oni_ai")
+DECISION_BACKENDS = {"exec", "worker", "fake"}
+WORKER_BACKENDS_LOCK = threading.Lock()
+WORKER_BACKENDS: dict[tuple[str, ...], "WorkerBackend"] = {}
+
+OutputCallback = Callable[[str, str], None]
+
+
+@dataclass
+class DecisionRequest:
+    request_tag: str
+    request_dir: str
+    prompt: str
+    last_message_path: Path
+    timeout_seconds: int = 0
+
+
+@dataclass
+class DecisionResult:
+    return_code: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    invoke_error: str | None = None
+
+
+class DecisionBackend:
+    """Produces a model decision for one request.
+
+    Backends stream output lines through ``on_output(stream, line)`` and leave
+    the final model message in ``request.last_message_path`` when they have one.
+    """
+
+    name = "base"
+
+    def run(self, request: DecisionRequest, on_output: OutputCallback) -> DecisionResult:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.name
+
+    def close(self) -> None:
+        return
+
+
+class ExecBackend(DecisionBackend):
+    """Spawns one ``codex exec`` process per request."""
+
+    name = "exec"
+
+    def __init__(self, codex_cmd_parts: list[str], sandbox_mode: str, skip_git_repo_check: bool) -> None:
+        self.codex_cmd_parts = codex_cmd_parts
+        self.sandbox_mode = sandbox_mode
+        self.skip_git_repo_check = skip_git_repo_check
+
+    def describe(self) -> str:
+        return (
+            f"exec cmd={shlex.join(self.codex_cmd_parts)} sandbox={self.sandbox_mode} "
+            f"skip_git_repo_check={self.skip_git_repo_check}"
+        )
+
+    def build_command(self, request: DecisionRequest) -> list[str]:
+        command = [*self.codex_cmd_parts, "exec", "-s", self.sandbox_mode, "-o", str(request.last_message_path)]
+        if self.skip_git_repo_check:
+            command.append("--skip-git-repo-check")
+        command.append(request.prompt)
+        return command
+
+    def run(self, request: DecisionRequest, on_output: OutputCallback) -> DecisionResult:
+        stdout_chunks: list[str] = []
+        stderr_chunks: list[str] = []
+
+        def stream_reader(stream, is_stderr: bool) -> None:
+            if stream is None:
+                return
+
+            prefix = "stderr" if is_stderr else "stdout"
+            for raw_line in iter(stream.readline, ""):
+                if is_stderr:
+                    stderr_chunks.append(raw_line)
+                else:
+                    stdout_chunks.append(raw_line)
+
+                line = raw_line.rstrip("\n")
+                if line:
+                    on_output(prefix, line)
+
+            stream.close()
+
+        timed_out = False
+        try:
+            process = subprocess.Popen(
+                self.build_command(request),
+                cwd=request.request_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+            stdout_thread = threading.Thread(target=stream_reader, args=(process.stdout, False), daemon=True)
+            stderr_thread = threading.Thread(target=stream_reader, args=(process.stderr, True), daemon=True)
+            stdout_thread.start()
+            stderr_thread.start()
+
+            try:
+                if request.timeout_seconds > 0:
+                    process.wait(timeout=request.timeout_seconds)
+                else:
+                    process.wait()
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                LOGGER.error(
+                    "request=%s codex timed out after %ss; terminating process",
+                    request.request_tag,
+                    request.timeout_seconds,
+                )
+                process.kill()
+                process.wait()
+
+            stdout_thread.join(timeout=5)
+            stderr_thread.join(timeout=5)
+
+            if timed_out:
+                stderr_chunks.append(f"Timed out after {request.timeout_seconds} seconds\n")
+        except (subprocess.SubprocessError, OSError, ValueError) as exc:
+            return DecisionResult(return_code=-1, stdout="", stderr="", invoke_error=str(exc))
+
+        return_code = process.returncode if process.returncode is not None else -1
+        return DecisionResult(
+            return_code=return_code,
+            stdout="".join(stdout_chunks),
+            stderr="".join(stderr_chunks),
+            timed_out=timed_out,
+        )
+
+
+class WorkerProcess:
+    def __init__(self, command: list[str]) -> None:
+        self.command = command
+        self.lines: queue.Queue[tuple[str, str | None]] = queue.Queue()
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        for stream, name in ((self.process.stdout, "stdout"), (self.process.stderr, "stderr")):
+            threading.Thread(target=self._pump, args=(stream, name), daemon=True).start()
+
+    def _pump(self, stream, name: str) -> None:
+        for raw_line in iter(stream.readline, ""):
+            self.lines.put((name, raw_line))
+        stream.close()
+        self.lines.put((name, None))
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def drain(self) -> list[tuple[str, str]]:
+        """Drop lines already read but not consumed; end-of-stream markers are kept."""
+        dropped: list[tuple[str, str]] = []
+        closed: list[tuple[str, None]] = []
+        while True:
+            try:
+                stream, raw_line = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            if raw_line is None:
+                closed.append((stream, None))
+            else:
+                dropped.append((stream, raw_line))
+        for item in closed:
+            self.lines.put(item)
+        return dropped
+
+    def send(self, message: dict) -> None:
+        assert self.process.stdin is not None
+        self.process.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+        self.process.stdin.flush()
+
+    def kill(self) -> None:
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class WorkerBackend(DecisionBackend):
+    """Feeds requests to long-lived worker processes over a JSON-lines pipe.
+
+    Each request is written to the worker's stdin as one line:
+    ``{"id", "request_dir", "prompt", "output_last_message"}``. The worker may
+    print any number of log lines (plain text or ``{"id", "type": "output",
+    "stream", "line"}``) and finishes the request with
+    ``{"id", "type": "result", "exit_code", "last_message"}``. Idle workers are
+    pooled, so startup, auth and schema loading are paid once per process.
+    Plain lines a worker prints between requests are dropped before the next
+    request is sent, so they never show up in another request's output.
+
+    The bridge does not ship a worker: ``codex exec`` has no mode that serves
+    several requests from one process, so pointing ``ONI_AI_WORKER_CMD`` at a
+    wrapper that still runs ``codex exec`` per request keeps its startup cost.
+    """
+
+    name = "worker"
+
+    def __init__(self, worker_cmd_parts: list[str]) -> None:
+        self.worker_cmd_parts = worker_cmd_parts
+        self._lock = threading.Lock()
+        self._idle: list[WorkerProcess] = []
+        self._spawned = 0
+
+    def describe(self) -> str:
+        return f"worker cmd={shlex.join(self.worker_cmd_parts)} spawned={self._spawned}"
+
+    def _acquire(self) -> WorkerProcess:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+            self._spawned += 1
+
+        LOGGER.info("starting decision worker cmd=%s", shlex.join(self.worker_cmd_parts))
+        return WorkerProcess(self.worker_cmd_parts)
+
+    def _release(self, worker: WorkerProcess) -> None:
+        if not worker.is_alive():
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def run(self, request: DecisionRequest, on_output: OutputCallback) -> DecisionResult:
+        try:
+            worker = self._acquire()
+        except (OSError, ValueError) as exc:
+            return DecisionResult(return_code=-1, stdout="", stderr="", invoke_error=str(exc))
+
+        stale = worker.drain()
+        if stale:
+            LOGGER.warning(
+                "request=%s dropped %s decision worker lines left over from an earlier request",
+                request.request_tag,
+                len(stale),
+            )
+
+        message_id = uuid.uuid4().hex
+        stdout_chunks: list[str] = []
+        stderr_chunks: list[str] = []
+        deadline = time.monotonic() + request.timeout_seconds if request.timeout_seconds > 0 else None
+
+        try:
+            worker.send(
+                {
+                    "id": message_id,
+                    "request_dir": request.request_dir,
+                    "prompt": request.prompt,
+                    "output_last_message": str(request.last_message_path),
+                }
+            )
+        except (OSError, ValueError) as exc:
+            worker.kill()
+            return DecisionResult(return_code=-1, stdout="", stderr="", invoke_error=str(exc))
+
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                LOGGER.error(
+                    "request=%s decision worker timed out after %ss; killing worker",
+                    request.request_tag,
+                    request.timeout_seconds,
+                )
+                worker.kill()
+                stderr_chunks.append(f"Timed out after {request.timeout_seconds} seconds\n")
+                return DecisionResult(
+                    return_code=-1,
+                    stdout="".join(stdout_chunks),
+                    stderr="".join(stderr_chunks),
+                    timed_out=True,
+                )
+
+            try:
+                stream, raw_line = worker.lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+
+            if raw_line is None:
+                if stream == "stdout":
+                    worker.kill()
+                    return_code = worker.process.returncode if worker.process.returncode is not None else -1
+                    stderr_chunks.append("decision worker exited before returning a result\n")
+                    return DecisionResult(
+                        return_code=return_code or -1,
+                        stdout="".join(stdout_chunks),
+                        stderr="".join(stderr_chunks),
+                    )
+                continue
+
+            if stream == "stderr":
+                stderr_chunks.append(raw_line)
+                if raw_line.strip():
+                    on_output("stderr", raw_line.rstrip("\n"))
+                continue
+
+            try:
+                message = json.loads(raw_line)
+            except json.JSONDecodeError:
+                message = None
+
+            if isinstance(message, dict) and "id" in message and message["id"] != message_id:
+                # Left over from an earlier request on this worker; it must not leak into this one.
+                LOGGER.warning(
+                    "request=%s dropped decision worker message for id=%s type=%s",
+                    request.request_tag,
+                    message["id"],
+                    message.get("type"),
+                )
+                continue
+
+            if not isinstance(message, dict) or message.get("id") != message_id:
+                stdout_chunks.append(raw_line)
+                if raw_line.strip():
+                    on_output("stdout", raw_line.rstrip("\n"))
+                continue
+
+            if message.get("type") == "output":
+                line = str(message.get("line", ""))
+                target = stderr_chunks if message.get("stream") == "stderr" else stdout_chunks
+                target.append(line + "\n")
+                on_output("stderr" if message.get("stream") == "stderr" else "stdout", line)
+                continue
+
+            if message.get("type") == "result":
+                self._release(worker)
+                return_code = message.get("exit_code", 0)
+                if isinstance(return_code, bool) or not isinstance(return_code, int):
+                    LOGGER.warning(
+                        "request=%s decision worker sent invalid exit_code=%r; using -1",
+                        request.request_tag,
+                        return_code,
+                    )
+                    return_code = -1
+                last_message = message.get("last_message")
+                if isinstance(last_message, str) and last_message:
+                    try:
+                        request.last_message_path.write_text(last_message, encoding="utf-8")
+                    except OSError as exc:
+                        return DecisionResult(
+                            return_code=-1,
+                            stdout="".join(stdout_chunks),
+                            stderr="".join(stderr_chunks),
+                            invoke_error=f"could not write decision worker last message: {exc}",
+                        )
+                return DecisionResult(
+                    return_code=return_code,
+                    stdout="".join(stdout_chunks),
+                    stderr="".join(stderr_chunks),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+
+class FakeBackend(DecisionBackend):
+    """In-process stand-in that answers every request with a canned message."""
+
+    name = "fake"
+
+    def __init__(self, response_text: str, latency_seconds: float = 0.0) -> None:
+        self.response_text = response_text
+        self.latency_seconds = latency_seconds
+
+    def describe(self) -> str:
+        return f"fake latency={self.latency_seconds}s"
+
+    def run(self, request: DecisionRequest, on_output: OutputCallback) -> DecisionResult:
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+
+        for line in self.response_text.splitlines():
+            if line.strip():
+                on_output("stdout", line)
+
+        request.last_message_path.write_text(self.response_text, encoding="utf-8")
+        return DecisionResult(return_code=0, stdout=self.response_text + "\n", stderr="")
+
+
+class RecordedBackend(DecisionBackend):
+    """Replays one recorded run: its output lines, final message and exit code."""
+
+    name = "recorded"
+
+    def __init__(
+        self,
+        stdout: str,
+        stderr: str = "",
+        return_code: int = 0,
+        last_message: str | None = None,
+        latency_seconds: float = 0.0,
+    ) -> None:
+        self.stdout = stdout
+        self.stderr = stderr
+        self.return_code = return_code
+        self.last_message = last_message
+        self.latency_seconds = latency_seconds
+
+    def describe(self) -> str:
+        return f"recorded exit={self.return_code} latency={self.latency_seconds}s"
+
+    def run(self, request: DecisionRequest, on_output: OutputCallback) -> DecisionResult:
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+
+        for stream, text in (("stdout", self.stdout), ("stderr", self.stderr)):
+            for line in text.splitlines():
+                if line.strip():
+                    on_output(stream, line)
+
+        if self.last_message is not None:
+            request.last_message_path.write_text(self.last_message, encoding="utf-8")
+        return DecisionResult(return_code=self.return_code, stdout=self.stdout, stderr=self.stderr)
+
+
+def get_worker_backend(worker_cmd_parts: list[str]) -> WorkerBackend:
+    key = tuple(worker_cmd_parts)
+    with WORKER_BACKENDS_LOCK:
+        backend = WORKER_BACKENDS.get(key)
+        if backend is None:
+            backend = WorkerBackend(worker_cmd_parts)
+            WORKER_BACKENDS[key] = backend
+        return backend
+
+
+def close_worker_backends() -> None:
+    with WORKER_BACKENDS_LOCK:
+        backends = list(WORKER_BACKENDS.values())
+        WORKER_BACKENDS.clear()
+
+    for backend in backends:
+        backend.close()
+
+
+def load_fake_response() -> str:
+    response_path = os.getenv("ONI_AI_FAKE_RESPONSE_PATH", "").strip()
+    if response_path:
+        return Path(response_path).read_text(encoding="utf-8")
+    return os.getenv("ONI_AI_FAKE_RESPONSE", "").strip() or json.dumps({"actions": []})
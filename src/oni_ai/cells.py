@@ -0,0 +1,264 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from oni_ai.client import OniApiClient
+
+
+LOGGER = logging.getLogger("oni_ai")
+MAX_CELL_RADIUS = 20
+
+Point = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Region:
+    """Inclusive cell bounding box, optionally narrowed to a polygon."""
+
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    polygon: tuple[Point, ...] = ()
+
+    @classmethod
+    def box(cls, x0: int, y0: int, x1: int, y1: int) -> "Region":
+        return cls(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+    @classmethod
+    def from_polygon(cls, vertices: list[Point]) -> "Region":
+        if len(vertices) < 3:
+            raise ValueError("polygon needs at least 3 vertices")
+        xs = [int(x) for x, _ in vertices]
+        ys = [int(y) for _, y in vertices]
+        return cls(min(xs), min(ys), max(xs), max(ys), tuple((int(x), int(y)) for x, y in vertices))
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0 + 1
+
+    @property
+    def height(self) -> int:
+        return self.y1 - self.y0 + 1
+
+    def contains(self, x: int, y: int) -> bool:
+        if not (self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1):
+            return False
+        if not self.polygon:
+            return True
+        return _point_in_polygon(x, y, self.polygon)
+
+    def cells(self) -> list[Point]:
+        return [
+            (x, y)
+            for y in range(self.y0, self.y1 + 1)
+            for x in range(self.x0, self.x1 + 1)
+            if self.contains(x, y)
+        ]
+
+
+def _on_segment(x: int, y: int, a: Point, b: Point) -> bool:
+    cross = (b[0] - a[0]) * (y - a[1]) - (b[1] - a[1]) * (x - a[0])
+    return cross == 0 and min(a[0], b[0]) <= x <= max(a[0], b[0]) and min(a[1], b[1]) <= y <= max(a[1], b[1])
+
+
+def _point_in_polygon(x: int, y: int, polygon: tuple[Point, ...]) -> bool:
+    inside = False
+    for index, a in enumerate(polygon):
+        b = polygon[(index + 1) % len(polygon)]
+        if _on_segment(x, y, a, b):
+            return True
+        if (a[1] > y) != (b[1] > y):
+            crossing_x = a[0] + (y - a[1]) * (b[0] - a[0]) / (b[1] - a[1])
+            if x < crossing_x:
+                inside = not inside
+    return inside
+
+
+@dataclass(frozen=True)
+class CellQuery:
+    x: int
+    y: int
+    radius: int
+
+    def covers(self, x: int, y: int) -> bool:
+        return abs(x - self.x) <= self.radius and abs(y - self.y) <= self.radius
+
+
+def tile_region(region: Region, wanted: set[Point] | None = None, max_radius: int = MAX_CELL_RADIUS) -> list[CellQuery]:
+    """Cover ``wanted`` cells (default: all cells of ``region``) with square ``/cells`` windows.
+
+    The region is cut into blocks of at most ``2 * max_radius + 1`` cells per
+    side; blocks without wanted cells are skipped and each query uses the
+    smallest radius that still covers its block.
+    """
+    wanted = set(region.cells()) if wanted is None else wanted
+    span = 2 * max_radius + 1
+    blocks: dict[Point, list[Point]] = {}
+    for x, y in wanted:
+        blocks.setdefault(((x - region.x0) // span, (y - region.y0) // span), []).append((x, y))
+
+    queries = []
+    for _, block in sorted(blocks.items(), key=lambda item: (item[0][1], item[0][0])):
+        xs = [x for x, _ in block]
+        ys = [y for _, y in block]
+        # Shrink to the wanted cells inside this block before centering the window.
+        low_x, high_x, low_y, high_y = min(xs), max(xs), min(ys), max(ys)
+        radius = max(high_x - low_x + 1, high_y - low_y + 1) // 2
+        queries.append(CellQuery((low_x + high_x + 1) // 2, (low_y + high_y + 1) // 2, radius))
+    return queries
+
+
+@dataclass
+class CellGrid:
+    """Dense row-major view of inspected cells; ``None`` marks cells outside the region or not returned."""
+
+    region: Region
+    cells: list[dict | None] = field(default_factory=list)
+
+    def index(self, x: int, y: int) -> int | None:
+        if not (self.region.x0 <= x <= self.region.x1 and self.region.y0 <= y <= self.region.y1):
+            return None
+        return (y - self.region.y0) * self.region.width + (x - self.region.x0)
+
+    def get(self, x: int, y: int) -> dict | None:
+        index = self.index(x, y)
+        return self.cells[index] if index is not None else None
+
+    def rows(self) -> list[list[dict | None]]:
+        width = self.region.width
+        return [self.cells[offset : offset + width] for offset in range(0, len(self.cells), width)]
+
+    def missing(self) -> list[Point]:
+        return [(x, y) for (x, y) in self.region.cells() if self.get(x, y) is None]
+
+
+class CellCache:
+    """Per-cycle cell facts; entries from older cycles are dropped once ``max_cycles`` newer ones exist."""
+
+    def __init__(self, max_cycles: int = 2) -> None:
+        self.max_cycles = max(1, max_cycles)
+        self._lock = threading.Lock()
+        self._cycles: "OrderedDict[object, dict[Point, dict]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def lookup(self, cycle: object, points: list[Point]) -> tuple[dict[Point, dict], set[Point]]:
+        with self._lock:
+            cached = self._cycles.get(cycle, {})
+            found = {point: cached[point] for point in points if point in cached}
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(points) - len(found)
+        return found, {point for point in points if point not in found}
+
+    def store(self, cycle: object, cells: dict[Point, dict]) -> None:
+        with self._lock:
+            bucket = self._cycles.setdefault(cycle, {})
+            bucket.update(cells)
+            self._cycles.move_to_end(cycle)
+            while len(self._cycles) > self.max_cycles:
+                self._cycles.popitem(last=False)
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {"cycles": list(self._cycles), "cells": sum(map(len, self._cycles.values())), **self._stats}
+
+
+class CellInspector:
+    """Fetch ``/cells`` facts for whole regions with concurrent tiled queries and a per-cycle cache."""
+
+    def __init__(
+        self,
+        client: OniApiClient,
+        cache: CellCache | None = None,
+        max_workers: int = 8,
+        timeout_seconds: float = 5.0,
+    ) -> None:
+        self.client = client
+        self.cache = cache if cache is not None else CellCache()
+        self.max_workers = max(1, max_workers)
+        self.timeout_seconds = timeout_seconds
+
+    def fetch_query(self, query: CellQuery) -> list[dict]:
+        response = self.client.get_json(
+            f"/cells?x={query.x}&y={query.y}&radius={query.radius}",
+            timeout_seconds=self.timeout_seconds,
+        )
+        if response.status != 200 or not isinstance(response.body, dict):
+            raise RuntimeError(f"cells_request_failed status={response.status} x={query.x} y={query.y}")
+        cells = response.body.get("cells")
+        return [cell for cell in cells if isinstance(cell, dict)] if isinstance(cells, list) else []
+
+    def inspect_points(self, points: list[Point], cycle: object = None) -> dict[Point, dict]:
+        """Facts for scattered ``points``; only the blocks holding uncached points are fetched."""
+        points = list(dict.fromkeys(points))
+        found, missing = self.cache.lookup(cycle, points)
+        if not missing:
+            return found
+
+        bounds = Region.box(
+            min(x for x, _ in missing),
+            min(y for _, y in missing),
+            max(x for x, _ in missing),
+            max(y for _, y in missing),
+        )
+        queries = tile_region(bounds, missing)
+        fetched: dict[Point, dict] = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as executor:
+            for cells in executor.map(self.fetch_query, queries):
+                for cell in cells:
+                    x, y = cell.get("x"), cell.get("y")
+                    if isinstance(x, int) and isinstance(y, int):
+                        fetched.setdefault((x, y), cell)
+        self.cache.store(cycle, fetched)
+        found.update({point: fetched[point] for point in missing if point in fetched})
+        LOGGER.debug(
+            "cells points=%s queries=%s fetched=%s cached=%s",
+            len(points),
+            len(queries),
+            len(fetched),
+            len(points) - len(missing),
+        )
+        return found
+
+    def inspect(self, region: Region, cycle: object = None) -> CellGrid:
+        found = self.inspect_points(region.cells(), cycle)
+        grid = CellGrid(region, [None] * (region.width * region.height))
+        for (x, y), cell in found.items():
+            grid.cells[grid.index(x, y)] = cell
+        return grid
+
+
+class RecordedCellInspector:
+    """Answer ``inspect_points`` from cell facts saved by an earlier run, so replays need no game."""
+
+    def __init__(self, cells: list[dict]) -> None:
+        self.cells: dict[Point, dict] = {}
+        for cell in cells:
+            x, y = cell.get("x"), cell.get("y")
+            if isinstance(x, int) and isinstance(y, int):
+                self.cells[(x, y)] = cell
+
+    def inspect_points(self, points: list[Point], cycle: object = None) -> dict[Point, dict]:
+        return {point: self.cells[point] for point in dict.fromkeys(points) if point in self.cells}
+
+
+CELL_CACHES_LOCK = threading.Lock()
+CELL_CACHES: dict[str, CellCache] = {}
+
+
+def get_cell_cache(base_url: str) -> CellCache:
+    """Return the shared per-cycle cache for ``base_url`` so repeated plans reuse fetched cells."""
+    key = base_url.rstrip("/")
+    with CELL_CACHES_LOCK:
+        cache = CELL_CACHES.get(key)
+        if cache is None:
+            cache = CellCache()
+            CELL_CACHES[key] = cache
+        return cache
+
+
+def clear_cell_caches() -> None:
+    with CELL_CACHES_LOCK:
+        CELL_CACHES.clear()
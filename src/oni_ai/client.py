@@ -0,0 +1,357 @@
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from oni_ai.schema_validation import OPENAPI_PATH, Validator, compile_schema, load_openapi_spec, resolve_refs
+
+
+LOGGER = logging.getLogger("oni_ai")
+RETRYABLE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+# Errors worth another attempt with backoff; timeouts are not, they already spent the request's budget.
+TRANSIENT_ERRORS = (ConnectionRefusedError, *RETRYABLE_CONNECTION_ERRORS)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+# Per-endpoint defaults for calls that pass no timeout; the catalogs are built on the Unity main thread.
+DEFAULT_ENDPOINT_TIMEOUTS = {"/buildings": 10.0, "/research": 10.0}
+# Slow-changing resources served from a short-lived cache, then revalidated with ETag/Last-Modified.
+DEFAULT_CACHE_TTLS = {"/buildings": 30.0, "/research": 30.0}
+RESPONSE_VALIDATORS_LOCK = threading.Lock()
+RESPONSE_VALIDATORS_CACHE: dict[Path, dict[tuple[str, str], Validator] | None] = {}
+
+
+@dataclass
+class ApiResponse:
+    status: int
+    body: object
+    elapsed_ms: int
+    headers: dict[str, str]
+    cached: bool = False
+    schema_errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class RetryPolicy:
+    """Bounded retries with full jitter for idempotent requests, kept inside the request's timeout."""
+
+    attempts: int = 3
+    base_delay_seconds: float = 0.05
+    max_delay_seconds: float = 0.5
+    retry_statuses: frozenset[int] = frozenset({502, 503, 504})
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2**attempt))
+
+
+@dataclass
+class CachedResponse:
+    response: ApiResponse
+    fresh_until: float
+    etag: str | None
+    last_modified: str | None
+
+
+def _route(path: str) -> str:
+    return path.partition("?")[0]
+
+
+def compile_response_validators(spec: dict) -> dict[tuple[str, str], Validator]:
+    """Validators for the JSON ``200`` response of every operation, keyed by ``(METHOD, path template)``."""
+    validators = {}
+    paths = spec.get("paths") if isinstance(spec.get("paths"), dict) else {}
+    for template, operations in paths.items():
+        for method, operation in (operations or {}).items():
+            response = ((operation or {}).get("responses") or {}).get("200") or {}
+            schema = ((response.get("content") or {}).get("application/json") or {}).get("schema")
+            if isinstance(schema, dict):
+                validators[(method.upper(), template)] = compile_schema(resolve_refs(schema, spec))
+    return validators
+
+
+def load_response_validators(path: Path = OPENAPI_PATH) -> dict[tuple[str, str], Validator] | None:
+    with RESPONSE_VALIDATORS_LOCK:
+        if path not in RESPONSE_VALIDATORS_CACHE:
+            spec = load_openapi_spec(path)
+            RESPONSE_VALIDATORS_CACHE[path] = compile_response_validators(spec) if spec is not None else None
+        return RESPONSE_VALIDATORS_CACHE[path]
+
+
+def match_route(route: str, templates) -> str | None:
+    """Find the OpenAPI path template (``/cells/{x}/{y}``) that ``route`` instantiates."""
+    if route in templates:
+        return route
+    parts = route.strip("/").split("/")
+    for template in templates:
+        template_parts = template.strip("/").split("/")
+        if len(template_parts) == len(parts) and all(
+            expected == actual or (expected.startswith("{") and expected.endswith("}"))
+            for expected, actual in zip(template_parts, parts)
+        ):
+            return template
+    return None
+
+
+class OniApiClient:
+    """Keep-alive HTTP client for the ONI-side API with a small pool of idle connections.
+
+    Connections are checked out per request, so one client can be shared by
+    concurrent callers; each request carries its own timeout, falling back to
+    ``endpoint_timeouts`` and then ``default_timeout_seconds``. Idempotent
+    requests are retried per ``retry``; GETs of the ``cache_ttls`` paths are
+    answered from memory while fresh and revalidated with conditional
+    headers afterwards (cached bodies are shared, treat them as read-only).
+    With ``response_validators`` every 2xx JSON body is checked against the
+    OpenAPI response schema and problems land in ``schema_errors``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_idle: int = 4,
+        default_timeout_seconds: float = 5.0,
+        endpoint_timeouts: dict[str, float] | None = None,
+        retry: RetryPolicy | None = None,
+        cache_ttls: dict[str, float] | None = None,
+        response_validators: dict[tuple[str, str], Validator] | None = None,
+    ) -> None:
+        parts = urlsplit(base_url.rstrip("/"))
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise ValueError(f"unsupported api_base_url: {base_url}")
+
+        self.base_url = base_url.rstrip("/")
+        self.max_idle = max(0, max_idle)
+        self.default_timeout_seconds = default_timeout_seconds
+        self.endpoint_timeouts = DEFAULT_ENDPOINT_TIMEOUTS if endpoint_timeouts is None else endpoint_timeouts
+        self.retry = retry or RetryPolicy()
+        self.cache_ttls = DEFAULT_CACHE_TTLS if cache_ttls is None else cache_ttls
+        self.response_validators = response_validators
+        self._validator_routes: dict[tuple[str, str], str | None] = {}
+        self._cache: dict[str, CachedResponse] = {}
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path_prefix = parts.path.rstrip("/")
+        self._lock = threading.Lock()
+        self._idle: list[http.client.HTTPConnection] = []
+        self._stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "errors": 0,
+            "retries": 0,
+            "cache_hits": 0,
+            "cache_revalidated": 0,
+            "schema_errors": 0,
+        }
+
+    def _new_connection(self, timeout_seconds: float) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+        with self._lock:
+            self._stats["connections_opened"] += 1
+        return connection_class(self._host, self._port, timeout=timeout_seconds)
+
+    def _checkout(self, timeout_seconds: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                connection = self._idle.pop()
+                self._stats["connections_reused"] += 1
+                connection.timeout = timeout_seconds
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout_seconds)
+                return connection, True
+        return self._new_connection(timeout_seconds), False
+
+    def _checkin(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: dict | None = None,
+        timeout_seconds: float | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> ApiResponse:
+        """Send one request and decode a JSON body (``None`` when empty).
+
+        A pooled connection the server already closed is retried once on a
+        fresh connection. GET/HEAD requests are also retried after refused or
+        reset connections and ``retry_statuses`` responses, as long as the
+        backoff still fits in the timeout; other failures propagate.
+        """
+        route = _route(path)
+        if timeout_seconds is None:
+            timeout_seconds = self.endpoint_timeouts.get(route, self.default_timeout_seconds)
+        request_headers = {"Accept": "application/json", **(headers or {})}
+        payload_bytes = None
+        if body is not None:
+            payload_bytes = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            request_headers["Content-Type"] = "application/json"
+
+        ttl = self.cache_ttls.get(route) if method == "GET" else None
+        cached = None
+        if ttl is not None:
+            with self._lock:
+                cached = self._cache.get(path)
+                if cached is not None and time.monotonic() < cached.fresh_until:
+                    self._stats["cache_hits"] += 1
+                    return ApiResponse(cached.response.status, cached.response.body, 0, cached.response.headers, cached=True)
+            if cached is not None:
+                if cached.etag:
+                    request_headers.setdefault("If-None-Match", cached.etag)
+                if cached.last_modified:
+                    request_headers.setdefault("If-Modified-Since", cached.last_modified)
+        elif method != "GET":
+            self._invalidate(route)
+
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            with self._lock:
+                self._stats["requests"] += 1
+            try:
+                status, raw_body, response_headers = self._send(method, path, payload_bytes, request_headers, timeout_seconds)
+            except TRANSIENT_ERRORS:
+                if not self._can_retry(method, attempt, started_at, timeout_seconds):
+                    raise
+            else:
+                if status not in self.retry.retry_statuses or not self._can_retry(method, attempt, started_at, timeout_seconds):
+                    break
+            attempt += 1
+
+        elapsed_ms = int((time.monotonic() - started_at) * 1000)
+        if status == 304 and cached is not None:
+            with self._lock:
+                cached.fresh_until = time.monotonic() + ttl
+                self._stats["cache_revalidated"] += 1
+            return ApiResponse(cached.response.status, cached.response.body, elapsed_ms, cached.response.headers, cached=True)
+
+        decoded = json.loads(raw_body.decode("utf-8")) if raw_body.strip() else None
+        response = ApiResponse(status=status, body=decoded, elapsed_ms=elapsed_ms, headers=response_headers)
+        if self.response_validators is not None and 200 <= status < 300:
+            response.schema_errors = self._check_schema(method, route, decoded)
+        if ttl is not None and status == 200:
+            with self._lock:
+                self._cache[path] = CachedResponse(
+                    response=response,
+                    fresh_until=time.monotonic() + ttl,
+                    etag=response_headers.get("etag"),
+                    last_modified=response_headers.get("last-modified"),
+                )
+        return response
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        payload_bytes: bytes | None,
+        request_headers: dict[str, str],
+        timeout_seconds: float,
+    ) -> tuple[int, bytes, dict[str, str]]:
+        connection, reused = self._checkout(timeout_seconds)
+        while True:
+            try:
+                connection.request(method, self._path_prefix + path, body=payload_bytes, headers=request_headers)
+                response = connection.getresponse()
+                raw_body = response.read()
+                break
+            except RETRYABLE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    self._count_error()
+                    raise
+                connection, reused = self._new_connection(timeout_seconds), False
+            except Exception:
+                connection.close()
+                self._count_error()
+                raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(connection)
+        return response.status, raw_body, {name.lower(): value for name, value in response.getheaders()}
+
+    def _can_retry(self, method: str, attempt: int, started_at: float, timeout_seconds: float) -> bool:
+        if method not in IDEMPOTENT_METHODS or attempt + 1 >= self.retry.attempts:
+            return False
+        delay = self.retry.delay(attempt)
+        if time.monotonic() - started_at + delay >= timeout_seconds:
+            return False
+        with self._lock:
+            self._stats["retries"] += 1
+        time.sleep(delay)
+        return True
+
+    def _check_schema(self, method: str, route: str, body: object) -> list[str]:
+        validators = self.response_validators or {}
+        key = (method, route)
+        if key not in self._validator_routes:
+            templates = [template for template_method, template in validators if template_method == method]
+            self._validator_routes[key] = match_route(route, templates)
+        template = self._validator_routes[key]
+        if template is None:
+            return []
+        errors = [f"body{error}" for error in validators[(method, template)](body)]
+        if errors:
+            LOGGER.warning("ONI API response does not match schema method=%s path=%s errors=%s", method, route, errors[:5])
+            with self._lock:
+                self._stats["schema_errors"] += 1
+        return errors
+
+    def _invalidate(self, route: str) -> None:
+        with self._lock:
+            for cached_path in [cached_path for cached_path in self._cache if _route(cached_path) == route]:
+                del self._cache[cached_path]
+
+    def get_json(self, path: str, timeout_seconds: float | None = None) -> ApiResponse:
+        return self.request("GET", path, timeout_seconds=timeout_seconds)
+
+    def _count_error(self) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {"base_url": self.base_url, "idle": len(self._idle), "cached": len(self._cache), **self._stats}
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._cache.clear()
+        for connection in idle:
+            connection.close()
+
+
+CLIENTS_LOCK = threading.Lock()
+CLIENTS: dict[str, OniApiClient] = {}
+
+
+def get_api_client(base_url: str, validate_responses: bool = False) -> OniApiClient:
+    """Return the shared client for ``base_url`` so requests reuse its pooled connections and cache.
+
+    ``validate_responses`` only applies when the client is first created.
+    """
+    key = base_url.rstrip("/")
+    with CLIENTS_LOCK:
+        client = CLIENTS.get(key)
+        if client is None:
+            client = OniApiClient(key, response_validators=load_response_validators() if validate_responses else None)
+            CLIENTS[key] = client
+        return client
+
+
+def close_api_clients() -> None:
+    with CLIENTS_LOCK:
+        clients = list(CLIENTS.values())
+        CLIENTS.clear()
+    for client in clients:
+        client.close()
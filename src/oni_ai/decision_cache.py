@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("oni_ai")
+CACHE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DEFAULT_EXCLUDE_FIELDS = (
+    "request_id",
+    "request_dir",
+    "screenshot_path",
+    "requested_at_utc",
+    "context.time_since_cycle_start",
+    "context.time_in_cycles",
+    "context.real_time_since_startup_seconds",
+    "context.unscaled_time_seconds",
+)
+
+
+def parse_field_list(raw_value: str | None) -> tuple[str, ...]:
+    if not raw_value:
+        return ()
+    return tuple(field.strip() for field in raw_value.split(",") if field.strip())
+
+
+def _pick_path(source: dict, parts: list[str], target: dict) -> None:
+    head = parts[0]
+    if head not in source:
+        return
+    if len(parts) == 1:
+        target[head] = source[head]
+        return
+    child = source[head]
+    if isinstance(child, dict):
+        nested = target.setdefault(head, {})
+        if isinstance(nested, dict):
+            _pick_path(child, parts[1:], nested)
+
+
+def _drop_path(target: dict, parts: list[str]) -> None:
+    head = parts[0]
+    if len(parts) == 1:
+        target.pop(head, None)
+        return
+    child = target.get(head)
+    if isinstance(child, dict):
+        # Copy before mutating so the caller's payload is never modified.
+        child = dict(child)
+        target[head] = child
+        _drop_path(child, parts[1:])
+
+
+def select_fields(payload: dict, include: tuple[str, ...] = (), exclude: tuple[str, ...] = ()) -> dict:
+    """Project ``payload`` onto dotted ``include`` paths (all when empty) minus ``exclude`` paths."""
+    if include:
+        selected: dict = {}
+        for field in include:
+            _pick_path(payload, field.split("."), selected)
+    else:
+        selected = dict(payload)
+
+    for field in exclude:
+        _drop_path(selected, field.split("."))
+    return selected
+
+
+def fingerprint_payload(
+    payload: dict,
+    include: tuple[str, ...] = (),
+    exclude: tuple[str, ...] = DEFAULT_EXCLUDE_FIELDS,
+) -> str:
+    """Hash the colony snapshot in ``payload`` ignoring per-request and timing fields."""
+    relevant = select_fields(payload, include, exclude)
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """Content-addressed LRU cache of normalized plans with TTL and optional disk persistence."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persist_dir: Path | None = None) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = max(0, ttl_seconds)
+        self.persist_dir = persist_dir
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "disk_hits": 0}
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, response = entry
+                if not self._is_expired(stored_at, now):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return response
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None or self._is_expired(entry[0], now):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            self._insert(key, entry)
+            return entry[1]
+
+    def put(self, key: str, response: str) -> None:
+        entry = (time.time(), response)
+        with self._lock:
+            self._insert(key, entry)
+            self._stats["stores"] += 1
+        self._store(key, entry)
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persist_dir": str(self.persist_dir) if self.persist_dir is not None else None,
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                **self._stats,
+            }
+
+    def _insert(self, key: str, entry: tuple[float, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _entry_path(self, key: str) -> Path | None:
+        if self.persist_dir is None or not CACHE_KEY_PATTERN.match(key):
+            return None
+        return self.persist_dir / f"{key}.json"
+
+    def _load(self, key: str) -> tuple[float, str] | None:
+        path = self._entry_path(key)
+        if path is None:
+            return None
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+            return float(record["stored_at"]), str(record["response"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            LOGGER.warning("ignoring unreadable decision cache entry path=%s", path)
+            return None
+
+    def _store(self, key: str, entry: tuple[float, str]) -> None:
+        path = self._entry_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_text(json.dumps({"stored_at": entry[0], "response": entry[1]}), encoding="utf-8")
+            temp_path.replace(path)
+        except OSError:
+            LOGGER.exception("failed persisting decision cache entry path=%s", path)
@@ -0,0 +1,241 @@
+"""Struct-of-arrays view of ``/cells`` payloads for vectorized map queries.
+
+Requires numpy (``pip install 'oni-ai[grid]'``); the rest of the bridge does not.
+
+The runtime's ``/cells`` items carry the solid/liquid/gas/dug flags and an
+``element_index`` but no element name, mass or temperature. Pass the game's
+element table as ``element_ids`` to turn indices into ids; without it the
+undiggable-element and harmful-gas checks never match and the temperature
+limits never trip, so only the phase flags, liquids and dug state are used.
+"""
+
+from collections.abc import Iterable, Sequence
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - exercised only without the extra installed
+    raise ImportError("oni_ai.grid requires numpy; install it with: pip install 'oni-ai[grid]'") from exc
+
+from oni_ai.cells import CellGrid, Region
+
+
+UNKNOWN_ELEMENT = -1
+# Elements duplicants cannot dig (Neutronium is "Unobtanium" internally).
+UNDIGGABLE_ELEMENTS = frozenset({"Unobtanium", "Neutronium"})
+# Gases that make a breached pocket a survival problem rather than free space.
+HAZARDOUS_GASES = frozenset({"ChlorineGas", "ContaminatedOxygen", "CarbonDioxide", "Hydrogen", "Methane", "SourGas"})
+BREATHABLE_GASES = frozenset({"Oxygen"})
+
+
+def _element_name(cell: dict, element_ids: Sequence[str] | None = None) -> str | None:
+    for key in ("element", "element_id", "element_name"):
+        value = cell.get(key)
+        if isinstance(value, str) and value:
+            return value
+    index = cell.get("element_index")
+    if isinstance(index, int) and not isinstance(index, bool):
+        if element_ids is not None and 0 <= index < len(element_ids):
+            return element_ids[index]
+        return f"#{index}"
+    return None
+
+
+def _number(cell: dict, *keys: str) -> float:
+    for key in keys:
+        value = cell.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    return float("nan")
+
+
+def polygon_mask(xs: np.ndarray, ys: np.ndarray, polygon: tuple[tuple[int, int], ...]) -> np.ndarray:
+    """Vectorized even-odd test matching ``Region.contains``: edges and vertices count as inside."""
+    inside = np.zeros(xs.shape, dtype=bool)
+    on_edge = np.zeros(xs.shape, dtype=bool)
+    for index, (ax, ay) in enumerate(polygon):
+        bx, by = polygon[(index + 1) % len(polygon)]
+        cross = (bx - ax) * (ys - ay) - (by - ay) * (xs - ax)
+        on_edge |= (
+            (cross == 0)
+            & (xs >= min(ax, bx)) & (xs <= max(ax, bx))
+            & (ys >= min(ay, by)) & (ys <= max(ay, by))
+        )
+        if ay == by:
+            continue
+        spans = (ay > ys) != (by > ys)
+        crossing_x = ax + (ys - ay) * (bx - ax) / (by - ay)
+        inside ^= spans & (xs < crossing_x)
+    return inside | on_edge
+
+
+class GridArrays:
+    """Cells of a rectangular window as parallel arrays indexed ``[y - y0, x - x0]``.
+
+    ``element`` holds indices into ``element_names``; ``known`` marks cells
+    that were actually ingested so unknown cells never pass a query.
+    ``element_ids`` maps the runtime's ``element_index`` to element ids.
+    """
+
+    def __init__(self, x0: int, y0: int, width: int, height: int, element_ids: Sequence[str] | None = None) -> None:
+        if width <= 0 or height <= 0:
+            raise ValueError("grid window must be non-empty")
+        self.x0 = x0
+        self.y0 = y0
+        self.width = width
+        self.height = height
+        shape = (height, width)
+        self.element = np.full(shape, UNKNOWN_ELEMENT, dtype=np.int16)
+        self.mass = np.full(shape, np.nan, dtype=np.float32)
+        self.temperature = np.full(shape, np.nan, dtype=np.float32)
+        self.is_solid = np.zeros(shape, dtype=bool)
+        self.is_liquid = np.zeros(shape, dtype=bool)
+        self.is_gas = np.zeros(shape, dtype=bool)
+        self.is_dug = np.zeros(shape, dtype=bool)
+        self.is_valid = np.zeros(shape, dtype=bool)
+        self.known = np.zeros(shape, dtype=bool)
+        self.element_names: list[str] = []
+        self._element_codes: dict[str, int] = {}
+        self.element_ids = element_ids
+
+    @classmethod
+    def from_region(cls, region: Region, element_ids: Sequence[str] | None = None) -> "GridArrays":
+        return cls(region.x0, region.y0, region.width, region.height, element_ids)
+
+    @classmethod
+    def from_cells(
+        cls, cells: Iterable[dict], region: Region | None = None, element_ids: Sequence[str] | None = None
+    ) -> "GridArrays":
+        cells = [cell for cell in cells if isinstance(cell.get("x"), int) and isinstance(cell.get("y"), int)]
+        if region is None:
+            if not cells:
+                raise ValueError("cannot infer grid bounds from an empty cell list")
+            region = Region.box(
+                min(cell["x"] for cell in cells),
+                min(cell["y"] for cell in cells),
+                max(cell["x"] for cell in cells),
+                max(cell["y"] for cell in cells),
+            )
+        grid = cls.from_region(region, element_ids)
+        grid.ingest(cells)
+        return grid
+
+    @classmethod
+    def from_cell_grid(cls, cell_grid: CellGrid, element_ids: Sequence[str] | None = None) -> "GridArrays":
+        return cls.from_cells((cell for cell in cell_grid.cells if cell is not None), cell_grid.region, element_ids)
+
+    def element_code(self, name: str) -> int:
+        code = self._element_codes.get(name)
+        if code is None:
+            code = len(self.element_names)
+            self.element_names.append(name)
+            self._element_codes[name] = code
+        return code
+
+    def ingest(self, cells: Iterable[dict]) -> int:
+        """Write ``/cells`` items into the arrays; cells outside the window are ignored."""
+        rows, cols, elements, masses, temperatures = [], [], [], [], []
+        flags: dict[str, list[bool]] = {"is_solid": [], "is_liquid": [], "is_gas": [], "is_dug": [], "is_valid": []}
+        for cell in cells:
+            x, y = cell.get("x"), cell.get("y")
+            if not isinstance(x, int) or not isinstance(y, int):
+                continue
+            row, col = y - self.y0, x - self.x0
+            if not (0 <= row < self.height and 0 <= col < self.width):
+                continue
+            rows.append(row)
+            cols.append(col)
+            name = _element_name(cell, self.element_ids)
+            elements.append(self.element_code(name) if name is not None else UNKNOWN_ELEMENT)
+            masses.append(_number(cell, "mass", "mass_kg"))
+            temperatures.append(_number(cell, "temperature_c", "temperature"))
+            flags["is_valid"].append(bool(cell.get("is_valid_cell", True)))
+            for flag in ("is_solid", "is_liquid", "is_gas", "is_dug"):
+                flags[flag].append(bool(cell.get(flag, False)))
+
+        if not rows:
+            return 0
+        index = (np.asarray(rows), np.asarray(cols))
+        self.element[index] = elements
+        self.mass[index] = masses
+        self.temperature[index] = temperatures
+        for flag, values in flags.items():
+            getattr(self, flag)[index] = values
+        self.known[index] = True
+        return len(rows)
+
+    def _window(self, region: Region | None) -> tuple[slice, slice, np.ndarray]:
+        """Row/column slices clipped to the grid plus the region mask over that window."""
+        if region is None:
+            return slice(0, self.height), slice(0, self.width), np.ones((self.height, self.width), dtype=bool)
+        row0, row1 = max(region.y0 - self.y0, 0), min(region.y1 - self.y0 + 1, self.height)
+        col0, col1 = max(region.x0 - self.x0, 0), min(region.x1 - self.x0 + 1, self.width)
+        rows, cols = slice(row0, max(row0, row1)), slice(col0, max(col0, col1))
+        ys, xs = np.mgrid[self.y0 + rows.start : self.y0 + rows.stop, self.x0 + cols.start : self.x0 + cols.stop]
+        mask = polygon_mask(xs, ys, region.polygon) if region.polygon else np.ones(xs.shape, dtype=bool)
+        return rows, cols, mask
+
+    def _coordinates(self, mask: np.ndarray, rows: slice, cols: slice) -> np.ndarray:
+        found_rows, found_cols = np.nonzero(mask)
+        return np.column_stack((found_cols + cols.start + self.x0, found_rows + rows.start + self.y0))
+
+    def elements_mask(self, names: Iterable[str]) -> np.ndarray:
+        codes = [self._element_codes[name] for name in names if name in self._element_codes]
+        return np.isin(self.element, codes) if codes else np.zeros(self.element.shape, dtype=bool)
+
+    def neighbor_any(self, mask: np.ndarray) -> np.ndarray:
+        """True where any 4-neighbour of a cell is set in ``mask``."""
+        padded = np.pad(mask, 1, constant_values=False)
+        return padded[:-2, 1:-1] | padded[2:, 1:-1] | padded[1:-1, :-2] | padded[1:-1, 2:]
+
+    def hazard_mask(self, min_temperature_c: float = -10.0, max_temperature_c: float = 60.0) -> np.ndarray:
+        """Cells that are unsafe to open: extreme temperatures, liquids or non-breathable gas."""
+        with np.errstate(invalid="ignore"):
+            extreme = (self.temperature < min_temperature_c) | (self.temperature > max_temperature_c)
+        return extreme | self.is_liquid | (self.is_gas & self.elements_mask(HAZARDOUS_GASES))
+
+    def diggable_mask(self, min_temperature_c: float = -10.0, max_temperature_c: float = 60.0) -> np.ndarray:
+        """Known solid, undug, diggable cells that are safe and would not breach a hazard."""
+        hazard = self.hazard_mask(min_temperature_c, max_temperature_c)
+        return (
+            self.known
+            & self.is_valid
+            & self.is_solid
+            & ~self.is_dug
+            & ~self.elements_mask(UNDIGGABLE_ELEMENTS)
+            & ~hazard
+            & ~self.neighbor_any(hazard)
+        )
+
+    def diggable_cells(self, region: Region | None = None, **thresholds: float) -> np.ndarray:
+        """``(N, 2)`` array of ``x, y`` for diggable non-hazardous cells inside ``region``."""
+        rows, cols, region_mask = self._window(region)
+        mask = self.diggable_mask(**thresholds)[rows, cols] & region_mask
+        return self._coordinates(mask, rows, cols)
+
+    def gas_pockets_adjacent(self, region: Region, ignore_elements: Iterable[str] = BREATHABLE_GASES) -> np.ndarray:
+        """``(N, 2)`` array of gas cells just outside ``region`` that digging its edge would open into."""
+        inside = np.zeros((self.height, self.width), dtype=bool)
+        rows, cols, region_mask = self._window(region)
+        inside[rows, cols] = region_mask
+        ring = self.neighbor_any(inside) & ~inside
+        gas = self.known & self.is_gas & ~self.elements_mask(ignore_elements)
+        full_rows, full_cols = slice(0, self.height), slice(0, self.width)
+        return self._coordinates(ring & gas, full_rows, full_cols)
+
+    def cell(self, x: int, y: int) -> dict[str, object] | None:
+        row, col = y - self.y0, x - self.x0
+        if not (0 <= row < self.height and 0 <= col < self.width) or not self.known[row, col]:
+            return None
+        code = int(self.element[row, col])
+        return {
+            "x": x,
+            "y": y,
+            "element": self.element_names[code] if code != UNKNOWN_ELEMENT else None,
+            "mass": float(self.mass[row, col]),
+            "temperature_c": float(self.temperature[row, col]),
+            "is_solid": bool(self.is_solid[row, col]),
+            "is_liquid": bool(self.is_liquid[row, col]),
+            "is_gas": bool(self.is_gas[row, col]),
+            "is_dug": bool(self.is_dug[row, col]),
+            "is_valid_cell": bool(self.is_valid[row, col]),
+        }
@@ -0,0 +1,111 @@
+import concurrent.futures
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from oni_ai.client import OniApiClient
+
+
+LOGGER = logging.getLogger("oni_ai")
+LIVE_STATE_FILE_NAME = "live_state.json"
+DEFAULT_LIVE_STATE_ENDPOINTS = "/state,/priorities,/speed"
+PREFETCH_EXECUTOR_LOCK = threading.Lock()
+PREFETCH_EXECUTOR: ThreadPoolExecutor | None = None
+
+
+def parse_endpoint_specs(raw_value: str, default_timeout_ms: int) -> list[tuple[str, float]]:
+    """Parse ``/state:3000,/speed`` into ``[(path, timeout_seconds), ...]``."""
+    specs = []
+    for item in raw_value.split(","):
+        path, _, timeout_raw = item.strip().partition(":")
+        if not path:
+            continue
+        if not path.startswith("/"):
+            path = f"/{path}"
+        try:
+            timeout_ms = int(timeout_raw) if timeout_raw.strip() else default_timeout_ms
+        except ValueError:
+            LOGGER.warning("invalid live state timeout endpoint=%s value=%s", path, timeout_raw)
+            timeout_ms = default_timeout_ms
+        specs.append((path, max(1, timeout_ms) / 1000.0))
+    return specs
+
+
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    global PREFETCH_EXECUTOR
+    with PREFETCH_EXECUTOR_LOCK:
+        if PREFETCH_EXECUTOR is None:
+            PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="oni-ai-prefetch")
+        return PREFETCH_EXECUTOR
+
+
+def _fetch_endpoint(client: OniApiClient, path: str, timeout_seconds: float) -> dict[str, object]:
+    started_at = time.monotonic()
+    try:
+        response = client.get_json(path, timeout_seconds=timeout_seconds)
+    except (OSError, ValueError, http.client.HTTPException) as exc:
+        return {
+            "error": f"{type(exc).__name__}: {exc}",
+            "elapsed_ms": int((time.monotonic() - started_at) * 1000),
+        }
+    return {"status": response.status, "elapsed_ms": response.elapsed_ms, "body": response.body}
+
+
+class LiveStatePrefetch:
+    """Concurrent GETs of the ONI state endpoints, started early and collected once staging is done."""
+
+    def __init__(self, client: OniApiClient, endpoints: list[tuple[str, float]]) -> None:
+        self.client = client
+        self.endpoints = endpoints
+        self._started_at = 0.0
+        self._futures: list[tuple[str, float, Future]] = []
+
+    def start(self) -> "LiveStatePrefetch":
+        self._started_at = time.monotonic()
+        executor = get_prefetch_executor()
+        self._futures = [
+            (path, timeout_seconds, executor.submit(_fetch_endpoint, self.client, path, timeout_seconds))
+            for path, timeout_seconds in self.endpoints
+        ]
+        return self
+
+    def collect(self) -> dict[str, object]:
+        results: dict[str, object] = {}
+        for path, timeout_seconds, future in self._futures:
+            remaining = timeout_seconds - (time.monotonic() - self._started_at)
+            try:
+                # The socket timeout bounds each fetch; the margin only covers scheduling delay.
+                results[path] = future.result(timeout=max(0.0, remaining) + 1.0)
+            except concurrent.futures.TimeoutError:
+                results[path] = {"error": "timeout", "elapsed_ms": int(timeout_seconds * 1000)}
+        return {
+            "api_base_url": self.client.base_url,
+            "fetched_at_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "elapsed_ms": int((time.monotonic() - self._started_at) * 1000),
+            "endpoints": results,
+        }
+
+
+def fetched_endpoints(snapshot: dict[str, object]) -> list[str]:
+    endpoints = snapshot.get("endpoints")
+    if not isinstance(endpoints, dict):
+        return []
+    return [
+        path
+        for path, result in endpoints.items()
+        if isinstance(result, dict) and result.get("status") == 200
+    ]
+
+
+def write_live_state(request_dir: str, snapshot: dict[str, object]) -> Path:
+    path = Path(request_dir) / LIVE_STATE_FILE_NAME
+    temp_path = path.with_name(f".{LIVE_STATE_FILE_NAME}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    temp_path.replace(path)
+    return path
@@ -0,0 +1,381 @@
+"""Load-test the bridge's HTTP surface and save the numbers for comparison across versions.
+
+An in-process ``BridgeHTTPServer`` is driven by concurrent clients that each
+submit ``POST /analyze`` and poll ``GET /analyze/<job_id>`` until the job
+finishes. Decisions come from a fake codex command (a tiny Python script
+spawned per request, like ``codex exec``) or the in-process fake backend,
+both with tunable latency. With ``mock_api`` each request also points at an
+in-process mock ONI API, so live state and cell validation run per job. A sampler records thread count, RSS and queue
+depth over time; the report holds throughput and p50/p95/p99 latencies.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+from oni_ai import ai_bridge, metrics
+from oni_ai.client import OniApiClient, RetryPolicy
+from oni_ai.mock_oni_api import MockOniApiServer
+
+
+LOAD_PLAN = {
+    "analysis": "load test",
+    "actions": [
+        {"id": "dig_a", "type": "dig", "params": {"points": [{"x": 1, "y": 1}, {"x": 2, "y": 1}]}},
+        {"id": "dig_b", "type": "dig", "params": {"points": [{"x": 3, "y": 1}]}},
+        {"id": "speed", "type": "set_speed", "params": {"speed": 2}},
+    ],
+}
+FAKE_CODEX_SCRIPT = """import sys
+import time
+
+args = sys.argv[1:]
+time.sleep({latency_seconds!r})
+plan = {plan!r}
+with open(args[args.index("-o") + 1], "w", encoding="utf-8") as file:
+    file.write(plan)
+print(plan)
+"""
+LOAD_BACKENDS = ("exec", "fake")
+PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+@dataclass
+class LoadTestConfig:
+    clients: int = 8
+    requests: int = 64
+    codex_latency_ms: int = 200
+    backend: str = "exec"
+    poll_interval_ms: int = 50
+    long_poll_seconds: float = 0.0
+    sample_interval_ms: int = 100
+    job_workers: int = 2
+    job_queue_size: int = 8
+    mock_api: bool = False
+    mock_api_latency_ms: int = 0
+
+
+@dataclass
+class LoadTestResults:
+    submit_ms: list[float] = field(default_factory=list)
+    poll_ms: list[float] = field(default_factory=list)
+    end_to_end_ms: list[float] = field(default_factory=list)
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    errors: list[str] = field(default_factory=list)
+    samples: list[dict] = field(default_factory=list)
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of this process from ``/proc``; ``None`` where that is unavailable."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def latency_summary(values: list[float]) -> dict[str, float | None]:
+    summary = {name: metrics.percentile(values, fraction) for name, fraction in PERCENTILES}
+    summary["max"] = max(values, default=None)
+    summary["mean"] = round(sum(values) / len(values), 3) if values else None
+    return summary
+
+
+def write_fake_codex(directory: Path, latency_seconds: float) -> str:
+    """Write the fake codex script and return the ``ONI_AI_CODEX_CMD`` that runs it."""
+    script = directory / "fake_codex.py"
+    script.write_text(
+        FAKE_CODEX_SCRIPT.format(latency_seconds=latency_seconds, plan=json.dumps(LOAD_PLAN)),
+        encoding="utf-8",
+    )
+    return shlex.join([sys.executable, str(script)])
+
+
+def _retry_after_seconds(value: str | None) -> float:
+    try:
+        return max(0.0, float(value)) if value is not None else 1.0
+    except ValueError:
+        return 1.0
+
+
+class LoadTest:
+    def __init__(self, config: LoadTestConfig, base_url: str, request_root: Path, api_base_url: str | None = None) -> None:
+        self.config = config
+        self.base_url = base_url
+        self.api_base_url = api_base_url
+        self.request_root = request_root
+        self.results = LoadTestResults()
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self._started_at = 0.0
+        self._stop_sampling = threading.Event()
+
+    def _claim(self) -> int | None:
+        with self._lock:
+            if self._next_index >= self.config.requests:
+                return None
+            self._next_index += 1
+            return self._next_index - 1
+
+    def _record(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            getattr(self.results, name).append(round(value_ms, 3))
+
+    def _run_one(self, client: OniApiClient, index: int) -> None:
+        request_id = f"load_{index:05d}"
+        request_dir = self.request_root / request_id
+        request_dir.mkdir(parents=True, exist_ok=True)
+        # A distinct cycle per request keeps job dedup from folding the load together.
+        payload = {"request_id": request_id, "request_dir": str(request_dir), "context": {"cycle": index}}
+        if self.api_base_url is not None:
+            payload["api_base_url"] = self.api_base_url
+        started_at = time.monotonic()
+        while True:
+            submit_started_at = time.monotonic()
+            response = client.request("POST", "/analyze", payload)
+            self._record("submit_ms", (time.monotonic() - submit_started_at) * 1000)
+            if response.status != 503:
+                break
+            with self._lock:
+                self.results.rejected += 1
+            time.sleep(_retry_after_seconds(response.headers.get("retry-after")))
+        if response.status != 202 or not isinstance(response.body, dict):
+            raise RuntimeError(f"submit failed status={response.status}")
+
+        status_path = str(response.body["status_url"])
+        if self.config.long_poll_seconds > 0:
+            status_path += f"?wait={self.config.long_poll_seconds}"
+        while True:
+            poll_started_at = time.monotonic()
+            polled = client.get_json(status_path)
+            self._record("poll_ms", (time.monotonic() - poll_started_at) * 1000)
+            job = polled.body
+            # An evicted job (404) or garbled body would otherwise be polled forever.
+            if polled.status != 200 or not isinstance(job, dict):
+                raise RuntimeError(f"poll failed status={polled.status}")
+            if job.get("status") in ai_bridge.JOB_TERMINAL_STATUSES:
+                break
+            if self.config.long_poll_seconds <= 0:
+                time.sleep(self.config.poll_interval_ms / 1000.0)
+
+        self._record("end_to_end_ms", (time.monotonic() - started_at) * 1000)
+        with self._lock:
+            if job["status"] == "completed":
+                self.results.completed += 1
+            else:
+                self.results.failed += 1
+
+    def _client_loop(self) -> None:
+        client = OniApiClient(
+            self.base_url,
+            default_timeout_seconds=max(30.0, self.config.long_poll_seconds + 10),
+            endpoint_timeouts={},
+            retry=RetryPolicy(attempts=1),
+            cache_ttls={},
+        )
+        try:
+            while (index := self._claim()) is not None:
+                try:
+                    self._run_one(client, index)
+                except (OSError, ValueError, RuntimeError) as exc:
+                    with self._lock:
+                        self.results.failed += 1
+                        self.results.errors.append(f"load_{index:05d}: {type(exc).__name__}: {exc}")
+        finally:
+            client.close()
+
+    def _sample(self) -> None:
+        scheduler = ai_bridge.get_job_scheduler().stats()
+        sample = {
+            "t": round(time.monotonic() - self._started_at, 3),
+            "threads": threading.active_count(),
+            "rss_bytes": current_rss_bytes(),
+            "jobs_queued": scheduler["queued"],
+            "jobs_running": scheduler["running"],
+        }
+        with self._lock:
+            self.results.samples.append(sample)
+
+    def _sampler_loop(self) -> None:
+        while not self._stop_sampling.is_set():
+            self._sample()
+            self._stop_sampling.wait(self.config.sample_interval_ms / 1000.0)
+
+    def run(self) -> dict[str, object]:
+        self._started_at = time.monotonic()
+        sampler = threading.Thread(target=self._sampler_loop, name="oni-ai-loadtest-sampler", daemon=True)
+        sampler.start()
+        clients = [
+            threading.Thread(target=self._client_loop, name=f"oni-ai-loadtest-client-{index}", daemon=True)
+            for index in range(self.config.clients)
+        ]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        wall_seconds = time.monotonic() - self._started_at
+        self._stop_sampling.set()
+        sampler.join(timeout=5)
+        self._sample()
+        return self.report(wall_seconds)
+
+    def report(self, wall_seconds: float) -> dict[str, object]:
+        results = self.results
+        scheduler = ai_bridge.get_job_scheduler().stats()
+        rss_values = [sample["rss_bytes"] for sample in results.samples if sample["rss_bytes"] is not None]
+        return {
+            "config": asdict(self.config),
+            # What the bridge under test actually ran with, to catch env that did not take effect.
+            "scheduler": {"workers": scheduler["workers"], "queue_size": scheduler["queue_size"], "policy": scheduler["policy"]},
+            "environment": {
+                "oni_ai_version": _package_version(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "started_at_utc": datetime.now(timezone.utc).isoformat(),
+            },
+            "summary": {
+                "requests": self.config.requests,
+                "completed": results.completed,
+                "failed": results.failed,
+                "rejected": results.rejected,
+                "wall_seconds": round(wall_seconds, 3),
+                "throughput_rps": round(results.completed / wall_seconds, 3) if wall_seconds > 0 else None,
+                "latency_ms": {
+                    "submit": latency_summary(results.submit_ms),
+                    "poll": latency_summary(results.poll_ms),
+                    "end_to_end": latency_summary(results.end_to_end_ms),
+                },
+                "polls": len(results.poll_ms),
+                # Thread counts cover the whole process, including the load-test clients and sampler.
+                "peak_threads": max((sample["threads"] for sample in results.samples), default=None),
+                "peak_rss_bytes": max(rss_values, default=None),
+                "rss_growth_bytes": rss_values[-1] - rss_values[0] if rss_values else None,
+            },
+            "errors": results.errors[:20],
+            "samples": results.samples,
+        }
+
+
+def _package_version() -> str | None:
+    try:
+        return metadata.version("oni-ai")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def run_load_test(config: LoadTestConfig) -> dict[str, object]:
+    """Start a bridge on a free port with the configured fake backend, drive it and return the report."""
+    if config.backend not in LOAD_BACKENDS:
+        raise ValueError(f"unsupported backend: {config.backend}")
+
+    with tempfile.TemporaryDirectory(prefix="oni_ai_loadtest_") as work_root:
+        root = Path(work_root)
+        env = {
+            "ONI_AI_DECISION_BACKEND": config.backend,
+            "ONI_AI_REQUEST_ROOT": str(root / "requests"),
+            "ONI_AI_SCREENSHOT_WAIT_MS": "0",
+            "ONI_AI_DECISION_CACHE": "0",
+            "ONI_AI_JOB_WORKERS": str(config.job_workers),
+            "ONI_AI_JOB_QUEUE_SIZE": str(config.job_queue_size),
+        }
+        if config.backend == "exec":
+            env["ONI_AI_CODEX_CMD"] = write_fake_codex(root, config.codex_latency_ms / 1000.0)
+        else:
+            env["ONI_AI_FAKE_RESPONSE"] = json.dumps(LOAD_PLAN)
+            env["ONI_AI_FAKE_LATENCY_MS"] = str(config.codex_latency_ms)
+        previous = {name: os.environ.get(name) for name in env}
+        os.environ.update(env)
+        # The scheduler reads ONI_AI_JOB_* only when it is created; start from one built with this config.
+        ai_bridge.reset_job_scheduler()
+
+        mock_api = None
+        if config.mock_api:
+            mock_api = MockOniApiServer(latency_seconds=config.mock_api_latency_ms / 1000.0).start()
+        server = ai_bridge.BridgeHTTPServer(("127.0.0.1", 0), ai_bridge.OniAiHandler)
+        thread = threading.Thread(target=server.serve_forever, name="oni-ai-loadtest-bridge", daemon=True)
+        thread.start()
+        try:
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            api_base_url = mock_api.base_url if mock_api is not None else None
+            report = LoadTest(config, base_url, root / "requests", api_base_url).run()
+            if mock_api is not None:
+                with mock_api.api.lock:
+                    report["mock_api_counters"] = dict(mock_api.api.counters)
+            return report
+        finally:
+            if mock_api is not None:
+                mock_api.stop()
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            ai_bridge.reset_job_scheduler()
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = LoadTestConfig()
+    parser = argparse.ArgumentParser(prog="oni-ai-loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=defaults.clients, help="concurrent submit/poll clients")
+    parser.add_argument("--requests", type=int, default=defaults.requests, help="analyze requests in total")
+    parser.add_argument("--codex-latency-ms", type=int, default=defaults.codex_latency_ms, help="fake decision latency")
+    parser.add_argument("--backend", choices=LOAD_BACKENDS, default=defaults.backend, help="exec spawns a fake codex process per request")
+    parser.add_argument("--poll-interval-ms", type=int, default=defaults.poll_interval_ms)
+    parser.add_argument("--long-poll-seconds", type=float, default=defaults.long_poll_seconds, help="use ?wait= status polls instead of sleeping")
+    parser.add_argument("--sample-interval-ms", type=int, default=defaults.sample_interval_ms)
+    parser.add_argument("--job-workers", type=int, default=defaults.job_workers, help="ONI_AI_JOB_WORKERS for the bridge under test")
+    parser.add_argument("--job-queue-size", type=int, default=defaults.job_queue_size, help="ONI_AI_JOB_QUEUE_SIZE for the bridge under test")
+    parser.add_argument("--mock-api", action="store_true", help="point requests at an in-process mock ONI API (live state, cell checks)")
+    parser.add_argument("--mock-api-latency-ms", type=int, default=defaults.mock_api_latency_ms, help="delay added to every mock API response")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("ONI_AI_LOG_LEVEL", "WARNING")
+    ai_bridge.configure_logging()
+    config = LoadTestConfig(
+        clients=max(1, args.clients),
+        requests=max(1, args.requests),
+        codex_latency_ms=max(0, args.codex_latency_ms),
+        backend=args.backend,
+        poll_interval_ms=max(1, args.poll_interval_ms),
+        long_poll_seconds=max(0.0, args.long_poll_seconds),
+        sample_interval_ms=max(10, args.sample_interval_ms),
+        job_workers=max(1, args.job_workers),
+        job_queue_size=max(0, args.job_queue_size),
+        mock_api=args.mock_api,
+        mock_api_latency_ms=max(0, args.mock_api_latency_ms),
+    )
+    report = run_load_test(config)
+
+    encoded = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(encoded + "\n", encoding="utf-8")
+    else:
+        print(encoded)
+    summary = report["summary"]
+    print(
+        f"completed={summary['completed']} failed={summary['failed']} rejected={summary['rejected']} "
+        f"throughput_rps={summary['throughput_rps']} p95_ms={summary['latency_ms']['end_to_end']['p95']}",
+        file=sys.stderr,
+    )
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, str] | None) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(label_key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = [*label_key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: dict[str, str] | None = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, labels: dict[str, str] | None = None) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[LabelKey, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: dict[str, str] | None = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            totals[0] += value
+
+    def count(self, labels: dict[str, str] | None = None) -> int:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return sum(series[0]) if series is not None else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, totals) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key, (("le", _format_value(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(totals[0])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from ``callback`` at scrape time."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def reset(self) -> None:
+        return
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(float(self.callback()))}",
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help_text, callback))
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "oni_ai_stage_duration_seconds",
+    "Time spent per analyze pipeline stage.",
+)
+CODEX_TIMEOUTS = REGISTRY.counter("oni_ai_codex_timeouts_total", "Decision backend runs that hit the timeout.")
+CODEX_NONZERO_EXITS = REGISTRY.counter(
+    "oni_ai_codex_nonzero_exits_total",
+    "Decision backend runs that exited with a nonzero code.",
+)
+NOOP_FALLBACKS = REGISTRY.counter(
+    "oni_ai_normalize_noop_total",
+    "normalize_action results that fell back to an empty action list, by reason.",
+)
+JOBS_FINISHED = REGISTRY.counter("oni_ai_jobs_finished_total", "Analyze jobs finished, by status.")
+PLAN_ACTIONS_REJECTED = REGISTRY.counter(
+    "oni_ai_plan_actions_rejected_total",
+    "Plan actions that failed validation, by action type and outcome (dropped or flagged).",
+)
+
+
+STAGE_CAPTURE = threading.local()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    seconds = max(0.0, seconds)
+    STAGE_SECONDS.observe(seconds, {"stage": stage})
+    captured = getattr(STAGE_CAPTURE, "stages", None)
+    if captured is not None:
+        captured[stage] = captured.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def capture_stages() -> Iterator[dict[str, float]]:
+    """Also collect the stage seconds observed on this thread into the yielded dict."""
+    previous = getattr(STAGE_CAPTURE, "stages", None)
+    STAGE_CAPTURE.stages = captured = {}
+    try:
+        yield captured
+    finally:
+        STAGE_CAPTURE.stages = previous
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of ``values`` (``fraction`` in 0..1); ``None`` when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    started_at = time.monotonic()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.monotonic() - started_at)
@@ -0,0 +1,607 @@
+"""In-process stand-in for the game's ONI API, for offline integration tests and benchmarks.
+
+Serves the ``schemas/openapi.yaml`` surface over a simulated world grid:
+``dig``/``build``/``deconstruct`` change cells immediately and queue an
+errand on a duplicant, ``POST /mock/advance`` moves the clock forward and
+completes queued errands, and ``GET /stats`` reports per-endpoint counters
+like the C# mock in ``tests/csharp/OniApiMockServer``. Responses can be
+delayed per path, and ``serialize`` runs requests one at a time the way the
+runtime funnels work through the Unity main thread.
+"""
+
+import argparse
+import copy
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_MOCK_PORT = 18766
+MAX_CELL_RADIUS = 20
+# (name, phase); the list position is the element_index reported by /cells.
+ELEMENTS = (
+    ("Oxygen", "gas"),
+    ("CarbonDioxide", "gas"),
+    ("Water", "liquid"),
+    ("SandStone", "solid"),
+    ("Granite", "solid"),
+    ("IgneousRock", "solid"),
+    ("Unobtanium", "solid"),
+)
+ELEMENT_INDEX = {name: index for index, (name, _) in enumerate(ELEMENTS)}
+# The mock's element table, e.g. for ``GridArrays(element_ids=...)``.
+ELEMENT_IDS = tuple(name for name, _ in ELEMENTS)
+UNDIGGABLE_ELEMENTS = frozenset({ELEMENT_INDEX["Unobtanium"]})
+BUILDINGS = (
+    {"id": "Ladder", "name": "Ladder", "category": "Base"},
+    {"id": "Tile", "name": "Tile", "category": "Base"},
+    {"id": "ManualGenerator", "name": "Manual Generator", "category": "Power"},
+    {"id": "MineralDeoxidizer", "name": "Oxygen Diffuser", "category": "Oxygen"},
+    {"id": "Outhouse", "name": "Outhouse", "category": "Plumbing"},
+)
+RESEARCH = (
+    {"id": "FarmingTech", "name": "Basic Farming", "tier": "1"},
+    {"id": "BasicRefinement", "name": "Brute-Force Refinement", "tier": "1"},
+    {"id": "PowerRegulation", "name": "Power Regulation", "tier": "2"},
+)
+# Built in rather than read from examples/ so the mock also works from an installed wheel.
+DEFAULT_STATE = {
+    "context": {
+        "cycle": 42,
+        "time_since_cycle_start": 312.6,
+        "time_in_cycles": 42.52,
+        "paused": True,
+        "current_speed": 1,
+        "previous_speed": 2,
+    },
+    "duplicants": [
+        {
+            "id": "1001",
+            "name": "Ada",
+            "status": {"active_self": True, "active_in_hierarchy": True, "current_chore": "Idle"},
+            "priority": {"dig": 6, "build": 5, "life_support": 8},
+            "skills": ["ImprovedDigging1", "HardDigging"],
+        }
+    ],
+    "priorities": [
+        {"duplicant_id": "1001", "duplicant_name": "Ada", "values": {"dig": 6, "build": 5, "life_support": 8}},
+    ],
+    "runtime_config": {
+        "unity_version": "2021.3.39f1",
+        "platform": "MockPlayer",
+        "target_frame_rate": -1,
+        "product_name": "Oxygen Not Included",
+        "version": "U55-678078",
+        "scene_count": 1,
+    },
+    "world": {"world_id": 0, "biome": "Temperate"},
+}
+COUNTER_NAMES = (
+    "health",
+    "state",
+    "speed_get",
+    "speed_post",
+    "pause_get",
+    "pause_post",
+    "camera_get",
+    "camera_post",
+    "build_post",
+    "dig_post",
+    "deconstruct_post",
+    "research_get",
+    "research_post",
+    "buildings_get",
+    "priorities_get",
+    "priorities_post",
+    "pending_get",
+    "cells_get",
+    "runtime_get",
+)
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _load_state_template() -> dict:
+    return copy.deepcopy(DEFAULT_STATE)
+
+
+class MockWorld:
+    """Simulated ``width`` x ``height`` grid with breathable air above ``surface`` and rock below.
+
+    A water pocket sits under the surface, granite and igneous rock fill the
+    depths and the bottom row is undiggable, so plan validation hits every
+    outcome. ``seed`` scatters rock types reproducibly.
+    """
+
+    def __init__(self, width: int = 96, height: int = 64, surface: int = 40, seed: int = 0) -> None:
+        self.width = width
+        self.height = height
+        self.surface = surface
+        self.elements: list[int] = []
+        self.dug: set[int] = set()
+        self.buildings: dict[int, str] = {}
+        rng = random.Random(seed)
+        for y in range(height):
+            for x in range(width):
+                self.elements.append(self._initial_element(x, y, rng))
+
+    def _initial_element(self, x: int, y: int, rng: random.Random) -> int:
+        if y == 0:
+            return ELEMENT_INDEX["Unobtanium"]
+        if y >= self.surface:
+            return ELEMENT_INDEX["CarbonDioxide"] if y == self.surface and x % 7 == 0 else ELEMENT_INDEX["Oxygen"]
+        if self.surface - 12 <= y < self.surface - 6 and 8 <= x < 20:
+            return ELEMENT_INDEX["Water"]
+        if y < self.surface // 3:
+            return ELEMENT_INDEX["Granite"]
+        return ELEMENT_INDEX["IgneousRock"] if rng.random() < 0.15 else ELEMENT_INDEX["SandStone"]
+
+    def cell_index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def is_valid(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def phase(self, x: int, y: int) -> str:
+        return ELEMENTS[self.elements[self.cell_index(x, y)]][1]
+
+    def describe(self, x: int, y: int) -> dict[str, object]:
+        """One ``/cells`` item, with the fields the runtime reports for a grid cell."""
+        cell = self.cell_index(x, y) if self.is_valid(x, y) else -1
+        item: dict[str, object] = {"x": x, "y": y, "cell": cell, "is_valid_cell": cell >= 0}
+        if cell < 0:
+            return item
+        element_index = self.elements[cell]
+        phase = ELEMENTS[element_index][1]
+        # Like the runtime, report the element only by index: no name, mass or temperature.
+        item.update(
+            {
+                "is_solid": phase == "solid",
+                "is_liquid": phase == "liquid",
+                "is_gas": phase == "gas",
+                "is_dug": cell in self.dug,
+                "element_index": element_index,
+                "layers": {"building": self.buildings.get(cell)},
+            }
+        )
+        return item
+
+    def dig(self, x: int, y: int) -> str | None:
+        """Dig one cell; return why it was skipped, ``None`` when it was dug."""
+        if not self.is_valid(x, y):
+            return "outside_world"
+        cell = self.cell_index(x, y)
+        if self.phase(x, y) != "solid":
+            return "not_solid"
+        if self.elements[cell] in UNDIGGABLE_ELEMENTS:
+            return "undiggable"
+        self.elements[cell] = ELEMENT_INDEX["Oxygen"]
+        self.dug.add(cell)
+        return None
+
+    def build(self, x: int, y: int, building_id: str) -> str | None:
+        if not self.is_valid(x, y):
+            return "outside_world"
+        cell = self.cell_index(x, y)
+        if self.phase(x, y) == "solid":
+            return "blocked_by_solid"
+        if cell in self.buildings:
+            return "occupied"
+        self.buildings[cell] = building_id
+        return None
+
+    def deconstruct(self, x: int, y: int) -> str | None:
+        if not self.is_valid(x, y):
+            return "outside_world"
+        return None if self.buildings.pop(self.cell_index(x, y), None) is not None else "no_building"
+
+
+class MockOniApi:
+    """Game-side state behind the mock server; every mutation happens under ``lock``."""
+
+    def __init__(self, world: MockWorld | None = None, state: dict | None = None) -> None:
+        self.world = world or MockWorld()
+        self.state = copy.deepcopy(state) if state is not None else _load_state_template()
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.started_at_utc = _utc_now()
+        self.counters = dict.fromkeys(COUNTER_NAMES, 0)
+        self.operation_log: list[dict] = []
+        self.priority_updates: list[dict] = []
+        self.errands: dict[str, list[dict]] = {}
+        self.current_research = ""
+        self.camera = {"x": self.world.width / 2, "y": float(self.world.surface), "z": -10.0}
+        self._errand_ids = 0
+        for duplicant in self.state["duplicants"]:
+            status = duplicant.setdefault("status", {})
+            status.setdefault("current_chore", "Idle")
+            status.setdefault("stress", 10.0)
+            status.setdefault("breath", 100.0)
+            duplicant.setdefault("position", {"x": self.world.width // 2, "y": self.world.surface})
+
+    @property
+    def context(self) -> dict:
+        return self.state["context"]
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def _queue_errand(self, kind: str, x: int, y: int) -> None:
+        duplicants = self.state["duplicants"]
+        if not duplicants:
+            return
+        self._errand_ids += 1
+        # Errands go to whoever has the shortest queue, like a crowd of idle duplicants would take them.
+        duplicant = min(duplicants, key=lambda item: len(self.errands.get(str(item.get("id")), [])))
+        queue = self.errands.setdefault(str(duplicant.get("id")), [])
+        queue.append({"id": f"errand_{self._errand_ids}", "type": kind, "x": x, "y": y, "status": "queued"})
+        duplicant["status"]["current_chore"] = queue[0]["type"].capitalize()
+
+    def pending_actions(self) -> list[dict]:
+        pending = []
+        for duplicant in self.state["duplicants"]:
+            queue = self.errands.get(str(duplicant.get("id")), [])
+            pending.append(
+                {
+                    "duplicant_id": duplicant.get("id"),
+                    "duplicant_name": duplicant.get("name"),
+                    "current_action": copy.deepcopy(queue[0]) if queue else None,
+                    "chores": copy.deepcopy(queue[1:]),
+                }
+            )
+        return pending
+
+    def pending_count(self) -> int:
+        return sum(len(queue) for queue in self.errands.values())
+
+    def advance(self, cycles: int) -> dict[str, object]:
+        """Move the clock forward; duplicants finish every queued errand and go idle."""
+        completed = self.pending_count()
+        self.errands.clear()
+        self.context["cycle"] = int(self.context.get("cycle") or 0) + cycles
+        for duplicant in self.state["duplicants"]:
+            duplicant["status"]["current_chore"] = "Idle"
+        return {"status": "applied", "cycle": self.context["cycle"], "completed_errands": completed}
+
+    def snapshot(self) -> dict[str, object]:
+        state = copy.deepcopy(self.state)
+        state["pending_actions"] = self.pending_actions()
+        state["world"] = {**state.get("world", {}), "width": self.world.width, "height": self.world.height}
+        return {"state": state, "last_execution": None, "pending_action_count": self.pending_count()}
+
+    def apply_points(self, kind: str, body: dict) -> tuple[int, dict]:
+        points = body.get("points")
+        if points is None and isinstance(body.get("x"), int) and isinstance(body.get("y"), int):
+            points = [{"x": body["x"], "y": body["y"]}]
+        if "cells" in body and points is None:
+            return 400, {"error": "cells_not_supported_use_points"}
+        if not isinstance(points, list) or not points:
+            return 400, {"error": "points_required"}
+        if kind == "build" and not str(body.get("building_id") or "").strip():
+            return 400, {"error": "building_id_required"}
+
+        applied = 0
+        skipped = []
+        for point in points:
+            if not isinstance(point, dict) or not isinstance(point.get("x"), int) or not isinstance(point.get("y"), int):
+                return 400, {"error": "invalid_point"}
+            x, y = point["x"], point["y"]
+            if kind == "dig":
+                reason = self.world.dig(x, y)
+            elif kind == "build":
+                reason = self.world.build(x, y, str(body["building_id"]))
+            else:
+                reason = self.world.deconstruct(x, y)
+            if reason is None:
+                applied += 1
+                self._queue_errand(kind, x, y)
+            else:
+                skipped.append({"x": x, "y": y, "reason": reason})
+        self.operation_log.append({"type": kind, "request": body, "applied": applied, "skipped": skipped})
+        return 200, {
+            "status": "applied",
+            "message": f"{kind} applied to {applied} of {len(points)} cells",
+            "applied": applied,
+            "skipped": skipped,
+        }
+
+    def cells(self, x: int, y: int, radius: int) -> dict[str, object]:
+        items = [
+            self.world.describe(cx, cy)
+            for cy in range(y - radius, y + radius + 1)
+            for cx in range(x - radius, x + radius + 1)
+        ]
+        return {
+            "observed_at_utc": _utc_now(),
+            "requested_points": len(items),
+            "valid_cells": sum(1 for item in items if item["is_valid_cell"]),
+            "cells": items,
+        }
+
+
+class MockOniApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "MockOniApiServer"
+
+    def _send(self, status: int, body: dict) -> None:
+        encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _read_body(self) -> dict | None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            body = json.loads(raw.decode("utf-8")) if raw.strip() else {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        return body if isinstance(body, dict) else None
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        server = self.server
+        delay = server.latency_by_path.get(url.path, server.latency_seconds)
+        with server.main_thread if server.serialize else server.no_lock:
+            if delay > 0:
+                time.sleep(delay)
+            body = self._read_body() if method == "POST" else {}
+            if body is None:
+                self._send(400, {"error": "invalid_json"})
+                return
+            status, payload = server.route(method, url.path, parse_qs(url.query), body)
+            self._send(status, payload)
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle("POST")
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+class MockOniApiServer(ThreadingHTTPServer):
+    """Threaded HTTP server for :class:`MockOniApi`; ``start()`` returns once it accepts connections."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        api: MockOniApi | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_seconds: float = 0.0,
+        latency_by_path: dict[str, float] | None = None,
+        serialize: bool = False,
+    ) -> None:
+        super().__init__((host, port), MockOniApiHandler)
+        self.api = api or MockOniApi()
+        self.latency_seconds = latency_seconds
+        self.latency_by_path = latency_by_path or {}
+        self.serialize = serialize
+        self.main_thread = threading.Lock()
+        self.no_lock = _NoLock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOniApiServer":
+        # A short poll interval keeps stop() (and so each test using the mock) in the milliseconds.
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.01}, name="oni-ai-mock-api", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "MockOniApiServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def route(self, method: str, path: str, query: dict[str, list[str]], body: dict) -> tuple[int, dict]:
+        api = self.api
+        with api.lock:
+            context = api.context
+            speed = int(context.get("current_speed") or 1)
+            paused = bool(context.get("paused"))
+
+            if method == "GET":
+                if path == "/health":
+                    api.counters["health"] += 1
+                    return 200, {"ok": True, "busy": False, "current_speed": speed, "paused": paused, "service": "oni_api_mock"}
+                if path == "/runtime":
+                    api.counters["runtime_get"] += 1
+                    return 200, {
+                        "runtime_started_at_utc": api.started_at_utc,
+                        "observed_at_utc": _utc_now(),
+                        "uptime_seconds": int(time.monotonic() - api.started_at),
+                    }
+                if path == "/state":
+                    api.counters["state"] += 1
+                    return 200, api.snapshot()
+                if path == "/speed":
+                    api.counters["speed_get"] += 1
+                    return 200, {"speed": speed, "paused": paused}
+                if path == "/pause":
+                    api.counters["pause_get"] += 1
+                    return 200, {"paused": paused, "speed": speed}
+                if path == "/camera":
+                    api.counters["camera_get"] += 1
+                    return 200, {**api.camera, "world": {"width": api.world.width, "height": api.world.height}}
+                if path == "/priorities":
+                    api.counters["priorities_get"] += 1
+                    return 200, {
+                        "priorities": copy.deepcopy(api.state["priorities"]),
+                        "updates": copy.deepcopy(api.priority_updates),
+                        "source": "game_live",
+                    }
+                if path == "/actions/pending":
+                    api.counters["pending_get"] += 1
+                    pending = api.pending_actions()
+                    return 200, {
+                        "source": "game_live",
+                        "observed_at_utc": _utc_now(),
+                        "counts": {
+                            "duplicants": len(pending),
+                            "with_current_action": sum(1 for item in pending if item["current_action"]),
+                            "with_chore_queue": sum(1 for item in pending if item["chores"]),
+                        },
+                        "pending_actions": pending,
+                    }
+                if path == "/buildings":
+                    api.counters["buildings_get"] += 1
+                    return 200, {
+                        "available": list(BUILDINGS),
+                        "potential": [],
+                        "counts": {"available": len(BUILDINGS), "potential": 0},
+                    }
+                if path == "/research":
+                    api.counters["research_get"] += 1
+                    return 200, {
+                        "current": api.current_research,
+                        "available": list(RESEARCH),
+                        "potential": [],
+                        "counts": {"available": len(RESEARCH), "potential": 0},
+                    }
+                if path == "/cells" or path.startswith("/cells/"):
+                    api.counters["cells_get"] += 1
+                    return self._cells(path, query)
+                if path == "/stats":
+                    return 200, {
+                        "counters": dict(api.counters),
+                        "pending_action_count": api.pending_count(),
+                        "operation_log": copy.deepcopy(api.operation_log),
+                    }
+                return 404, {"error": "not_found"}
+
+            if path == "/speed":
+                api.counters["speed_post"] += 1
+                new_speed = body.get("speed")
+                if new_speed not in (1, 2, 3) or isinstance(new_speed, bool):
+                    return 400, {"error": "invalid_speed"}
+                context.update({"previous_speed": speed, "current_speed": new_speed, "paused": False})
+                api.operation_log.append({"type": "speed", "speed": new_speed})
+                return 200, {"status": "applied", "speed": new_speed, "paused": False}
+            if path == "/pause":
+                api.counters["pause_post"] += 1
+                if not isinstance(body.get("paused"), bool):
+                    return 400, {"error": "paused_required"}
+                context["paused"] = body["paused"]
+                api.operation_log.append({"type": "pause", "paused": body["paused"]})
+                return 200, {"status": "applied", "paused": body["paused"], "speed": speed}
+            if path == "/camera":
+                api.counters["camera_post"] += 1
+                for axis in ("x", "y"):
+                    if isinstance(body.get(axis), (int, float)) and not isinstance(body.get(axis), bool):
+                        api.camera[axis] = float(body[axis])
+                return 200, {"status": "applied", **api.camera, "world": {"width": api.world.width, "height": api.world.height}}
+            if path in {"/dig", "/build", "/deconstruct"}:
+                api.counters[f"{path[1:]}_post"] += 1
+                return api.apply_points(path[1:], body)
+            if path == "/research":
+                api.counters["research_post"] += 1
+                tech_id = str(body.get("tech_id") or "").strip()
+                if not tech_id:
+                    return 400, {"error": "tech_id_required"}
+                api.current_research = tech_id
+                api.operation_log.append({"type": "research", "request": body})
+                return 200, {"status": "applied", "message": f"research set to {tech_id}"}
+            if path == "/priorities":
+                api.counters["priorities_post"] += 1
+                updates = body.get("priorities", body.get("updates"))
+                if not isinstance(updates, list):
+                    return 400, {"error": "priorities_must_be_array"}
+                results = []
+                for update in updates:
+                    ok = isinstance(update, dict) and bool(update.get("duplicant_id")) and isinstance(update.get("values"), dict)
+                    if ok:
+                        api.priority_updates.append(copy.deepcopy(update))
+                    results.append({"duplicant_id": update.get("duplicant_id") if isinstance(update, dict) else None, "ok": ok})
+                accepted = sum(1 for result in results if result["ok"])
+                failed = len(results) - accepted
+                status = "applied" if not failed else "partial" if accepted else "failed"
+                return 200, {"accepted": accepted, "failed": failed, "status": status, "results": results}
+            if path == "/mock/advance":
+                cycles = body.get("cycles", 1)
+                if not isinstance(cycles, int) or isinstance(cycles, bool) or cycles < 0:
+                    return 400, {"error": "invalid_cycles"}
+                return 200, api.advance(cycles)
+            return 404, {"error": "not_found"}
+
+    def _cells(self, path: str, query: dict[str, list[str]]) -> tuple[int, dict]:
+        try:
+            if path == "/cells":
+                x, y = int(query["x"][0]), int(query["y"][0])
+            else:
+                x_raw, y_raw = path[len("/cells/") :].split("/")
+                x, y = int(x_raw), int(y_raw)
+            radius = int((query.get("radius") or ["0"])[0])
+        except (KeyError, ValueError):
+            return 400, {"error": "x_and_y_required"}
+        if not 0 <= radius <= MAX_CELL_RADIUS:
+            return 400, {"error": "invalid_radius"}
+        return 200, self.api.cells(x, y, radius)
+
+
+class _NoLock:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="oni-ai-mock-api", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_MOCK_PORT)
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay added to every response")
+    parser.add_argument("--serialize", action="store_true", help="handle one request at a time, like the Unity main thread")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    world = MockWorld(width=args.width, height=args.height, surface=args.height * 5 // 8, seed=args.seed)
+    server = MockOniApiServer(
+        MockOniApi(world),
+        host=args.host,
+        port=args.port,
+        latency_seconds=max(0, args.latency_ms) / 1000.0,
+        serialize=args.serialize,
+    )
+    print(f"mock_oni_api_listening={server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
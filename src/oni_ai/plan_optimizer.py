@@ -0,0 +1,188 @@
+"""Coalesce generated plans into fewer, larger actions before the game applies them.
+
+Every ``dig``/``deconstruct``/``build`` action costs the runtime one hop onto
+the Unity main thread, so runs of adjacent actions that only differ in their
+points are merged and back-to-back priority updates for one duplicant are
+folded together. Only neighbours are combined, so no action ever runs
+before something the model placed ahead of it, and actions that are not
+combined with anything are passed through unchanged. On
+request the plan is also ordered so that cancels and bookkeeping run before
+tool actions; ``pause`` and ``set_speed`` keep the position the model gave
+them, since pausing first to stabilise the colony is a deliberate choice.
+"""
+
+import json
+from dataclasses import dataclass
+
+from oni_ai.cells import Point
+from oni_ai.plan_validator import action_points, repair_points
+
+
+MERGEABLE_ACTIONS = frozenset({"dig", "deconstruct", "build"})
+PRIORITY_ACTIONS = frozenset({"set_duplicant_priority", "priority"})
+PINNED_ACTIONS = frozenset({"pause", "set_speed"})
+# Lower phases run first; unknown action types sit between tool actions and the camera.
+ACTION_PHASES = {
+    "cancel": 0,
+    "set_duplicant_priority": 1,
+    "priority": 1,
+    "set_duplicant_skills": 1,
+    "set_duplicant_status": 1,
+    "research": 1,
+    "deconstruct": 2,
+    "dig": 3,
+    "build": 4,
+    "camera": 6,
+}
+UNKNOWN_PHASE = 5
+
+
+@dataclass
+class OptimizationReport:
+    input_actions: int = 0
+    output_actions: int = 0
+    merged: int = 0
+    deduplicated: int = 0
+    reordered: bool = False
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "input_actions": self.input_actions,
+            "output_actions": self.output_actions,
+            "merged": self.merged,
+            "deduplicated": self.deduplicated,
+            "reordered": self.reordered,
+        }
+
+
+def cells_to_rects(points: list[Point]) -> list[tuple[int, int, int, int]]:
+    """Cover ``points`` exactly with greedy row-major rectangles ``(x0, y0, x1, y1)``."""
+    remaining = set(points)
+    rects = []
+    for x, y in sorted(remaining, key=lambda point: (point[1], point[0])):
+        if (x, y) not in remaining:
+            continue
+        x1 = x
+        while (x1 + 1, y) in remaining:
+            x1 += 1
+        y1 = y
+        while all((cx, y1 + 1) in remaining for cx in range(x, x1 + 1)):
+            y1 += 1
+        for cy in range(y, y1 + 1):
+            for cx in range(x, x1 + 1):
+                remaining.discard((cx, cy))
+        rects.append((x, y, x1, y1))
+    return rects
+
+
+def _merge_key(action: dict) -> str | None:
+    params = action.get("params")
+    if action.get("type") not in MERGEABLE_ACTIONS or not isinstance(params, dict) or not action_points(action):
+        return None
+    rest = {key: value for key, value in params.items() if key not in {"points", "rects"}}
+    return json.dumps([action["type"], rest], sort_keys=True, ensure_ascii=False)
+
+
+def _priority_target(action: dict) -> str | None:
+    params = action.get("params")
+    if action.get("type") not in PRIORITY_ACTIONS or not isinstance(params, dict):
+        return None
+    if not isinstance(params.get("priorities"), dict):
+        return None
+    target = params.get("duplicant_id") or params.get("duplicant_name")
+    return f"{action['type']}:{target}" if target else None
+
+
+def _with_points(action: dict, points: list[Point]) -> dict:
+    rects = cells_to_rects(points)
+    ordered = [
+        {"x": x, "y": y}
+        for x0, y0, x1, y1 in rects
+        for y in range(y0, y1 + 1)
+        for x in range(x0, x1 + 1)
+    ]
+    params = {**action["params"], "points": ordered}
+    params["rects"] = [{"x0": x0, "y0": y0, "x1": x1, "y1": y1} for x0, y0, x1, y1 in rects]
+    return {**action, "params": params}
+
+
+def reorder_actions(actions: list[dict]) -> list[dict]:
+    """Sort actions by phase (stable) while ``pause``/``set_speed`` stay at their original indices."""
+    movable = sorted(
+        (action for action in actions if action.get("type") not in PINNED_ACTIONS),
+        key=lambda action: ACTION_PHASES.get(str(action.get("type")), UNKNOWN_PHASE),
+    )
+    refill = iter(movable)
+    return [action if action.get("type") in PINNED_ACTIONS else next(refill) for action in actions]
+
+
+def optimize_plan(plan: dict, reorder: bool = False) -> tuple[dict, OptimizationReport]:
+    """Merge adjacent point actions, fold adjacent priority updates, drop repeats and (optionally) reorder."""
+    report = OptimizationReport()
+    actions = plan.get("actions")
+    if not isinstance(actions, list):
+        return plan, report
+    report.input_actions = len(actions)
+
+    # Actions a cancel in the same plan refers to keep their own identity.
+    cancelled = {
+        str(action["params"].get("target_action_id"))
+        for action in actions
+        if action.get("type") == "cancel" and isinstance(action.get("params"), dict)
+    }
+    output: list[dict] = []
+    # Points and merged ids of the run ending at output[-1], when it is a mergeable action.
+    run: tuple[str, dict[Point, None], list] | None = None
+    previous_fingerprint: str | None = None
+
+    for action in actions:
+        if isinstance(action.get("params"), dict):
+            action = {**action, "params": repair_points(action["params"])}
+        # Only a back-to-back repeat is redundant; after another action it may be deliberate.
+        fingerprint = json.dumps([action.get("type"), action.get("params")], sort_keys=True, ensure_ascii=False)
+        if fingerprint == previous_fingerprint:
+            report.deduplicated += 1
+            continue
+        previous_fingerprint = fingerprint
+
+        if str(action.get("id")) in cancelled:
+            output.append(action)
+            run = None
+            continue
+
+        merge_key = _merge_key(action)
+        if merge_key is not None and run is not None and run[0] == merge_key:
+            _, points, merged_ids = run
+            points.update(dict.fromkeys(action_points(action)))
+            merged_ids.append(action.get("id"))
+            report.merged += 1
+            continue
+        _close_run(output, run)
+        run = (merge_key, dict.fromkeys(action_points(action)), []) if merge_key is not None else None
+
+        target = _priority_target(action)
+        if target is not None and output and _priority_target(output[-1]) == target:
+            first = output[-1]
+            merged_priorities = {**first["params"]["priorities"], **action["params"]["priorities"]}
+            output[-1] = {**first, "params": {**first["params"], "priorities": merged_priorities}}
+            report.deduplicated += 1
+            continue
+        output.append(action)
+    _close_run(output, run)
+
+    if reorder:
+        ordered = reorder_actions(output)
+        report.reordered = ordered != output
+        output = ordered
+    report.output_actions = len(output)
+    return {**plan, "actions": output}, report
+
+
+def _close_run(output: list[dict], run: tuple[str, dict[Point, None], list] | None) -> None:
+    """Rewrite the last output action with its run's points; a run of one is left as the model wrote it."""
+    if run is None or not run[2]:
+        return
+    _, points, merged_ids = run
+    merged = _with_points(output[-1], list(points))
+    merged["merged_ids"] = merged_ids
+    output[-1] = merged
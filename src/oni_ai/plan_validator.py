@@ -0,0 +1,254 @@
+"""Check normalized plans against the ONI API schemas and live cell facts before they reach the game.
+
+Schema checks need PyYAML (``pip install 'oni-ai[validate]'``); without it
+only the cell checks run.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from oni_ai.cells import CellInspector, Point, RecordedCellInspector
+from oni_ai.schema_validation import OPENAPI_PATH, Validator, clear_spec_cache, compile_schema, load_openapi_spec, resolve_refs
+
+
+VALIDATION_MODES = ("drop", "flag", "off")
+# Plan action types that the runtime applies through the matching POST endpoint.
+ACTION_ENDPOINTS = {
+    "set_speed": "/speed",
+    "pause": "/pause",
+    "camera": "/camera",
+    "build": "/build",
+    "dig": "/dig",
+    "deconstruct": "/deconstruct",
+    "research": "/research",
+}
+CELL_ACTIONS = frozenset({"dig", "build", "deconstruct"})
+NEIGHBOR_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+VALIDATORS_LOCK = threading.Lock()
+VALIDATORS_CACHE: dict[Path, dict[str, Validator] | None] = {}
+
+
+def action_schemas_from_spec(spec: dict) -> dict[str, dict]:
+    schemas = {}
+    paths = spec.get("paths") if isinstance(spec.get("paths"), dict) else {}
+    for action_type, path in ACTION_ENDPOINTS.items():
+        operation = (paths.get(path) or {}).get("post") or {}
+        content = ((operation.get("requestBody") or {}).get("content") or {}).get("application/json") or {}
+        if isinstance(content.get("schema"), dict):
+            schemas[action_type] = resolve_refs(content["schema"], spec)
+    return schemas
+
+
+def compile_action_validators(spec: dict) -> dict[str, Validator]:
+    return {action_type: compile_schema(schema) for action_type, schema in action_schemas_from_spec(spec).items()}
+
+
+def load_action_validators(path: Path = OPENAPI_PATH) -> dict[str, Validator] | None:
+    """Compiled request-body validators keyed by action type, built once per spec file; ``None`` without PyYAML."""
+    with VALIDATORS_LOCK:
+        if path in VALIDATORS_CACHE:
+            return VALIDATORS_CACHE[path]
+        spec = load_openapi_spec(path)
+        validators = compile_action_validators(spec) if spec is not None else None
+        VALIDATORS_CACHE[path] = validators
+        return validators
+
+
+def clear_validator_cache() -> None:
+    with VALIDATORS_LOCK:
+        VALIDATORS_CACHE.clear()
+    clear_spec_cache()
+
+
+def _grid_point(value: object) -> dict[str, int] | None:
+    if not isinstance(value, dict):
+        return None
+    x, y = value.get("x"), value.get("y")
+    if isinstance(x, int) and isinstance(y, int) and not isinstance(x, bool) and not isinstance(y, bool):
+        return {"x": x, "y": y}
+    return None
+
+
+def repair_points(params: dict) -> dict:
+    """Move ``cells``/``cell``/``x``+``y`` coordinates into ``points``.
+
+    The runtime reads ``points`` and ``x``/``y`` but rejects ``cells``; keeping
+    every coordinate in ``points`` lets the cell checks see them all.
+    """
+    if "points" in params:
+        return params
+    repaired = dict(params)
+    points = []
+    if isinstance(repaired.get("cells"), list):
+        coordinates = [_grid_point(item) for item in repaired["cells"]]
+        # Raw numeric cell ids cannot be mapped back to coordinates; leave them for the schema check.
+        if coordinates and all(point is not None for point in coordinates):
+            points.extend(coordinates)
+            del repaired["cells"]
+    if _grid_point(repaired.get("cell")) is not None:
+        points.append(_grid_point(repaired.pop("cell")))
+    single = _grid_point(repaired)
+    if single is not None:
+        points.append(single)
+        repaired.pop("x")
+        repaired.pop("y")
+    if not points:
+        return params
+    repaired["points"] = points
+    return repaired
+
+
+def action_points(action: dict) -> list[Point]:
+    params = action.get("params")
+    points = params.get("points") if isinstance(params, dict) else None
+    if not isinstance(points, list):
+        return []
+    return [(point["x"], point["y"]) for point in map(_grid_point, points) if point is not None]
+
+
+def cell_errors(action_type: str, point: Point, cells: dict[Point, dict]) -> list[str]:
+    """Reasons the game would reject or regret ``action_type`` at ``point``; unknown cells pass."""
+    cell = cells.get(point)
+    if cell is None:
+        return []
+    label = f"cell ({point[0]},{point[1]})"
+    if cell.get("is_valid_cell") is False:
+        return [f"{label}: outside the world"]
+    if action_type == "dig":
+        if cell.get("is_solid") is False or cell.get("is_dug") is True:
+            return [f"{label}: nothing to dig"]
+        for dx, dy in NEIGHBOR_OFFSETS:
+            neighbor = cells.get((point[0] + dx, point[1] + dy))
+            if neighbor is not None and neighbor.get("is_liquid") is True:
+                return [f"{label}: would breach liquid at ({point[0] + dx},{point[1] + dy})"]
+    if action_type == "build" and cell.get("is_solid") is True:
+        return [f"{label}: blocked by solid tile"]
+    return []
+
+
+def _needed_cells(actions: list[dict]) -> list[Point]:
+    needed: dict[Point, None] = {}
+    for action in actions:
+        if action.get("type") not in CELL_ACTIONS:
+            continue
+        for x, y in action_points(action):
+            needed[(x, y)] = None
+            if action.get("type") == "dig":
+                for dx, dy in NEIGHBOR_OFFSETS:
+                    needed[(x + dx, y + dy)] = None
+    return list(needed)
+
+
+@dataclass
+class ValidationReport:
+    mode: str
+    checked: int = 0
+    repaired: int = 0
+    cells_checked: int = 0
+    cells_error: str | None = None
+    rejected: list[dict] = field(default_factory=list)
+    # The cell facts the checks used; kept out of as_dict() and recorded separately for replays.
+    cells: dict[Point, dict] = field(default_factory=dict, repr=False)
+
+    def as_dict(self) -> dict[str, object]:
+        report: dict[str, object] = {
+            "mode": self.mode,
+            "checked": self.checked,
+            "repaired": self.repaired,
+            "cells_checked": self.cells_checked,
+            "rejected": self.rejected,
+        }
+        if self.cells_error is not None:
+            report["cells_error"] = self.cells_error
+        return report
+
+
+class PlanValidator:
+    """Drop (or flag) plan actions that fail their schema or target cells the game cannot use.
+
+    In ``drop`` mode invalid points are removed from cell actions and an
+    action is dropped once none remain; ``flag`` keeps every action and
+    marks the invalid ones with ``validation_errors``.
+    """
+
+    def __init__(
+        self,
+        validators: dict[str, Validator] | None,
+        inspector: CellInspector | RecordedCellInspector | None = None,
+        mode: str = "drop",
+    ) -> None:
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"unsupported validation mode: {mode}")
+        self.validators = validators or {}
+        self.inspector = inspector
+        self.mode = mode
+
+    def fetch_cells(self, actions: list[dict], cycle: object, report: ValidationReport) -> dict[Point, dict]:
+        if self.inspector is None:
+            return {}
+        needed = _needed_cells(actions)
+        if not needed:
+            return {}
+        try:
+            cells = self.inspector.inspect_points(needed, cycle)
+        except (OSError, RuntimeError, ValueError) as exc:
+            # Missing cell facts must not block a plan; the game still rejects bad cells itself.
+            report.cells_error = f"{type(exc).__name__}: {exc}"
+            return {}
+        report.cells_checked = len(cells)
+        report.cells = cells
+        return cells
+
+    def validate_action(self, action: dict, cells: dict[Point, dict]) -> tuple[dict | None, list[str]]:
+        """Return the action to keep (``None`` to drop) and the problems found."""
+        action_type = str(action.get("type", ""))
+        params = action.get("params")
+        errors: list[str] = []
+        validator = self.validators.get(action_type)
+        if validator is not None:
+            errors = [f"params{error}" for error in validator(params if params is not None else {})]
+        if errors or action_type not in CELL_ACTIONS or not cells:
+            return (None if errors and self.mode == "drop" else action), errors
+
+        kept, point_errors = [], []
+        for point in action_points(action):
+            problems = cell_errors(action_type, point, cells)
+            point_errors.extend(problems)
+            if not problems:
+                kept.append({"x": point[0], "y": point[1]})
+        if not point_errors or self.mode == "flag":
+            return action, point_errors
+        if not kept:
+            return None, point_errors
+        return {**action, "params": {**params, "points": kept}}, point_errors
+
+    def validate(self, plan: dict, cycle: object = None) -> tuple[dict, ValidationReport]:
+        report = ValidationReport(self.mode)
+        actions = plan.get("actions")
+        if self.mode == "off" or not isinstance(actions, list):
+            return plan, report
+
+        prepared = []
+        for action in actions:
+            if isinstance(action.get("params"), dict):
+                params = repair_points(action["params"])
+                if params is not action["params"]:
+                    report.repaired += 1
+                    action = {**action, "params": params}
+            prepared.append(action)
+
+        cells = self.fetch_cells(prepared, cycle, report)
+        validated = []
+        for action in prepared:
+            report.checked += 1
+            kept, errors = self.validate_action(action, cells)
+            if errors:
+                report.rejected.append(
+                    {"id": action.get("id"), "type": action.get("type"), "dropped": kept is None, "errors": errors}
+                )
+                if kept is not None and self.mode == "flag":
+                    kept = {**kept, "validation_errors": errors}
+            if kept is not None:
+                validated.append(kept)
+        return {**plan, "actions": validated}, report
@@ -0,0 +1,260 @@
+"""Re-run recorded request dirs through the bridge pipeline offline.
+
+Each request dir left behind by the bridge holds the request payload, the
+codex output (``logs/codex_stdout.txt``, ``codex_stderr.txt``,
+``codex_exit_code.txt``, ``codex_last_message.json``), the cell facts plan
+validation checked against and the plan the bridge returned. A replay copies
+the dir to a scratch location, feeds the recorded output and cells back
+through ``call_codex_exec`` with a recorded backend and inspector, and
+reports per-stage timings plus a diff against the recorded (or a baseline
+report's) plan. Requests are spread over a process pool.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from oni_ai import ai_bridge, metrics
+from oni_ai.backends import RecordedBackend
+from oni_ai.cells import RecordedCellInspector
+
+
+# The replayed pipeline must not wait on screenshots, reach the game or reuse cached plans.
+REPLAY_ENV = {
+    "ONI_AI_SCREENSHOT_WAIT_MS": "0",
+    "ONI_AI_LIVE_STATE": "0",
+    "ONI_AI_DECISION_CACHE": "0",
+    "ONI_AI_STREAM_ACTIONS": "0",
+}
+DIFF_LINE_LIMIT = 200
+
+
+@dataclass
+class Recording:
+    request_dir: Path
+    payload: dict
+    stdout: str
+    stderr: str
+    return_code: int
+    last_message: str | None
+    response: str | None
+    cells: list[dict] | None = None
+
+
+def _read_text(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def is_recorded_request_dir(path: Path) -> bool:
+    logs_dir = path / "logs"
+    return (logs_dir / "codex_stdout.txt").is_file() or (logs_dir / "codex_last_message.json").is_file()
+
+
+def discover_request_dirs(paths: list[Path]) -> list[Path]:
+    """Expand each path into itself when it is a recorded request dir, else its recorded children."""
+    found = []
+    for path in paths:
+        if is_recorded_request_dir(path):
+            found.append(path)
+        elif path.is_dir():
+            found.extend(
+                child
+                for child in sorted(path.iterdir())
+                if child.is_dir() and not child.name.startswith(".") and is_recorded_request_dir(child)
+            )
+    return found
+
+
+def load_recording(request_dir: Path) -> Recording:
+    logs_dir = request_dir / "logs"
+    payload_text = _read_text(logs_dir / ai_bridge.REQUEST_PAYLOAD_FILE_NAME)
+    payload = json.loads(payload_text) if payload_text else {"request_id": request_dir.name}
+    exit_code_text = (_read_text(logs_dir / "codex_exit_code.txt") or "0").strip()
+    cells_text = _read_text(logs_dir / ai_bridge.VALIDATION_CELLS_FILE_NAME)
+    cells = json.loads(cells_text) if cells_text else None
+    return Recording(
+        request_dir=request_dir,
+        payload=payload if isinstance(payload, dict) else {"request_id": request_dir.name},
+        stdout=_read_text(logs_dir / "codex_stdout.txt") or "",
+        stderr=_read_text(logs_dir / "codex_stderr.txt") or "",
+        return_code=int(exit_code_text) if exit_code_text.lstrip("-").isdigit() else 0,
+        last_message=_read_text(logs_dir / "codex_last_message.json"),
+        response=_read_text(logs_dir / ai_bridge.BRIDGE_RESPONSE_FILE_NAME),
+        cells=[cell for cell in cells if isinstance(cell, dict)] if isinstance(cells, list) else None,
+    )
+
+
+def _pretty(plan_text: str) -> list[str]:
+    try:
+        return json.dumps(json.loads(plan_text), indent=2, sort_keys=True, ensure_ascii=False).splitlines()
+    except json.JSONDecodeError:
+        return plan_text.splitlines()
+
+
+def diff_plans(expected: str, actual: str, label: str = "plan") -> list[str]:
+    """Unified diff of two plans after canonical JSON formatting; empty when they are equal."""
+    diff = list(
+        difflib.unified_diff(_pretty(expected), _pretty(actual), f"recorded/{label}", f"replayed/{label}", lineterm="")
+    )
+    if len(diff) > DIFF_LINE_LIMIT:
+        diff = [*diff[:DIFF_LINE_LIMIT], f"... {len(diff) - DIFF_LINE_LIMIT} more diff lines"]
+    return diff
+
+
+def replay_request(request_dir: str, work_root: str, expected: str | None = None) -> dict[str, object]:
+    """Replay one request dir in a scratch copy; ``expected`` overrides the recorded plan to diff against."""
+    recording = load_recording(Path(request_dir))
+    workdir = Path(tempfile.mkdtemp(prefix=f"{recording.request_dir.name}_", dir=work_root))
+    shutil.copytree(recording.request_dir, workdir, ignore=shutil.ignore_patterns("logs"), dirs_exist_ok=True)
+    # Live state and cell fetches would need the game; the cell checks are answered from the recording.
+    payload = {key: value for key, value in recording.payload.items() if key != "api_base_url"}
+    payload["request_dir"] = str(workdir)
+    backend = RecordedBackend(recording.stdout, recording.stderr, recording.return_code, recording.last_message)
+    inspector = RecordedCellInspector(recording.cells) if recording.cells is not None else None
+
+    request_tag = f"replay:{recording.request_dir.name}"
+    error = None
+    response = None
+    started_at = time.monotonic()
+    with metrics.capture_stages() as stages:
+        try:
+            response = ai_bridge.call_codex_exec(payload, request_tag=request_tag, backend=backend, cell_inspector=inspector)
+        except Exception as exc:  # a failing replay is a result, not a reason to stop the corpus
+            error = f"{type(exc).__name__}: {exc}"
+    elapsed_seconds = time.monotonic() - started_at
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = expected if expected is not None else recording.response
+    diff = diff_plans(expected, response) if expected is not None and response is not None else None
+    return {
+        "request_dir": str(recording.request_dir),
+        "request_id": str(recording.payload.get("request_id") or recording.request_dir.name),
+        "status": "failed" if error is not None else "completed",
+        "error": error,
+        "elapsed_ms": round(elapsed_seconds * 1000, 3),
+        "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in sorted(stages.items())},
+        "action_count": ai_bridge.count_actions(response) if response is not None else 0,
+        "compared": expected is not None,
+        "changed": bool(diff) or (expected is not None and response is None),
+        "diff": diff or [],
+        "response": response,
+    }
+
+
+def _init_worker(env: dict[str, str]) -> None:
+    os.environ.update(env)
+
+
+def summarize_results(results: list[dict], wall_seconds: float) -> dict[str, object]:
+    stage_values: dict[str, list[float]] = {}
+    for result in results:
+        for stage, value in result["stages_ms"].items():
+            stage_values.setdefault(stage, []).append(value)
+    elapsed = [result["elapsed_ms"] for result in results]
+    return {
+        "requests": len(results),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "compared": sum(1 for result in results if result["compared"]),
+        "changed": sum(1 for result in results if result["changed"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "requests_per_second": round(len(results) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "elapsed_ms": {"p50": metrics.percentile(elapsed, 0.5), "p95": metrics.percentile(elapsed, 0.95), "max": max(elapsed, default=None)},
+        "stages_ms": {
+            stage: {
+                "p50": metrics.percentile(values, 0.5),
+                "p95": metrics.percentile(values, 0.95),
+                "max": max(values),
+                "total": round(sum(values), 3),
+            }
+            for stage, values in sorted(stage_values.items())
+        },
+    }
+
+
+def replay_corpus(
+    request_dirs: list[Path],
+    workers: int = 1,
+    baseline: dict[str, str] | None = None,
+    env: dict[str, str] | None = None,
+) -> dict[str, object]:
+    """Replay ``request_dirs`` across ``workers`` processes and return the JSON report."""
+    replay_env = {**REPLAY_ENV, **(env or {})}
+    baseline = baseline or {}
+    started_at = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix="oni_ai_replay_") as work_root:
+        replay_env.setdefault("ONI_AI_REQUEST_ROOT", work_root)
+        args = [(str(path), work_root, baseline.get(str(path))) for path in request_dirs]
+        if workers <= 1:
+            previous = {name: os.environ.get(name) for name in replay_env}
+            _init_worker(replay_env)
+            try:
+                results = [replay_request(*item) for item in args]
+            finally:
+                for name, value in previous.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(replay_env,)) as pool:
+                results = list(pool.map(replay_request, *zip(*args)))
+    return {"summary": summarize_results(results, time.monotonic() - started_at), "results": results}
+
+
+def load_baseline(path: Path) -> dict[str, str]:
+    """Map request dir -> plan from an earlier replay report, to diff behaviour across versions."""
+    report = json.loads(path.read_text(encoding="utf-8"))
+    return {
+        str(result["request_dir"]): result["response"]
+        for result in report.get("results", [])
+        if isinstance(result.get("response"), str)
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="oni-ai-replay", description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", type=Path, help="recorded request dirs, or dirs containing them")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="replay processes (default: CPU count)")
+    parser.add_argument("--baseline", type=Path, help="earlier replay report to diff plans against instead of the recorded ones")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--fail-on-diff", action="store_true", help="exit 1 when a replay fails or its plan changed")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("ONI_AI_LOG_LEVEL", "WARNING")
+    ai_bridge.configure_logging()
+    request_dirs = discover_request_dirs(args.paths)
+    if not request_dirs:
+        parser.error("no recorded request dirs found")
+    report = replay_corpus(
+        request_dirs,
+        workers=max(1, args.workers),
+        baseline=load_baseline(args.baseline) if args.baseline else None,
+    )
+
+    encoded = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(encoded + "\n", encoding="utf-8")
+    else:
+        print(encoded)
+    summary = report["summary"]
+    print(
+        f"replayed={summary['requests']} failed={summary['failed']} changed={summary['changed']} "
+        f"wall_seconds={summary['wall_seconds']}",
+        file=sys.stderr,
+    )
+    return 1 if args.fail_on_diff and (summary["failed"] or summary["changed"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import logging
+import os
+import shutil
+import tarfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+
+LOGGER = logging.getLogger("oni_ai")
+ARCHIVE_DIR_NAME = ".archive"
+ARCHIVE_SUFFIX = ".tar.gz"
+
+
+@dataclass
+class RetentionPolicy:
+    max_age_seconds: int = 3 * 24 * 3600
+    max_total_bytes: int = 1024 * 1024 * 1024
+    max_count: int = 200
+    archive_after_seconds: int = 0
+    interval_seconds: int = 300
+
+
+@dataclass
+class RetentionEntry:
+    path: Path
+    newest_mtime: float
+    size_bytes: int
+    is_archive: bool
+
+
+def scan_entry(path: Path) -> RetentionEntry:
+    if path.is_file():
+        stat_result = path.stat()
+        return RetentionEntry(path, stat_result.st_mtime, stat_result.st_size, True)
+
+    newest_mtime = path.stat().st_mtime
+    size_bytes = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat_result = os.lstat(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            size_bytes += stat_result.st_size
+            newest_mtime = max(newest_mtime, stat_result.st_mtime)
+    return RetentionEntry(path, newest_mtime, size_bytes, False)
+
+
+class RetentionService:
+    """Background sweeper enforcing age, size and count quotas over the request root.
+
+    Request dirs are the non-hidden children of the root; archives live in
+    ``<root>/.archive``. Other hidden children (job index, caches) and dirs
+    reported by ``is_protected`` are never touched.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        policy: RetentionPolicy,
+        is_protected: Callable[[Path], bool] = lambda path: False,
+    ) -> None:
+        self.root = root
+        self.policy = policy
+        self.is_protected = is_protected
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats: dict[str, object] = {
+            "sweeps": 0,
+            "deleted": 0,
+            "archived": 0,
+            "freed_bytes": 0,
+            "errors": 0,
+            "tracked_count": 0,
+            "tracked_bytes": 0,
+            "last_sweep_at": None,
+            "last_sweep_ms": None,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="oni-ai-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception:  # keep the sweeper alive across unexpected filesystem errors
+                LOGGER.exception("retention sweep failed root=%s", self.root)
+                with self._lock:
+                    self._stats["errors"] = int(self._stats["errors"]) + 1
+            self._stop.wait(max(1, self.policy.interval_seconds))
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "max_age_seconds": self.policy.max_age_seconds,
+                "max_total_bytes": self.policy.max_total_bytes,
+                "max_count": self.policy.max_count,
+                "archive_after_seconds": self.policy.archive_after_seconds,
+                **self._stats,
+            }
+
+    def list_entries(self) -> list[RetentionEntry]:
+        entries = []
+        candidates = [path for path in self.root.iterdir() if not path.name.startswith(".") and path.is_dir()]
+        archive_dir = self.root / ARCHIVE_DIR_NAME
+        if archive_dir.is_dir():
+            candidates.extend(path for path in archive_dir.iterdir() if path.name.endswith(ARCHIVE_SUFFIX))
+
+        for path in candidates:
+            if path.is_symlink() or self.is_protected(path):
+                continue
+            try:
+                entries.append(scan_entry(path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def sweep(self, now: float | None = None) -> dict[str, int]:
+        """Apply the policy once and return this sweep's counters."""
+        now = time.time() if now is None else now
+        started_at = time.monotonic()
+        result = {"deleted": 0, "archived": 0, "freed_bytes": 0, "errors": 0}
+        if not self.root.is_dir():
+            return result
+
+        kept = []
+        for entry in self.list_entries():
+            age_seconds = now - entry.newest_mtime
+            if self.policy.max_age_seconds > 0 and age_seconds > self.policy.max_age_seconds:
+                self._delete(entry, result, "max_age")
+            elif (
+                not entry.is_archive
+                and self.policy.archive_after_seconds > 0
+                and age_seconds > self.policy.archive_after_seconds
+            ):
+                kept.append(self._archive(entry, result))
+            else:
+                kept.append(entry)
+
+        kept.sort(key=lambda entry: entry.newest_mtime)
+        total_bytes = sum(entry.size_bytes for entry in kept)
+        while kept and (
+            (self.policy.max_count > 0 and len(kept) > self.policy.max_count)
+            or (self.policy.max_total_bytes > 0 and total_bytes > self.policy.max_total_bytes)
+        ):
+            oldest = kept.pop(0)
+            total_bytes -= oldest.size_bytes
+            self._delete(oldest, result, "quota")
+
+        with self._lock:
+            for name, value in result.items():
+                self._stats[name] = int(self._stats[name]) + value
+            self._stats["sweeps"] = int(self._stats["sweeps"]) + 1
+            self._stats["tracked_count"] = len(kept)
+            self._stats["tracked_bytes"] = total_bytes
+            self._stats["last_sweep_at"] = now
+            self._stats["last_sweep_ms"] = int((time.monotonic() - started_at) * 1000)
+
+        if result["deleted"] or result["archived"]:
+            LOGGER.info(
+                "retention sweep root=%s deleted=%s archived=%s freed_bytes=%s kept=%s kept_bytes=%s",
+                self.root,
+                result["deleted"],
+                result["archived"],
+                result["freed_bytes"],
+                len(kept),
+                total_bytes,
+            )
+        return result
+
+    def _delete(self, entry: RetentionEntry, result: dict[str, int], reason: str) -> None:
+        try:
+            if entry.is_archive:
+                entry.path.unlink()
+            else:
+                shutil.rmtree(entry.path)
+        except OSError:
+            LOGGER.exception("retention failed deleting path=%s reason=%s", entry.path, reason)
+            result["errors"] += 1
+            return
+
+        LOGGER.debug("retention deleted path=%s reason=%s bytes=%s", entry.path, reason, entry.size_bytes)
+        result["deleted"] += 1
+        result["freed_bytes"] += entry.size_bytes
+
+    def _archive(self, entry: RetentionEntry, result: dict[str, int]) -> RetentionEntry:
+        archive_dir = self.root / ARCHIVE_DIR_NAME
+        archive_path = archive_dir / f"{entry.path.name}{ARCHIVE_SUFFIX}"
+        temp_path = archive_dir / f".{entry.path.name}{ARCHIVE_SUFFIX}.tmp"
+        try:
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            with tarfile.open(temp_path, "w:gz") as archive:
+                archive.add(entry.path, arcname=entry.path.name)
+            os.replace(temp_path, archive_path)
+            os.utime(archive_path, (entry.newest_mtime, entry.newest_mtime))
+            shutil.rmtree(entry.path)
+        except OSError:
+            LOGGER.exception("retention failed archiving path=%s", entry.path)
+            temp_path.unlink(missing_ok=True)
+            result["errors"] += 1
+            return entry
+
+        archived = scan_entry(archive_path)
+        result["archived"] += 1
+        result["freed_bytes"] += max(0, entry.size_bytes - archived.size_bytes)
+        return archived
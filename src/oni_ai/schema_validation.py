@@ -0,0 +1,186 @@
+"""Compile the JSON Schema subset used by ``schemas/openapi.yaml`` into plain validator closures.
+
+Supported keywords: ``$ref`` (resolved up front), ``type``, ``enum``,
+``required``, ``properties``, ``additionalProperties``, ``items``,
+``minItems``, ``minLength``, ``minimum`` and ``maximum``. A validator returns
+error suffixes such as ``.speed: must be one of [1, 2, 3]`` that callers
+prefix with the name of the validated value; valid input returns an empty
+tuple without allocating.
+"""
+
+import logging
+import threading
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("oni_ai")
+OPENAPI_PATH = Path(__file__).resolve().parents[2] / "schemas" / "openapi.yaml"
+SPEC_LOCK = threading.Lock()
+SPEC_CACHE: dict[Path, dict | None] = {}
+Validator = Callable[[object], Sequence[str]]
+NO_ERRORS: tuple[str, ...] = ()
+SCHEMA_TYPES: dict[str, Callable[[object], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+}
+
+
+def load_openapi_spec(path: Path = OPENAPI_PATH) -> dict | None:
+    """Parse the OpenAPI file once per path; ``None`` (with a warning) when PyYAML is missing."""
+    with SPEC_LOCK:
+        if path in SPEC_CACHE:
+            return SPEC_CACHE[path]
+        try:
+            import yaml
+        except ImportError:
+            LOGGER.warning("PyYAML is not installed; OpenAPI schema checks are disabled (pip install 'oni-ai[validate]')")
+            spec = None
+        else:
+            with open(path, encoding="utf-8") as file:
+                spec = yaml.safe_load(file) or {}
+        SPEC_CACHE[path] = spec
+        return spec
+
+
+def clear_spec_cache() -> None:
+    with SPEC_LOCK:
+        SPEC_CACHE.clear()
+
+
+def resolve_refs(schema: object, spec: dict) -> object:
+    """Inline ``#/components/...`` references so schemas can be compiled without the spec."""
+    if isinstance(schema, list):
+        return [resolve_refs(item, spec) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/"):
+        target: object = spec
+        for part in ref[2:].split("/"):
+            target = target.get(part) if isinstance(target, dict) else None
+        if not isinstance(target, dict):
+            raise ValueError(f"unresolved schema reference: {ref}")
+        return resolve_refs(target, spec)
+    return {key: resolve_refs(value, spec) for key, value in schema.items()}
+
+
+def _compile_enum(allowed: list) -> Validator:
+    message = (f": must be one of {allowed}",)
+
+    def check(value: object) -> Sequence[str]:
+        return NO_ERRORS if value in allowed else message
+
+    return check
+
+
+def _compile_bounds(schema: dict) -> Validator | None:
+    min_length = schema.get("minLength")
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if min_length is None and minimum is None and maximum is None:
+        return None
+
+    def check(value: object) -> Sequence[str]:
+        if isinstance(value, str):
+            if min_length is not None and len(value) < min_length:
+                return (f": shorter than {min_length}",)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if minimum is not None and value < minimum:
+                return (f": below minimum {minimum}",)
+            if maximum is not None and value > maximum:
+                return (f": above maximum {maximum}",)
+        return NO_ERRORS
+
+    return check
+
+
+def _compile_array(schema: dict) -> Validator | None:
+    min_items = schema.get("minItems", 0)
+    item_validator = compile_schema(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    if not min_items and item_validator is None:
+        return None
+
+    def check(value: object) -> Sequence[str]:
+        if not isinstance(value, list):
+            return NO_ERRORS
+        errors = [f": needs at least {min_items} items"] if len(value) < min_items else []
+        if item_validator is not None:
+            for index, item in enumerate(value):
+                found = item_validator(item)
+                if found:
+                    errors.extend(f"[{index}]{error}" for error in found)
+        return errors or NO_ERRORS
+
+    return check
+
+
+def _compile_object(schema: dict) -> Validator | None:
+    required = tuple(schema.get("required") or ())
+    properties = {key: compile_schema(child) for key, child in (schema.get("properties") or {}).items()}
+    additional = schema.get("additionalProperties", True)
+    additional_validator = compile_schema(additional) if isinstance(additional, dict) else None
+    closed = additional is False
+    if not required and not properties and not closed and additional_validator is None:
+        return None
+
+    def check(value: object) -> Sequence[str]:
+        if not isinstance(value, dict):
+            return NO_ERRORS
+        errors = [f".{key}: required" for key in required if key not in value] if required else None
+        for key, item in value.items():
+            validator = properties.get(key, additional_validator)
+            if validator is not None:
+                found = validator(item)
+                if not found:
+                    continue
+                problems = [f".{key}{error}" for error in found]
+            elif closed:
+                problems = [f".{key}: unexpected property"]
+            else:
+                continue
+            if errors is None:
+                errors = problems
+            else:
+                errors.extend(problems)
+        return errors or NO_ERRORS
+
+    return check
+
+
+def compile_schema(schema: dict) -> Validator:
+    """Build a validator for ``schema``; references must already be resolved."""
+    expected = schema.get("type")
+    type_test = SCHEMA_TYPES.get(expected) if isinstance(expected, str) else None
+    type_error = (f": expected {expected}",)
+    checks = [
+        check
+        for check in (
+            _compile_enum(schema["enum"]) if isinstance(schema.get("enum"), list) else None,
+            _compile_bounds(schema),
+            _compile_array(schema),
+            _compile_object(schema),
+        )
+        if check is not None
+    ]
+
+    if len(checks) == 1 and type_test is None:
+        return checks[0]
+
+    def validate(value: object) -> Sequence[str]:
+        if type_test is not None and not type_test(value):
+            return type_error
+        errors: list[str] | None = None
+        for check in checks:
+            found = check(value)
+            if found:
+                if errors is None:
+                    errors = []
+                errors.extend(found)
+        return errors or NO_ERRORS
+
+    return validate
@@ -0,0 +1,136 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+
+LOGGER = logging.getLogger("oni_ai")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Zero-length IEND chunk: length, type and CRC are fixed bytes.
+PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+SCREENSHOT_WATCHERS = {"auto", "inotify", "poll"}
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_complete_png(path: str) -> bool:
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+                return False
+            file.seek(0, os.SEEK_END)
+            if file.tell() < len(PNG_SIGNATURE) + len(PNG_TRAILER):
+                return False
+            file.seek(-len(PNG_TRAILER), os.SEEK_END)
+            return file.read(len(PNG_TRAILER)) == PNG_TRAILER
+    except OSError:
+        return False
+
+
+def is_screenshot_ready(path: str, validate_png: bool) -> bool:
+    if not os.path.isfile(path):
+        return False
+    if validate_png and path.lower().endswith(".png"):
+        return is_complete_png(path)
+    return True
+
+
+class InotifyWatcher:
+    """Minimal ctypes binding that reports close-after-write and rename-into events for a directory."""
+
+    def __init__(self, directory: str) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        watch = libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if watch < 0:
+            error_number = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error_number, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout_seconds: float) -> list[str]:
+        """Return names written or moved into the directory within ``timeout_seconds``."""
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout_seconds))
+        if not readable:
+            return []
+
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset + INOTIFY_EVENT_HEADER.size <= len(buffer):
+            _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            names.append(os.fsdecode(buffer[offset : offset + name_length].rstrip(b"\0")))
+            offset += name_length
+        return names
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _poll_until_ready(path: str, deadline: float, poll_seconds: float, validate_png: bool) -> bool:
+    while time.monotonic() < deadline:
+        time.sleep(min(poll_seconds, max(0.0, deadline - time.monotonic())))
+        if is_screenshot_ready(path, validate_png):
+            return True
+    return False
+
+
+def wait_for_file_ready(
+    path: str,
+    timeout_seconds: float,
+    poll_seconds: float,
+    watcher: str = "auto",
+    validate_png: bool = True,
+) -> tuple[bool, str]:
+    """Wait until ``path`` is fully written; return ``(ready, method)``.
+
+    ``method`` reports how readiness was observed: ``immediate``, ``inotify``
+    or ``poll``. The inotify watch is registered before the first check so a
+    write finishing in between cannot be missed.
+    """
+    inotify = None
+    if watcher in {"auto", "inotify"}:
+        try:
+            inotify = InotifyWatcher(os.path.dirname(path) or ".")
+        except (OSError, AttributeError) as exc:
+            if watcher == "inotify":
+                LOGGER.warning("inotify watcher unavailable for %s (%s); polling instead", path, exc)
+
+    try:
+        if is_screenshot_ready(path, validate_png):
+            return True, "immediate"
+        if timeout_seconds <= 0:
+            return False, "immediate"
+
+        deadline = time.monotonic() + timeout_seconds
+        if inotify is None:
+            return _poll_until_ready(path, deadline, poll_seconds, validate_png), "poll"
+
+        target_name = os.path.basename(path)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False, "inotify"
+            if target_name in inotify.wait(remaining) and is_screenshot_ready(path, validate_png):
+                return True, "inotify"
+    finally:
+        if inotify is not None:
+            inotify.close()
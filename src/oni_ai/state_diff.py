@@ -0,0 +1,142 @@
+import json
+import os
+from pathlib import Path
+
+from oni_ai.state_digest import CONTEXT_FIELDS, fit_to_budget
+
+
+STATE_DIFF_FILE_NAME = "state_diff.json"
+# Cycle progress is reported separately as cycle_delta.
+DIFFED_CONTEXT_FIELDS = tuple(field for field in CONTEXT_FIELDS if field not in {"cycle", "time_in_cycles"})
+PENDING_ACTION_FIELDS = ("type", "priority", "status", "current_action", "duplicant_name")
+
+
+def _index_by(items: object, *keys: str) -> dict[str, dict]:
+    indexed = {}
+    if not isinstance(items, list):
+        return indexed
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for key in keys:
+            if item.get(key) is not None:
+                indexed[str(item[key])] = item
+                break
+    return indexed
+
+
+def _value_changes(previous: object, current: object) -> dict[str, list]:
+    previous = previous if isinstance(previous, dict) else {}
+    current = current if isinstance(current, dict) else {}
+    return {
+        key: [previous.get(key), current.get(key)]
+        for key in sorted(set(previous) | set(current))
+        if previous.get(key) != current.get(key)
+    }
+
+
+def _chore(duplicant: dict) -> object:
+    status = duplicant.get("status")
+    return status.get("current_chore") if isinstance(status, dict) else None
+
+
+def _pending_view(item: dict) -> dict[str, object]:
+    view = {key: item[key] for key in PENDING_ACTION_FIELDS if key in item}
+    if isinstance(item.get("chores"), list):
+        view["queued_chores"] = len(item["chores"])
+    return view
+
+
+def diff_duplicants(previous: object, current: object) -> dict[str, list]:
+    before = _index_by(previous, "id")
+    after = _index_by(current, "id")
+    result: dict[str, list] = {
+        "added": [{"id": key, "name": after[key].get("name")} for key in after if key not in before],
+        "removed": [{"id": key, "name": before[key].get("name")} for key in before if key not in after],
+        "chore_changes": [],
+        "priority_changes": [],
+    }
+    for key in after.keys() & before.keys():
+        old, new = before[key], after[key]
+        if _chore(old) != _chore(new):
+            result["chore_changes"].append({"id": key, "name": new.get("name"), "from": _chore(old), "to": _chore(new)})
+        changes = _value_changes(old.get("priority"), new.get("priority"))
+        if changes:
+            result["priority_changes"].append({"id": key, "name": new.get("name"), "changes": changes})
+    result["chore_changes"].sort(key=lambda change: change["id"])
+    result["priority_changes"].sort(key=lambda change: change["id"])
+    return result
+
+
+def diff_pending_actions(previous: object, current: object) -> dict[str, list]:
+    # Structured actions carry an id; the runtime reports one entry per duplicant instead.
+    before = _index_by(previous, "id", "duplicant_id")
+    after = _index_by(current, "id", "duplicant_id")
+    result: dict[str, list] = {
+        "added": [{"key": key, **_pending_view(after[key])} for key in after if key not in before],
+        "removed": [key for key in before if key not in after],
+        "changed": [],
+    }
+    for key in sorted(after.keys() & before.keys()):
+        changes = _value_changes(_pending_view(before[key]), _pending_view(after[key]))
+        if changes:
+            result["changed"].append({"key": key, "changes": changes})
+    return result
+
+
+def diff_priorities(previous: object, current: object) -> list[dict[str, object]]:
+    before = _index_by(previous, "duplicant_id")
+    after = _index_by(current, "duplicant_id")
+    changes = []
+    for key in sorted(after.keys() & before.keys()):
+        values = _value_changes(before[key].get("values"), after[key].get("values"))
+        if values:
+            changes.append({"duplicant_id": key, "duplicant_name": after[key].get("duplicant_name"), "changes": values})
+    return changes
+
+
+def _has_changes(value: object) -> bool:
+    if isinstance(value, dict):
+        return any(_has_changes(child) for child in value.values())
+    if isinstance(value, list):
+        return bool(value)
+    return False
+
+
+def diff_states(
+    previous: dict,
+    current: dict,
+    max_bytes: int = 4096,
+    previous_request_id: str | None = None,
+) -> dict[str, object]:
+    """Describe what changed from ``previous`` to ``current`` within ``max_bytes`` of JSON."""
+    previous_context = previous.get("context") if isinstance(previous.get("context"), dict) else {}
+    current_context = current.get("context") if isinstance(current.get("context"), dict) else {}
+    cycle_delta = None
+    if isinstance(previous_context.get("cycle"), (int, float)) and isinstance(current_context.get("cycle"), (int, float)):
+        cycle_delta = current_context["cycle"] - previous_context["cycle"]
+
+    changes = {
+        "context": _value_changes(
+            {key: previous_context.get(key) for key in DIFFED_CONTEXT_FIELDS},
+            {key: current_context.get(key) for key in DIFFED_CONTEXT_FIELDS},
+        ),
+        "duplicants": diff_duplicants(previous.get("duplicants"), current.get("duplicants")),
+        "pending_actions": diff_pending_actions(previous.get("pending_actions"), current.get("pending_actions")),
+        "priorities": diff_priorities(previous.get("priorities"), current.get("priorities")),
+    }
+    diff = {
+        "previous_request_id": previous_request_id or previous.get("request_id"),
+        "cycle_delta": cycle_delta,
+        "unchanged": not _has_changes(changes),
+        **changes,
+    }
+    return fit_to_budget(diff, max_bytes)
+
+
+def write_state_diff(request_dir: str, diff: dict[str, object]) -> Path:
+    path = Path(request_dir) / STATE_DIFF_FILE_NAME
+    temp_path = path.with_name(f".{STATE_DIFF_FILE_NAME}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(diff, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    temp_path.replace(path)
+    return path
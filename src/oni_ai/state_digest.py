@@ -0,0 +1,224 @@
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+
+STATE_DIGEST_FILE_NAME = "state_digest.json"
+DIGEST_VERSION = 1
+# Static runtime metadata that never changes within a game session.
+DROPPED_FIELDS = ("assemblies", "scenes", "singletons", "runtime_config")
+DUPLICANT_STAT_FIELDS = ("stress", "calories", "breath", "health", "stamina", "bladder", "morale")
+CONTEXT_FIELDS = ("cycle", "time_in_cycles", "paused", "current_speed")
+TEXT_LIMIT = 80
+
+
+def _short_text(value: object) -> str:
+    text = str(value)
+    return text if len(text) <= TEXT_LIMIT else f"{text[: TEXT_LIMIT - 3]}..."
+
+
+def _numeric_summary(values: list[float]) -> dict[str, float]:
+    return {
+        "min": round(min(values), 2),
+        "mean": round(sum(values) / len(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def _as_number(value: object) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _top_counts(counter: Counter, limit: int) -> dict[str, int]:
+    return dict(counter.most_common(limit))
+
+
+def _duplicant_stat(duplicant: dict, name: str) -> float | None:
+    for container in (duplicant, duplicant.get("status"), duplicant.get("stats")):
+        if isinstance(container, dict):
+            value = _as_number(container.get(name))
+            if value is not None:
+                return value
+    return None
+
+
+def summarize_duplicants(duplicants: list, top_n: int) -> dict[str, object]:
+    chores: Counter = Counter()
+    skills: Counter = Counter()
+    stats: dict[str, list[float]] = {}
+    idle = []
+    members = []
+
+    for duplicant in duplicants:
+        if not isinstance(duplicant, dict):
+            continue
+        name = str(duplicant.get("name") or duplicant.get("id") or "?")
+        status = duplicant.get("status") if isinstance(duplicant.get("status"), dict) else {}
+        chore = _short_text(status.get("current_chore") or "none")
+        chores[chore] += 1
+        if chore.lower() in {"idle", "none"}:
+            idle.append(name)
+        for skill in duplicant.get("skills") or []:
+            skills[str(skill)] += 1
+        for stat_name in DUPLICANT_STAT_FIELDS:
+            value = _duplicant_stat(duplicant, stat_name)
+            if value is not None:
+                stats.setdefault(stat_name, []).append(value)
+
+        member: dict[str, object] = {"id": duplicant.get("id"), "name": name, "chore": chore}
+        position = duplicant.get("position")
+        if isinstance(position, dict) and "x" in position and "y" in position:
+            member["pos"] = [position.get("x"), position.get("y")]
+        priority = duplicant.get("priority")
+        if isinstance(priority, dict) and priority:
+            ranked = sorted(priority.items(), key=lambda item: _as_number(item[1]) or 0, reverse=True)
+            member["top_priorities"] = dict(ranked[:3])
+        stress = _duplicant_stat(duplicant, "stress")
+        if stress is not None:
+            member["stress"] = stress
+        members.append(member)
+
+    # Most stressed duplicants first so budget trimming keeps the ones that matter.
+    members.sort(key=lambda member: -(_as_number(member.get("stress")) or 0))
+    return {
+        "count": len(members),
+        "idle": idle,
+        "chores": _top_counts(chores, top_n),
+        "skills": _top_counts(skills, top_n),
+        "stats": {name: _numeric_summary(values) for name, values in sorted(stats.items())},
+        "members": members,
+    }
+
+
+def _pending_urgency(item: dict) -> tuple[float, int]:
+    chores = item.get("chores")
+    return _as_number(item.get("priority")) or 0.0, len(chores) if isinstance(chores, list) else 0
+
+
+def summarize_pending_actions(pending_actions: list, top_n: int) -> dict[str, object]:
+    items = [item for item in pending_actions if isinstance(item, dict)]
+    by_type = Counter(str(item.get("type") or item.get("current_action") or "unknown") for item in items)
+    by_status = Counter(str(item["status"]) for item in items if "status" in item)
+
+    urgent = []
+    for item in sorted(items, key=_pending_urgency, reverse=True)[:top_n]:
+        entry = {
+            key: _short_text(item[key]) if isinstance(item[key], str) else item[key]
+            for key in ("id", "type", "priority", "status", "duplicant_name", "current_action")
+            if key in item
+        }
+        chores = item.get("chores")
+        if isinstance(chores, list):
+            entry["queued_chores"] = len(chores)
+            entry["next_chores"] = [_short_text(chore) for chore in chores[:3]]
+        urgent.append(entry)
+
+    return {
+        "count": len(items),
+        "by_type": _top_counts(by_type, top_n),
+        "by_status": dict(by_status),
+        "urgent": urgent,
+    }
+
+
+def summarize_priorities(priorities: list) -> dict[str, dict[str, float]]:
+    values: dict[str, list[float]] = {}
+    for item in priorities:
+        if not isinstance(item, dict) or not isinstance(item.get("values"), dict):
+            continue
+        for category, value in item["values"].items():
+            number = _as_number(value)
+            if number is not None:
+                values.setdefault(str(category), []).append(number)
+    return {category: _numeric_summary(numbers) for category, numbers in sorted(values.items())}
+
+
+def summarize_world(world: dict, top_n: int) -> dict[str, object]:
+    summary = {key: value for key, value in world.items() if not isinstance(value, (list, dict))}
+    blocks = world.get("surrounding_blocks")
+    if isinstance(blocks, list):
+        elements = Counter(str(block.get("element")) for block in blocks if isinstance(block, dict))
+        summary["surrounding_elements"] = _top_counts(elements, top_n)
+        temperatures = [
+            number
+            for block in blocks
+            if isinstance(block, dict) and (number := _as_number(block.get("temperature_c"))) is not None
+        ]
+        if temperatures:
+            summary["temperature_c"] = _numeric_summary(temperatures)
+    for key in ("center", "surrounding_area"):
+        if isinstance(world.get(key), dict):
+            summary[key] = world[key]
+    return summary
+
+
+def build_state_digest(state: dict, max_bytes: int = 8192, top_n: int = 10) -> dict[str, object]:
+    """Reduce a full ``/state`` snapshot to a digest whose JSON encoding fits ``max_bytes``.
+
+    Static runtime metadata is dropped, duplicants, chores and priorities are
+    aggregated, and only the ``top_n`` most urgent pending actions are kept.
+    """
+    context = state.get("context") if isinstance(state.get("context"), dict) else {}
+    digest: dict[str, object] = {
+        "digest_version": DIGEST_VERSION,
+        "context": {key: context[key] for key in CONTEXT_FIELDS if key in context},
+        "duplicants": summarize_duplicants(state.get("duplicants") or [], top_n),
+        "pending_actions": summarize_pending_actions(state.get("pending_actions") or [], top_n),
+        "priorities": summarize_priorities(state.get("priorities") or []),
+    }
+    if isinstance(state.get("world"), dict):
+        digest["world"] = summarize_world(state["world"], top_n)
+    digest["omitted"] = [field for field in DROPPED_FIELDS if field in state]
+    return fit_to_budget(digest, max_bytes)
+
+
+def encoded_size(value: object) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _trimmable_lists(value: object, path: tuple = ()) -> list[tuple[tuple, list]]:
+    found = []
+    if isinstance(value, dict):
+        for key, child in value.items():
+            found.extend(_trimmable_lists(child, (*path, key)))
+    elif isinstance(value, list) and value:
+        found.append((path, value))
+    return found
+
+
+def fit_to_budget(digest: dict[str, object], max_bytes: int) -> dict[str, object]:
+    """Halve the largest list in ``digest`` until it fits, then drop whole sections."""
+    if max_bytes <= 0 or encoded_size(digest) <= max_bytes:
+        return digest
+
+    digest["truncated"] = True
+    while encoded_size(digest) > max_bytes:
+        candidates = [
+            candidate for candidate in _trimmable_lists(digest) if candidate[0][0] not in {"trimmed", "omitted"}
+        ]
+        if not candidates:
+            break
+        path, largest = max(candidates, key=lambda candidate: encoded_size(candidate[1]))
+        del largest[len(largest) // 2 :]
+        trimmed = digest.setdefault("trimmed", [])
+        label = ".".join(str(part) for part in path)
+        if label not in trimmed:
+            trimmed.append(label)
+
+    for section in ("world", "priorities", "pending_actions", "duplicants"):
+        if encoded_size(digest) <= max_bytes:
+            break
+        if digest.pop(section, None) is not None:
+            digest["omitted"] = [*digest.get("omitted", []), section]
+    return digest
+
+
+def write_state_digest(request_dir: str, digest: dict[str, object]) -> Path:
+    path = Path(request_dir) / STATE_DIGEST_FILE_NAME
+    temp_path = path.with_name(f".{STATE_DIGEST_FILE_NAME}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(digest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    temp_path.replace(path)
+    return path
@@ -235,7 +235,7 @@ while (true)
         requestCounters["/state"]++;
         await WriteJson(context.Response, 200, new JsonObject
         {
-            ["state"] = statePayload,
+            ["state"] = statePayload.DeepClone(),
             ["last_execution"] = null,
             ["pending_action_count"] = queuedActions.Count,
         });
@@ -272,7 +272,7 @@ while (true)
         await WriteJson(context.Response, 200, new JsonObject
         {
             ["priorities"] = statePayload["priorities"]?.DeepClone(),
-            ["updates"] = priorityUpdates,
+            ["updates"] = priorityUpdates.DeepClone(),
             ["source"] = "game_live",
         });
         continue;
@@ -472,7 +472,7 @@ while (true)
                 ["priorities_post"] = requestCounters["/priorities_post"],
             },
             ["pending_action_count"] = queuedActions.Count,
-            ["operation_log"] = operationLog,
+            ["operation_log"] = operationLog.DeepClone(),
         });
         continue;
     }
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from oni_ai import ai_bridge
+from oni_ai.action_stream import ActionStreamParser
+
+
+PLAN = {
+    "analysis": "Oxygen is low {critical} [see notes]",
+    "actions": [
+        {"id": "a1", "type": "set_speed", "params": {"speed": 1}},
+        {"id": "a2", "action": "dig", "params": {"points": [{"x": 1, "y": 2}], "note": "quote \" and } brace"}},
+        {"id": "a3", "type": "research", "params": {"tech_id": "FarmingTech"}},
+    ],
+    "notes": "done",
+}
+
+
+def test_parser_returns_each_action_as_soon_as_it_closes() -> None:
+    parser = ActionStreamParser()
+    text = json.dumps(PLAN, indent=2)
+    completed: list[tuple[int, dict]] = []
+
+    for offset, char in enumerate(text):
+        completed.extend((offset, action) for action in parser.feed(char))
+
+    assert [action["id"] for _, action in completed] == ["a1", "a2", "a3"]
+    assert completed[1][1]["type"] == "dig"
+    assert completed[1][1]["params"]["note"] == 'quote " and } brace'
+    # The first action is available long before the plan JSON is complete.
+    assert completed[0][0] < len(text) // 2
+
+
+def test_parser_skips_broken_elements_and_repeated_plans() -> None:
+    parser = ActionStreamParser()
+    line = json.dumps(PLAN)
+
+    assert len(parser.feed("thinking...\n")) == 0
+    assert len(parser.feed(line + "\n")) == 3
+    assert parser.feed(line + "\n") == []
+    assert parser.feed('{"actions": [{"id": "bad", oops}, {"id": "a4", "type": "pause", "params": {"paused": true}}]}') == [
+        {"id": "a4", "type": "pause", "params": {"paused": True}}
+    ]
+
+
+def test_parser_only_reads_the_top_level_actions_of_line_anchored_documents() -> None:
+    parser = ActionStreamParser()
+
+    assert parser.feed('The plan is {"actions": [{"id": "prose", "type": "pause"}]}\n') == []
+    assert parser.feed('{"analysis": {"actions": [{"id": "nested", "type": "pause"}]}, "notes": "x"}\n') == []
+    # An array that never closes must not capture the objects of the next document.
+    assert parser.feed('{"actions": [{"id": "a1", "type": "pause"},\n') == [{"id": "a1", "type": "pause"}]
+    assert parser.feed('{"other": [{"id": "stray", "type": "pause"}]}\n') == []
+    assert parser.feed('  {"id": "after", "type": "pause"}\n') == []
+
+
+def test_parser_ignores_codex_prompt_echo_and_tool_output() -> None:
+    parser = ActionStreamParser()
+    transcript = (
+        "[2026-02-13T23:15:00] User instructions:\n"
+        '{"actions": [{"id": "from-prompt", "type": "pause"}]}\n'
+        "[2026-02-13T23:15:02] exec bash -lc 'cat response.example.json' in /tmp/request\n"
+        '{\n  "actions": [\n    {"id": "cancel-obsolete-dig", "type": "cancel"}\n  ]\n}\n'
+        "[2026-02-13T23:15:03] codex\n"
+        '{"analysis": "x", "actions": [{"id": "real", "type": "pause"}]}\n'
+        "[2026-02-13T23:15:04] tokens used: 1200\n"
+        '{"actions": [{"id": "late", "type": "pause"}]}\n'
+    )
+
+    assert [action["id"] for action in parser.feed(transcript)] == ["real"]
+
+
+def test_job_publishes_streamed_actions_before_codex_exits(tmp_path: Path, monkeypatch) -> None:
+    pytest.importorskip("yaml")
+    ai_bridge.reset_runtime_state_for_tests()
+    request_dir = tmp_path / "request"
+    request_dir.mkdir()
+    release_file = tmp_path / "release"
+    stub = tmp_path / "fake-codex.sh"
+    stub.write_text(
+        "#!/usr/bin/env bash\n"
+        "echo '{\"analysis\": \"x\", \"actions\": ['\n"
+        "echo '  {\"id\": \"urgent\", \"type\": \"pause\", \"params\": {\"paused\": true}},'\n"
+        "echo '  {\"id\": \"bad\", \"type\": \"set_speed\", \"params\": {\"speed\": 9}},'\n"
+        f"while [ ! -f '{release_file}' ]; do sleep 0.05; done\n"
+        "echo '  {\"id\": \"later\", \"type\": \"set_speed\", \"params\": {\"speed\": 2}}'\n"
+        "echo ']}'\n",
+        encoding="utf-8",
+    )
+    stub.chmod(0o755)
+    monkeypatch.setenv("ONI_AI_CODEX_CMD", str(stub))
+    monkeypatch.setenv("ONI_AI_STREAM_ACTIONS", "1")
+
+    payload = {"request_id": "stream_001", "request_dir": str(request_dir)}
+    job = ai_bridge.create_job(payload, "trace")
+    job_id = str(job["job_id"])
+    worker = threading.Thread(target=ai_bridge.run_job, args=(job_id, payload), daemon=True)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not ai_bridge.get_job_state(job_id)["streamed_actions"]:
+            time.sleep(0.02)
+
+        running = ai_bridge.get_job_state(job_id)
+        assert running["status"] == "running"
+        assert running["streamed_actions"] == [{"id": "urgent", "type": "pause", "params": {"paused": True}}]
+        events, _ = ai_bridge.wait_for_job_events(job_id, 0, 0)
+        assert [event["data"] for event in events if event["event"] == "action"] == [
+            {"index": 0, "action": {"id": "urgent", "type": "pause", "params": {"paused": True}}, "unvalidated": True}
+        ]
+    finally:
+        release_file.touch()
+        worker.join(timeout=10)
+
+    finished = ai_bridge.get_job_state(job_id)
+    assert finished["status"] == "completed"
+    assert [action["id"] for action in finished["streamed_actions"]] == ["urgent", "later"]
+    ai_bridge.reset_runtime_state_for_tests()
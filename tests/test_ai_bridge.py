@@ -1,10 +1,11 @@
+import http.client
 import json
 import os
 import socket
 import threading
 import time
 from pathlib import Path
-from urllib import request
+from urllib import error, request
 
 import oni_ai.ai_bridge as ai_bridge
 from oni_ai.ai_bridge import build_prompt, call_codex_exec, normalize_action, strip_fence
@@ -211,7 +212,7 @@ def test_analyze_endpoint_is_async_with_status_polling(monkeypatch, tmp_path: Pa
     monkeypatch.setattr(ai_bridge, "call_codex_exec", fake_call_codex_exec)
 
     port = _find_free_port()
-    server = ai_bridge.HTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
 
@@ -260,7 +261,7 @@ def test_analyze_endpoint_accepts_trailing_slash(monkeypatch, tmp_path: Path) ->
     monkeypatch.setattr(ai_bridge, "call_codex_exec", fake_call_codex_exec)
 
     port = _find_free_port()
-    server = ai_bridge.HTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
 
@@ -280,3 +281,511 @@ def test_analyze_endpoint_accepts_trailing_slash(monkeypatch, tmp_path: Path) ->
         server.shutdown()
         server.server_close()
         thread.join(timeout=2)
+
+
+def _wait_for_status(job_id: str, statuses: set[str], attempts: int = 100) -> dict:
+    for _ in range(attempts):
+        job = ai_bridge.get_job_state(job_id)
+        if job is not None and job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+
+def test_job_scheduler_rejects_when_queue_full(monkeypatch) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_WORKERS", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_SIZE", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_POLICY", "reject")
+    ai_bridge.reset_runtime_state_for_tests()
+
+    release = threading.Event()
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        return '{"actions":[]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+
+    try:
+        first, _ = ai_bridge.submit_job({"request_id": "first"}, "t1")
+        assert first is not None
+        _wait_for_status(str(first["job_id"]), {"running"})
+
+        second, _ = ai_bridge.submit_job({"request_id": "second"}, "t2")
+        assert second is not None
+        queued = ai_bridge.get_job_state(str(second["job_id"]))
+        assert queued["status"] == "queued"
+        assert queued["queue_position"] == 1
+
+        third, admission = ai_bridge.submit_job({"request_id": "third"}, "t3")
+        assert third is None
+        assert admission == "rejected"
+        assert ai_bridge.get_job_scheduler().stats()["rejected"] == 1
+    finally:
+        release.set()
+
+    assert _wait_for_status(str(second["job_id"]), {"completed"})["queue_position"] is None
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_job_scheduler_coalesces_into_newest_queued_job(monkeypatch) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_WORKERS", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_SIZE", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_POLICY", "coalesce")
+    ai_bridge.reset_runtime_state_for_tests()
+
+    release = threading.Event()
+    seen_requests: list[str] = []
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        seen_requests.append(str(payload.get("request_id")))
+        return '{"actions":[]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+
+    try:
+        first, _ = ai_bridge.submit_job({"request_id": "first"}, "t1")
+        _wait_for_status(str(first["job_id"]), {"running"})
+        second, _ = ai_bridge.submit_job({"request_id": "second"}, "t2")
+        third, admission = ai_bridge.submit_job({"request_id": "third"}, "t3")
+
+        assert admission == "coalesced"
+        assert third["job_id"] == second["job_id"]
+        assert third["request_id"] == "third"
+        assert third["coalesced_count"] == 1
+    finally:
+        release.set()
+
+    _wait_for_status(str(second["job_id"]), {"completed"})
+    assert seen_requests == ["first", "third"]
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_autopilot_submissions_leave_no_unused_request_dirs(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(tmp_path))
+    monkeypatch.setenv("ONI_AI_JOB_WORKERS", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_SIZE", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_POLICY", "coalesce")
+    ai_bridge.reset_runtime_state_for_tests()
+
+    release = threading.Event()
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        return '{"actions":[]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+    snapshot = {"api_base_url": "http://127.0.0.1:1"}
+
+    try:
+        running = ai_bridge.submit_autopilot_job(snapshot, ["interval"])
+        _wait_for_status(running, {"running"})
+        queued = ai_bridge.submit_autopilot_job(snapshot, ["interval"])
+        # Coalescing hands the queued job the newer dir; the one it replaced is dropped.
+        assert ai_bridge.submit_autopilot_job(snapshot, ["interval"]) == queued
+        request_dirs = {str(ai_bridge.get_job_state(job_id)["request_dir"]) for job_id in (running, queued)}
+        assert {str(path) for path in tmp_path.iterdir()} == request_dirs
+
+        monkeypatch.setattr(ai_bridge, "submit_job", lambda payload, trace_id: (None, "rejected"))
+        assert ai_bridge.submit_autopilot_job(snapshot, ["interval"]) is None
+        assert {str(path) for path in tmp_path.iterdir()} == request_dirs
+    finally:
+        release.set()
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_analyze_endpoint_returns_503_when_queue_full(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_WORKERS", "1")
+    monkeypatch.setenv("ONI_AI_JOB_QUEUE_SIZE", "0")
+    ai_bridge.reset_runtime_state_for_tests()
+
+    release = threading.Event()
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        return '{"actions":[]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        status_code, submit = _http_json(f"http://127.0.0.1:{port}/analyze", method="POST", body={"request_id": "busy_1"})
+        assert status_code == 202
+        _wait_for_status(submit["job_id"], {"running"})
+
+        try:
+            _http_json(f"http://127.0.0.1:{port}/analyze", method="POST", body={"request_id": "busy_2"})
+        except error.HTTPError as exc:
+            assert exc.code == 503
+            assert exc.headers.get("Retry-After") == "1"
+            assert json.loads(exc.read().decode("utf-8"))["error"] == "queue_full"
+        else:
+            raise AssertionError("expected queue_full rejection")
+
+        _, health = _http_json(f"http://127.0.0.1:{port}/health")
+        assert health["jobs"]["rejected"] == 1
+        assert health["jobs"]["running"] == 1
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_job_scheduler_deduplicates_inflight_requests(monkeypatch) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_WORKERS", "2")
+    ai_bridge.reset_runtime_state_for_tests()
+
+    release = threading.Event()
+    calls: list[str] = []
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        calls.append(request_tag)
+        release.wait(timeout=5)
+        return '{"actions":[{"id":"shared","type":"set_speed","params":{"speed":2}}]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+
+    snapshot = {"context": {"cycle": 42, "paused": True, "time_in_cycles": 42.1}, "duplicants": [{"id": "1001"}]}
+    try:
+        first, admission = ai_bridge.submit_job({"request_id": "dup", "request_dir": "/tmp/dup"}, "t1")
+        assert admission == "queued"
+        _wait_for_status(str(first["job_id"]), {"running"})
+
+        resent, admission = ai_bridge.submit_job({"request_id": "dup", "request_dir": "/tmp/dup"}, "t2")
+        assert admission == "deduplicated"
+        assert resent["job_id"] == first["job_id"]
+
+        state_a, admission = ai_bridge.submit_job({**snapshot, "request_id": "a", "request_dir": "/tmp/a"}, "t3")
+        assert admission == "queued"
+        retimed = {**snapshot, "context": {**snapshot["context"], "time_in_cycles": 42.9}}
+        state_b, admission = ai_bridge.submit_job({**retimed, "request_id": "b", "request_dir": "/tmp/b"}, "t4")
+        assert admission == "deduplicated"
+        assert state_b["job_id"] == state_a["job_id"]
+
+        assert ai_bridge.get_job_scheduler().stats()["dedup_hits"] == 2
+    finally:
+        release.set()
+
+    shared = _wait_for_status(str(state_a["job_id"]), {"completed"})
+    assert json.loads(shared["response"])["actions"][0]["id"] == "shared"
+    assert shared["dedup_hits"] == 1
+    assert len(calls) == 2
+
+    rerun, admission = ai_bridge.submit_job({"request_id": "dup", "request_dir": "/tmp/dup"}, "t5")
+    assert admission == "queued"
+    assert rerun["job_id"] != first["job_id"]
+    _wait_for_status(str(rerun["job_id"]), {"completed"})
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_fingerprint_payload_ignores_request_and_timing_fields() -> None:
+    base = {"request_id": "a", "requested_at_utc": "t0", "context": {"cycle": 3, "unscaled_time_seconds": 1.0}}
+    same = {"request_id": "b", "requested_at_utc": "t1", "context": {"cycle": 3, "unscaled_time_seconds": 9.0}}
+    other = {"request_id": "a", "requested_at_utc": "t0", "context": {"cycle": 4, "unscaled_time_seconds": 1.0}}
+
+    assert ai_bridge.fingerprint_payload(base) == ai_bridge.fingerprint_payload(same)
+    assert ai_bridge.fingerprint_payload(base) != ai_bridge.fingerprint_payload(other)
+
+
+def test_bridge_server_reuses_keep_alive_connection(monkeypatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", lambda payload, request_tag="-": '{"actions":[]}')
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        body = json.dumps({"request_id": "keepalive_001", "request_dir": str(tmp_path)})
+        connection.request("POST", "/analyze", body=body, headers={"Content-Type": "application/json"})
+        submit_response = connection.getresponse()
+        submit = json.loads(submit_response.read().decode("utf-8"))
+        assert submit_response.status == 202
+        first_socket = connection.sock
+
+        connection.request("GET", "/missing")
+        missing_response = connection.getresponse()
+        missing_response.read()
+        assert missing_response.status == 404
+
+        for _ in range(40):
+            connection.request("GET", submit["status_url"])
+            poll_response = connection.getresponse()
+            current = json.loads(poll_response.read().decode("utf-8"))
+            assert connection.sock is first_socket
+            if current["status"] == "completed":
+                break
+            time.sleep(0.05)
+        assert current["status"] == "completed"
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_bridge_server_serves_polls_while_a_client_stalls() -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    stalled = socket.create_connection(("127.0.0.1", port), timeout=5)
+    try:
+        stalled.sendall(b"POST /analyze HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\n{")
+        started_at = time.monotonic()
+        status_code, health = _http_json(f"http://127.0.0.1:{port}/health")
+        assert status_code == 200
+        assert health["ok"] is True
+        assert time.monotonic() - started_at < 1.0
+    finally:
+        stalled.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def _read_sse_events(response) -> list[tuple[str, dict]]:
+    events = []
+    event_type = "message"
+    for raw_line in response:
+        line = raw_line.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event_type = line[len("event: ") :]
+        elif line.startswith("data: "):
+            events.append((event_type, json.loads(line[len("data: ") :])))
+            event_type = "message"
+    return events
+
+
+def test_analyze_status_long_poll_returns_on_completion(monkeypatch) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    release = threading.Event()
+
+    def blocking_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        return '{"actions":[{"id":"long-poll","type":"set_speed","params":{"speed":1}}]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", blocking_call_codex_exec)
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        _, submit = _http_json(f"http://127.0.0.1:{port}/analyze", method="POST", body={"request_id": "long_poll_001"})
+        status_url = f"http://127.0.0.1:{port}{submit['status_url']}"
+
+        started_at = time.monotonic()
+        _, pending = _http_json(f"{status_url}?wait=0.2")
+        assert pending["status"] in {"queued", "running"}
+        assert time.monotonic() - started_at >= 0.2
+
+        for wait_raw in ("nan", "inf", "soon"):
+            try:
+                _http_json(f"{status_url}?wait={wait_raw}")
+            except error.HTTPError as exc:
+                assert exc.code == 400
+                assert json.loads(exc.read().decode("utf-8"))["error"] == "invalid_wait"
+            else:
+                raise AssertionError(f"expected invalid_wait for wait={wait_raw}")
+
+        threading.Timer(0.2, release.set).start()
+        started_at = time.monotonic()
+        _, final = _http_json(f"{status_url}?wait=4")
+        assert final["status"] == "completed"
+        assert time.monotonic() - started_at < 2.0
+        assert json.loads(final["response"])["actions"][0]["id"] == "long-poll"
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_analyze_events_stream_pushes_progress_and_output(monkeypatch) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    release = threading.Event()
+
+    def streaming_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        release.wait(timeout=5)
+        ai_bridge.report_job_progress(20, "codex_running")
+        ai_bridge.append_job_output(ai_bridge.current_job_id(), "stdout", "thinking about oxygen")
+        return '{"actions":[]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", streaming_call_codex_exec)
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        _, submit = _http_json(f"http://127.0.0.1:{port}/analyze", method="POST", body={"request_id": "sse_001"})
+        threading.Timer(0.1, release.set).start()
+
+        events_url = f"http://127.0.0.1:{port}{submit['status_url']}/events"
+        with request.urlopen(events_url, timeout=5) as response:
+            assert response.headers.get("Content-Type").startswith("text/event-stream")
+            events = _read_sse_events(response)
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+    event_types = [event_type for event_type, _ in events]
+    assert event_types[0] == "status"
+    assert ("stdout", {"line": "thinking about oxygen"}) in events
+    assert any(event_type == "status" and data["stage"] == "codex_running" for event_type, data in events)
+    assert event_types[-1] == "result"
+    assert events[-1][1]["status"] == "completed"
+
+
+def _finished_job(request_id: str, finished_at: float) -> str:
+    job = ai_bridge.create_job({"request_id": request_id}, "trace")
+    ai_bridge.set_job_state(str(job["job_id"]), status="completed", response='{"actions":[]}', finished_at=finished_at)
+    return str(job["job_id"])
+
+
+def test_job_store_evicts_least_recently_used_finished_jobs(monkeypatch) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_MAX_ENTRIES", "2")
+    monkeypatch.delenv("ONI_AI_JOB_SPILL", raising=False)
+    ai_bridge.reset_runtime_state_for_tests()
+
+    now = time.time()
+    oldest = _finished_job("oldest", now)
+    recent = _finished_job("recent", now)
+    assert ai_bridge.get_job_state(oldest) is not None
+
+    running = ai_bridge.create_job({"request_id": "running"}, "trace")
+    ai_bridge.set_job_state(str(running["job_id"]), status="running")
+    newest = _finished_job("newest", now)
+
+    ai_bridge.prune_job_state()
+    assert ai_bridge.get_job_state(recent) is None
+    assert ai_bridge.get_job_state(str(running["job_id"])) is not None
+    stats = ai_bridge.get_job_store_stats()
+    assert stats["size"] == 2
+    assert stats["evicted"] == 2
+    assert {oldest, newest} & set(ai_bridge.JOB_STATE) == {newest}
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_job_store_expires_and_spills_finished_jobs(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("ONI_AI_JOB_TTL_SECONDS", "60")
+    monkeypatch.setenv("ONI_AI_JOB_SPILL", "1")
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(tmp_path))
+    ai_bridge.reset_runtime_state_for_tests()
+
+    expired = _finished_job("expired", time.time() - 120)
+    fresh = _finished_job("fresh", time.time())
+    ai_bridge.prune_job_state()
+
+    assert expired not in ai_bridge.JOB_STATE
+    assert fresh in ai_bridge.JOB_STATE
+    assert (tmp_path / ".job_index" / f"{expired}.json").exists()
+
+    restored = ai_bridge.get_job_state(expired)
+    assert restored["request_id"] == "expired"
+    assert restored["status"] == "completed"
+    assert ai_bridge.get_job_state("../../etc/passwd") is None
+
+    stats = ai_bridge.get_job_store_stats()
+    assert stats["expired"] == 1
+    assert stats["spilled"] == 1
+    assert stats["spill_loads"] == 1
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_run_job_serves_repeated_state_from_decision_cache(monkeypatch) -> None:
+    monkeypatch.setenv("ONI_AI_DECISION_CACHE", "1")
+    ai_bridge.reset_runtime_state_for_tests()
+    calls: list[str] = []
+
+    def counting_call_codex_exec(payload: dict, request_tag: str = "-") -> str:
+        calls.append(request_tag)
+        return '{"actions":[{"id":"cached","type":"set_speed","params":{"speed":2}}]}'
+
+    monkeypatch.setattr(ai_bridge, "call_codex_exec", counting_call_codex_exec)
+
+    snapshot = {"context": {"cycle": 12, "paused": True}, "duplicants": [{"id": "1001"}]}
+    first = ai_bridge.create_job({**snapshot, "request_id": "c1", "requested_at_utc": "t0"}, "t1")
+    ai_bridge.run_job(str(first["job_id"]), {**snapshot, "request_id": "c1", "requested_at_utc": "t0"})
+    second = ai_bridge.create_job({**snapshot, "request_id": "c2", "requested_at_utc": "t1"}, "t2")
+    ai_bridge.run_job(str(second["job_id"]), {**snapshot, "request_id": "c2", "requested_at_utc": "t1"})
+
+    cached = ai_bridge.get_job_state(str(second["job_id"]))
+    assert calls == ["c1"]
+    assert cached["decision_cache"] == "hit"
+    assert json.loads(cached["response"])["actions"][0]["id"] == "cached"
+    assert ai_bridge.get_decision_cache().stats()["hits"] == 1
+    ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_metrics_endpoint_reports_stage_histograms_and_noop_fallbacks(monkeypatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv("ONI_AI_FAKE_RESPONSE", "nonsense")
+
+    port = _find_free_port()
+    server = ai_bridge.BridgeHTTPServer(("127.0.0.1", port), ai_bridge.OniAiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        status_code, submit = _http_json(
+            f"{base_url}/analyze",
+            method="POST",
+            body={"request_id": "metrics_001", "request_dir": str(tmp_path)},
+        )
+        assert status_code == 202
+        _, current = _http_json(f"{base_url}{submit['status_url']}?wait=5")
+        assert current["status"] == "completed"
+
+        with request.urlopen(f"{base_url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert "# TYPE oni_ai_stage_duration_seconds histogram" in text
+    for stage in ("queue_wait", "asset_staging", "screenshot_wait", "codex", "normalization", "end_to_end"):
+        assert f'oni_ai_stage_duration_seconds_count{{stage="{stage}"}} 1' in text
+    assert 'oni_ai_normalize_noop_total{reason="unmapped"} 1' in text
+    assert 'oni_ai_jobs_finished_total{status="completed"} 1' in text
+    assert "oni_ai_jobs_queued 0" in text
+
+
+def test_retention_is_opt_in(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(tmp_path))
+    monkeypatch.delenv("ONI_AI_RETENTION", raising=False)
+    assert ai_bridge.start_retention_service() is None
+
+    monkeypatch.setenv("ONI_AI_RETENTION", "1")
+    service = ai_bridge.start_retention_service()
+    try:
+        assert service is not None and service.stats()["root"] == str(tmp_path)
+    finally:
+        service.stop()
+        ai_bridge.RETENTION_SERVICE = None
@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+import oni_ai.ai_bridge as ai_bridge
+from oni_ai.asset_staging import AssetCache, link_asset
+
+
+def test_asset_cache_links_one_materialized_copy(tmp_path: Path) -> None:
+    source = tmp_path / "openapi.yaml"
+    source.write_text("openapi: 3.0.3\n", encoding="utf-8")
+    cache = AssetCache(tmp_path / "cache")
+
+    first_target = tmp_path / "req1" / "openapi.yaml"
+    second_target = tmp_path / "req2" / "openapi.yaml"
+    first_target.parent.mkdir()
+    second_target.parent.mkdir()
+
+    cache_path = cache.materialize(source)
+    assert link_asset(cache_path, first_target, "link") == "hardlink"
+    assert link_asset(cache.materialize(source), second_target, "link") == "hardlink"
+
+    assert first_target.stat().st_ino == second_target.stat().st_ino == cache_path.stat().st_ino
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    assert not os.access(cache_path, os.W_OK) or os.geteuid() == 0
+
+
+def test_asset_cache_rematerializes_changed_source(tmp_path: Path) -> None:
+    source = tmp_path / "state.json"
+    source.write_text('{"cycle": 1}', encoding="utf-8")
+    cache = AssetCache(tmp_path / "cache")
+
+    before = cache.materialize(source)
+    source.write_text('{"cycle": 22}', encoding="utf-8")
+    after = cache.materialize(source)
+
+    assert before != after
+    assert after.read_text(encoding="utf-8") == '{"cycle": 22}'
+
+
+def test_link_asset_replaces_existing_target_and_falls_back(tmp_path: Path) -> None:
+    cache_path = tmp_path / "cached.json"
+    cache_path.write_text("cached", encoding="utf-8")
+    target = tmp_path / "target.json"
+    target.write_text("stale", encoding="utf-8")
+
+    assert link_asset(cache_path, target, "symlink") == "symlink"
+    assert target.is_symlink()
+    assert link_asset(cache_path, target, "copy") == "copy"
+    assert not target.is_symlink()
+    assert target.read_text(encoding="utf-8") == "cached"
+    assert cache_path.read_text(encoding="utf-8") == "cached"
+
+
+def test_copy_reference_assets_uses_shared_cache(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(tmp_path / "root"))
+    request_dir = tmp_path / "root" / "req"
+    request_dir.mkdir(parents=True)
+
+    ai_bridge.copy_reference_assets_to_request_dir(str(request_dir), "assets")
+    ai_bridge.copy_reference_assets_to_request_dir(str(request_dir), "assets_again")
+
+    staged = request_dir / "openapi.yaml"
+    assert "openapi" in staged.read_text(encoding="utf-8")
+    cached = list((tmp_path / "root" / ".asset_cache").glob("*_openapi.yaml"))
+    assert len(cached) == 1
+    assert staged.stat().st_ino == cached[0].stat().st_ino
@@ -0,0 +1,163 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from oni_ai.ai_bridge import build_prompt
+from oni_ai.autopilot import Autopilot, AutopilotPolicy, ChangeDetector, Observation, observe
+from oni_ai.client import OniApiClient
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class _FakeColonyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    colony: dict = {}
+
+    def do_GET(self) -> None:  # noqa: N802
+        colony = type(self).colony
+        if self.path == "/state":
+            status, body = 200, {"state": {"context": {"cycle": colony["cycle"]}, "duplicants": colony["duplicants"]}, "pending_action_count": 0}
+        elif self.path == "/actions/pending":
+            status, body = 200, {"source": "game_live", "observed_at_utc": "now", "counts": {}, "pending_actions": colony["pending"]}
+        elif self.path == "/speed":
+            status, body = 200, {"speed": 1, "paused": False}
+        else:
+            status, body = 404, {"error": "not_found"}
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def _duplicant(name: str, chore: str = "Dig", stress: float = 10.0) -> dict:
+    return {"id": name, "name": name, "status": {"current_chore": chore, "stress": stress, "breath": 100.0}}
+
+
+def test_change_detector_fires_on_transitions_only() -> None:
+    detector = ChangeDetector(AutopilotPolicy(stress_threshold=60, breath_threshold=50))
+    calm = Observation(cycle=3, idle=frozenset(), max_stress=20, min_breath=90, pending_count=4)
+
+    assert detector.reasons(calm) == ["initial"]
+    detector.accept(calm)
+    assert detector.reasons(calm) == []
+    assert detector.reasons(Observation(cycle=4, idle=frozenset(), max_stress=20, min_breath=90, pending_count=4)) == ["new_cycle"]
+    alarming = Observation(cycle=3, idle=frozenset({"Ada"}), max_stress=75, min_breath=40, pending_count=0)
+    assert detector.reasons(alarming) == ["idle_duplicants", "high_stress", "low_oxygen", "queue_drained"]
+    detector.accept(alarming)
+    assert detector.reasons(alarming) == []
+
+
+def test_observe_requires_state() -> None:
+    assert observe({"endpoints": {"/state": {"error": "timeout", "elapsed_ms": 5}}}) is None
+    observation = observe(
+        {
+            "endpoints": {
+                "/state": {"status": 200, "body": {"state": {"context": {"cycle": 7}, "duplicants": [_duplicant("Ada", "Idle", 70)]}}},
+                "/speed": {"status": 200, "body": {"speed": 2, "paused": True}},
+            }
+        }
+    )
+    assert observation == Observation(cycle=7, idle=frozenset({"Ada"}), max_stress=70.0, min_breath=100.0, pending_count=None, paused=True)
+
+
+def test_autopilot_triggers_on_change_and_backs_off_when_stable() -> None:
+    _FakeColonyHandler.colony = {"cycle": 1, "duplicants": [_duplicant("Ada"), _duplicant("Bob")], "pending": [{"duplicant_id": "Ada"}]}
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeColonyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = OniApiClient(f"http://127.0.0.1:{port}")
+    submitted: list[list[str]] = []
+    busy: set[str] = set()
+    now = [1000.0]
+
+    def submit(snapshot: dict, reasons: list[str]) -> str:
+        assert snapshot["endpoints"]["/state"]["status"] == 200
+        submitted.append(reasons)
+        return f"job{len(submitted)}"
+
+    policy = AutopilotPolicy(min_interval_seconds=1, max_interval_seconds=5, backoff_factor=2, cooldown_seconds=30)
+    autopilot = Autopilot(client, submit, lambda job_id: job_id in busy, policy, clock=lambda: now[0])
+    try:
+        assert autopilot.tick() == 1
+        assert submitted == [["initial"]]
+
+        assert [autopilot.tick() for _ in range(4)] == [2, 4, 5, 5]
+
+        busy.add("job1")
+        assert autopilot.tick() == 1
+        busy.clear()
+
+        _FakeColonyHandler.colony["cycle"] = 2
+        _FakeColonyHandler.colony["duplicants"][1] = _duplicant("Bob", "Idle")
+        now[0] += 10
+        assert autopilot.tick() == 20
+        assert len(submitted) == 1
+
+        now[0] += 20
+        assert autopilot.tick() == 1
+        assert submitted[-1] == ["new_cycle", "idle_duplicants"]
+
+        stats = autopilot.stats()
+        assert stats["triggers"] == 2 and stats["stable_polls"] == 4
+        assert stats["skipped_busy"] == 1 and stats["skipped_cooldown"] == 1
+        assert stats["last_job_id"] == "job2" and stats["interval_seconds"] == 1
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+
+
+def test_autopilot_keeps_baseline_when_submission_is_rejected() -> None:
+    _FakeColonyHandler.colony = {"cycle": 1, "duplicants": [_duplicant("Ada")], "pending": [{"duplicant_id": "Ada"}]}
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeColonyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = OniApiClient(f"http://127.0.0.1:{port}")
+    submitted: list[list[str]] = []
+    accepting = [True]
+
+    def submit(snapshot: dict, reasons: list[str]) -> str | None:
+        submitted.append(reasons)
+        return f"job{len(submitted)}" if accepting[0] else None
+
+    policy = AutopilotPolicy(min_interval_seconds=1, max_interval_seconds=5, backoff_factor=2, cooldown_seconds=0)
+    autopilot = Autopilot(client, submit, lambda job_id: False, policy)
+    try:
+        assert autopilot.tick() == 1
+
+        _FakeColonyHandler.colony["cycle"] = 2
+        accepting[0] = False
+        assert autopilot.tick() == 2
+        assert autopilot.tick() == 4
+        accepting[0] = True
+        assert autopilot.tick() == 1
+        assert submitted == [["initial"], ["new_cycle"], ["new_cycle"], ["new_cycle"]]
+
+        stats = autopilot.stats()
+        assert stats["triggers"] == 2 and stats["skipped_rejected"] == 2
+        assert stats["last_job_id"] == "job4"
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+
+
+def test_prompt_mentions_autopilot_reasons() -> None:
+    prompt = build_prompt({"autopilot": {"reasons": ["new_cycle", "low_oxygen"]}}, has_screenshot=False)
+
+    assert "started by the bridge autopilot" in prompt
+    assert "new_cycle, low_oxygen" in prompt
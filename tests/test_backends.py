@@ -0,0 +1,161 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import oni_ai.ai_bridge as ai_bridge
+from oni_ai.backends import DecisionRequest, FakeBackend, WorkerBackend
+
+
+WORKER_SCRIPT = """
+import json
+import os
+import sys
+
+for raw in sys.stdin:
+    request = json.loads(raw)
+    print("worker pid=%s handling" % os.getpid(), flush=True)
+    print(json.dumps({"id": request["id"], "type": "output", "stream": "stdout", "line": "planning"}), flush=True)
+    if request["prompt"] == "HANG_FOREVER":
+        continue
+    if request["prompt"] == "MALFORMED":
+        print(json.dumps({"id": "earlier", "type": "output", "stream": "stdout", "line": "stale"}), flush=True)
+        print(json.dumps({"id": request["id"], "type": "result", "exit_code": "oops"}), flush=True)
+        continue
+    message = json.dumps({"actions": [{"id": str(os.getpid()), "type": "set_speed", "params": {"speed": 2}}]})
+    print(json.dumps({"id": request["id"], "type": "result", "exit_code": 0, "last_message": message}), flush=True)
+    if request["prompt"] == "TRAILING":
+        print("trailing output after the result", flush=True)
+"""
+
+
+def _write_worker(tmp_path: Path) -> list[str]:
+    script = tmp_path / "fake_worker.py"
+    script.write_text(WORKER_SCRIPT, encoding="utf-8")
+    return [sys.executable, str(script)]
+
+
+def _request(tmp_path: Path, name: str, prompt: str = "plan", timeout_seconds: int = 0) -> DecisionRequest:
+    request_dir = tmp_path / name
+    request_dir.mkdir()
+    return DecisionRequest(
+        request_tag=name,
+        request_dir=str(request_dir),
+        prompt=prompt,
+        last_message_path=request_dir / "last_message.json",
+        timeout_seconds=timeout_seconds,
+    )
+
+
+def test_worker_backend_reuses_warm_process(tmp_path: Path) -> None:
+    backend = WorkerBackend(_write_worker(tmp_path))
+    lines: list[tuple[str, str]] = []
+    try:
+        first_request = _request(tmp_path, "first")
+        first = backend.run(first_request, lambda stream, line: lines.append((stream, line)))
+        second_request = _request(tmp_path, "second")
+        second = backend.run(second_request, lambda stream, line: None)
+    finally:
+        backend.close()
+
+    assert first.return_code == 0
+    assert second.return_code == 0
+    first_message = json.loads(first_request.last_message_path.read_text(encoding="utf-8"))
+    second_message = json.loads(second_request.last_message_path.read_text(encoding="utf-8"))
+    assert first_message["actions"][0]["id"] == second_message["actions"][0]["id"]
+    assert ("stdout", "planning") in lines
+    assert "handling" in first.stdout
+
+
+def test_worker_backend_kills_worker_on_timeout(tmp_path: Path) -> None:
+    backend = WorkerBackend(_write_worker(tmp_path))
+    try:
+        hung = backend.run(_request(tmp_path, "hung", prompt="HANG_FOREVER", timeout_seconds=1), lambda stream, line: None)
+        recovered = backend.run(_request(tmp_path, "recovered"), lambda stream, line: None)
+    finally:
+        backend.close()
+
+    assert hung.timed_out is True
+    assert recovered.return_code == 0
+
+
+def test_worker_backend_drops_foreign_messages_and_bad_exit_codes(tmp_path: Path) -> None:
+    backend = WorkerBackend(_write_worker(tmp_path))
+    lines: list[tuple[str, str]] = []
+    try:
+        malformed = backend.run(_request(tmp_path, "malformed", prompt="MALFORMED"), lambda stream, line: lines.append((stream, line)))
+        recovered = backend.run(_request(tmp_path, "recovered"), lambda stream, line: None)
+    finally:
+        backend.close()
+
+    assert malformed.return_code == -1
+    assert "stale" not in malformed.stdout and ("stdout", "stale") not in lines
+    assert recovered.return_code == 0
+    assert "spawned=1" in backend.describe()
+
+
+def test_worker_backend_drops_plain_lines_left_over_from_the_previous_request(tmp_path: Path) -> None:
+    backend = WorkerBackend(_write_worker(tmp_path))
+    lines: list[tuple[str, str]] = []
+    try:
+        first = backend.run(_request(tmp_path, "first", prompt="TRAILING"), lambda stream, line: None)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and backend._idle[0].lines.empty():
+            time.sleep(0.01)
+        second = backend.run(_request(tmp_path, "second"), lambda stream, line: lines.append((stream, line)))
+    finally:
+        backend.close()
+
+    assert first.return_code == 0 and second.return_code == 0
+    assert "trailing" not in second.stdout
+    assert not any("trailing" in line for _, line in lines)
+
+
+def test_worker_backend_reports_unwritable_last_message_as_invoke_error(tmp_path: Path) -> None:
+    backend = WorkerBackend(_write_worker(tmp_path))
+    request = _request(tmp_path, "unwritable")
+    request.last_message_path.mkdir()
+    try:
+        result = backend.run(request, lambda stream, line: None)
+    finally:
+        backend.close()
+
+    assert result.return_code == -1
+    assert result.invoke_error is not None and "last message" in result.invoke_error
+
+
+def test_fake_backend_writes_last_message(tmp_path: Path) -> None:
+    request = _request(tmp_path, "fake")
+    result = FakeBackend('{"actions":[]}').run(request, lambda stream, line: None)
+
+    assert result.return_code == 0
+    assert request.last_message_path.read_text(encoding="utf-8") == '{"actions":[]}'
+
+
+def test_call_codex_exec_uses_configured_worker_backend(monkeypatch, tmp_path: Path) -> None:
+    request_dir = tmp_path / "request"
+    request_dir.mkdir()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "worker")
+    monkeypatch.setenv("ONI_AI_WORKER_CMD", " ".join(_write_worker(tmp_path)))
+
+    try:
+        first = json.loads(ai_bridge.call_codex_exec({"request_dir": str(request_dir)}, request_tag="w1"))
+        second = json.loads(ai_bridge.call_codex_exec({"request_dir": str(request_dir)}, request_tag="w2"))
+    finally:
+        ai_bridge.close_worker_backends()
+
+    assert first["actions"][0]["type"] == "set_speed"
+    assert first["actions"][0]["id"] == second["actions"][0]["id"]
+    assert (request_dir / "logs" / "codex_exit_code.txt").read_text(encoding="utf-8") == "0"
+
+
+def test_call_codex_exec_uses_fake_backend(monkeypatch, tmp_path: Path) -> None:
+    request_dir = tmp_path / "request"
+    request_dir.mkdir()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv("ONI_AI_FAKE_RESPONSE", '{"actions":[{"id":"fake","type":"set_speed","params":{"speed":3}}]}')
+
+    parsed = json.loads(ai_bridge.call_codex_exec({"request_dir": str(request_dir)}))
+
+    assert parsed["actions"][0]["id"] == "fake"
+    assert (request_dir / "logs" / "codex_last_message.json").exists()
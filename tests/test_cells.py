@@ -0,0 +1,95 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from oni_ai.cells import CellInspector, Region, tile_region
+from oni_ai.client import OniApiClient
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class _FakeCellsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    queries: list[tuple[int, int, int]] = []
+
+    def do_GET(self) -> None:  # noqa: N802
+        query = {key: int(values[0]) for key, values in parse_qs(urlsplit(self.path).query).items()}
+        x, y, radius = query["x"], query["y"], query.get("radius", 0)
+        assert 0 <= radius <= 20
+        self.queries.append((x, y, radius))
+        cells = [
+            {"x": cx, "y": cy, "is_valid_cell": True, "is_solid": (cx + cy) % 3 == 0}
+            for cy in range(y - radius, y + radius + 1)
+            for cx in range(x - radius, x + radius + 1)
+        ]
+        body = json.dumps({"observed_at_utc": "now", "requested_points": len(cells), "valid_cells": len(cells), "cells": cells})
+        encoded = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def test_tile_region_covers_box_with_minimal_queries() -> None:
+    region = Region.box(0, 0, 99, 49)
+
+    queries = tile_region(region)
+
+    assert len(queries) == 6
+    assert all(query.radius <= 20 for query in queries)
+    assert all(any(query.covers(x, y) for query in queries) for x, y in region.cells())
+
+
+def test_tile_region_skips_blocks_outside_polygon() -> None:
+    triangle = Region.from_polygon([(0, 0), (120, 0), (0, 120)])
+
+    queries = tile_region(triangle)
+
+    assert len(queries) == 6
+    assert all(any(query.covers(x, y) for query in queries) for x, y in triangle.cells())
+    assert triangle.contains(60, 60) and not triangle.contains(61, 60)
+
+
+def test_cell_inspector_fetches_concurrently_dedupes_and_caches_per_cycle() -> None:
+    _FakeCellsHandler.queries = []
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeCellsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = OniApiClient(f"http://127.0.0.1:{port}")
+    try:
+        inspector = CellInspector(client)
+        region = Region.box(10, 5, 69, 44)
+
+        grid = inspector.inspect(region, cycle=42)
+        assert len(_FakeCellsHandler.queries) == 2
+        assert grid.missing() == []
+        assert grid.get(10, 5) == {"x": 10, "y": 5, "is_valid_cell": True, "is_solid": True}
+        assert len(grid.rows()) == 40 and len(grid.rows()[0]) == 60
+        assert grid.get(9, 5) is None
+
+        inspector.inspect(Region.box(20, 10, 40, 30), cycle=42)
+        assert len(_FakeCellsHandler.queries) == 2
+
+        overlapping = inspector.inspect(Region.box(60, 40, 80, 50), cycle=42)
+        assert len(_FakeCellsHandler.queries) == 3
+        assert overlapping.missing() == []
+
+        inspector.inspect(Region.box(20, 10, 40, 30), cycle=43)
+        assert len(_FakeCellsHandler.queries) == 4
+        assert inspector.cache.stats()["cycles"] == [42, 43]
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
@@ -0,0 +1,137 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from oni_ai.client import (
+    DEFAULT_CACHE_TTLS,
+    DEFAULT_ENDPOINT_TIMEOUTS,
+    OniApiClient,
+    RetryPolicy,
+    load_response_validators,
+    match_route,
+)
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class _FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: dict[str, int] = {}
+    research = {"current": "FarmingTech", "available": [], "potential": [], "counts": {"available": 0, "potential": 0}}
+
+    def _send(self, status: int, body: dict | None, headers: dict[str, str] | None = None) -> None:
+        encoded = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self) -> None:  # noqa: N802
+        hits = type(self).hits
+        hits[self.path] = hits.get(self.path, 0) + 1
+        if self.path == "/state" and hits[self.path] < 3:
+            self._send(503, {"error": "state_unavailable"})
+        elif self.path == "/state":
+            self._send(200, {"state": {}, "pending_action_count": 0})
+        elif self.path == "/research":
+            etag = f'"{type(self).research["current"]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, None, {"ETag": etag})
+            else:
+                self._send(200, type(self).research, {"ETag": etag})
+        elif self.path == "/speed":
+            self._send(200, {"speed": "fast", "paused": False})
+        else:
+            self._send(404, {"error": "not_found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        hits = type(self).hits
+        hits[f"POST {self.path}"] = hits.get(f"POST {self.path}", 0) + 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/research":
+            type(self).research = {**type(self).research, "current": body["tech_id"]}
+            self._send(200, {"ok": True})
+        else:
+            self._send(503, {"error": "busy"})
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+@pytest.fixture
+def fake_api():
+    _FakeApiHandler.hits = {}
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{port}"
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=2)
+
+
+def test_idempotent_requests_retry_transient_failures(fake_api: str) -> None:
+    client = OniApiClient(fake_api, retry=RetryPolicy(attempts=3, base_delay_seconds=0.01))
+    try:
+        assert client.get_json("/state").status == 200
+        assert _FakeApiHandler.hits["/state"] == 3
+
+        assert client.request("POST", "/pause", {"paused": True}).status == 503
+        assert _FakeApiHandler.hits["POST /pause"] == 1
+        assert client.stats()["retries"] == 2
+    finally:
+        client.close()
+
+    refused = OniApiClient(f"http://127.0.0.1:{_find_free_port()}", retry=RetryPolicy(attempts=2, base_delay_seconds=0.01))
+    with pytest.raises(ConnectionRefusedError):
+        refused.get_json("/state", timeout_seconds=1)
+    assert refused.stats()["retries"] == 1 and refused.stats()["errors"] == 2
+
+
+def test_slow_changing_resources_are_cached_and_revalidated(fake_api: str) -> None:
+    client = OniApiClient(fake_api, cache_ttls={"/research": 30.0})
+    try:
+        first = client.get_json("/research")
+        second = client.get_json("/research")
+        assert not first.cached and second.cached and second.body is first.body
+        assert _FakeApiHandler.hits["/research"] == 1
+
+        with client._lock:
+            client._cache["/research"].fresh_until = 0.0
+        revalidated = client.get_json("/research")
+        assert revalidated.cached and revalidated.status == 200 and revalidated.body["current"] == "FarmingTech"
+        assert _FakeApiHandler.hits["/research"] == 2
+
+        client.request("POST", "/research", {"tech_id": "BasicRefinement"})
+        assert client.get_json("/research").body["current"] == "BasicRefinement"
+        assert client.stats()["cache_hits"] == 1 and client.stats()["cache_revalidated"] == 1
+    finally:
+        client.close()
+
+
+def test_responses_are_checked_against_openapi_schemas(fake_api: str) -> None:
+    pytest.importorskip("yaml")
+    validators = load_response_validators()
+    assert validators is not None
+    # The client's per-endpoint defaults must name real endpoints.
+    assert {("GET", path) for path in {*DEFAULT_CACHE_TTLS, *DEFAULT_ENDPOINT_TIMEOUTS}} <= set(validators)
+    assert match_route("/cells/4/-2", [path for _, path in validators]) == "/cells/{x}/{y}"
+
+    client = OniApiClient(fake_api, response_validators=validators)
+    try:
+        assert client.get_json("/speed").schema_errors == ["body.speed: expected integer"]
+        assert client.get_json("/research").schema_errors == []
+        assert client.stats()["schema_errors"] == 1
+    finally:
+        client.close()
@@ -0,0 +1,50 @@
+import time
+from pathlib import Path
+
+from oni_ai.decision_cache import DecisionCache, fingerprint_payload, select_fields
+
+
+def test_select_fields_projects_and_drops_dotted_paths() -> None:
+    payload = {"context": {"cycle": 7, "paused": True}, "duplicants": [1], "requested_at_utc": "now"}
+
+    assert select_fields(payload, include=("context.cycle", "duplicants")) == {"context": {"cycle": 7}, "duplicants": [1]}
+    assert select_fields(payload, exclude=("context.paused", "requested_at_utc")) == {"context": {"cycle": 7}, "duplicants": [1]}
+    assert payload["context"] == {"cycle": 7, "paused": True}
+
+
+def test_fingerprint_payload_respects_include_list() -> None:
+    first = {"context": {"cycle": 7}, "duplicants": [{"id": "1"}]}
+    second = {"context": {"cycle": 7}, "duplicants": [{"id": "2"}]}
+
+    assert fingerprint_payload(first) != fingerprint_payload(second)
+    assert fingerprint_payload(first, include=("context",)) == fingerprint_payload(second, include=("context",))
+
+
+def test_decision_cache_evicts_expires_and_counts() -> None:
+    cache = DecisionCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "plan-a")
+    cache.put("b", "plan-b")
+    assert cache.get("a") == "plan-a"
+    cache.put("c", "plan-c")
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "plan-c"
+
+    cache._entries["a"] = (time.time() - 120, "plan-a")
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expired"] == 1
+
+
+def test_decision_cache_persists_entries_to_disk(tmp_path: Path) -> None:
+    key = fingerprint_payload({"context": {"cycle": 1}})
+    DecisionCache(max_entries=4, ttl_seconds=60, persist_dir=tmp_path).put(key, '{"actions":[]}')
+
+    reloaded = DecisionCache(max_entries=4, ttl_seconds=60, persist_dir=tmp_path)
+    assert reloaded.get(key) == '{"actions":[]}'
+    assert reloaded.stats()["disk_hits"] == 1
+    assert reloaded.get("../escape") is None
@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from oni_ai.cells import CellGrid, Region  # noqa: E402
+from oni_ai.grid import GridArrays, polygon_mask  # noqa: E402
+
+
+def _cell(x: int, y: int, element: str, **fields) -> dict:
+    state = {"is_solid": False, "is_liquid": False, "is_gas": False}
+    if element in {"Sandstone", "Granite", "Unobtanium"}:
+        state["is_solid"] = True
+    elif element in {"Water"}:
+        state["is_liquid"] = True
+    else:
+        state["is_gas"] = True
+    return {"x": x, "y": y, "is_valid_cell": True, "element": element, "temperature_c": 25.0, "mass": 100.0, **state, **fields}
+
+
+def _sample_cells() -> list[dict]:
+    # 10x6 map: sandstone everywhere, a water pocket, a chlorine pocket, neutronium and a hot tile.
+    cells = [_cell(x, y, "Sandstone") for y in range(6) for x in range(10)]
+    overrides = {
+        (8, 1): _cell(8, 1, "Water"),
+        (0, 5): _cell(0, 5, "ChlorineGas"),
+        (5, 0): _cell(5, 0, "Unobtanium"),
+        (3, 3): _cell(3, 3, "Granite", temperature_c=95.0),
+        (6, 4): _cell(6, 4, "Oxygen"),
+        (6, 5): _cell(6, 5, "CarbonDioxide"),
+    }
+    return [overrides.get((cell["x"], cell["y"]), cell) for cell in cells]
+
+
+def test_grid_arrays_ingest_struct_of_arrays() -> None:
+    grid = GridArrays.from_cells(_sample_cells())
+
+    assert (grid.width, grid.height) == (10, 6)
+    assert grid.known.all()
+    assert grid.element.dtype == np.int16
+    assert grid.element_names[int(grid.element[1, 8])] == "Water"
+    assert grid.is_liquid[1, 8] and not grid.is_solid[1, 8]
+    assert grid.cell(3, 3)["temperature_c"] == 95.0
+    assert grid.cell(20, 20) is None
+
+
+def test_diggable_cells_excludes_hazards_and_their_neighbours() -> None:
+    grid = GridArrays.from_cells(_sample_cells())
+
+    diggable = {tuple(point) for point in grid.diggable_cells(Region.box(0, 0, 9, 5)).tolist()}
+
+    assert (1, 1) in diggable
+    for blocked in [(8, 1), (8, 0), (7, 1), (9, 1), (8, 2), (5, 0), (3, 3), (3, 2), (0, 4), (1, 5), (6, 4), (5, 5)]:
+        assert blocked not in diggable
+    assert (6, 3) in diggable
+
+    inside_box = grid.diggable_cells(Region.box(0, 0, 2, 2))
+    assert inside_box.shape == (9, 2)
+
+
+def test_gas_pockets_adjacent_to_region_ignore_breathable_gas() -> None:
+    grid = GridArrays.from_cells(_sample_cells())
+
+    pockets = grid.gas_pockets_adjacent(Region.box(4, 2, 7, 3))
+    assert pockets.tolist() == []
+
+    pockets = grid.gas_pockets_adjacent(Region.box(5, 3, 7, 4))
+    assert pockets.tolist() == [[6, 5]]
+
+
+def test_polygon_mask_matches_region_contains() -> None:
+    region = Region.from_polygon([(0, 0), (30, 4), (12, 25), (3, 14)])
+    ys, xs = np.mgrid[region.y0 : region.y1 + 1, region.x0 : region.x1 + 1]
+
+    mask = polygon_mask(xs, ys, region.polygon)
+
+    expected = np.array([[region.contains(x, y) for x in range(region.x0, region.x1 + 1)] for y in range(region.y0, region.y1 + 1)])
+    assert (mask == expected).all()
+
+
+def test_grid_arrays_from_cell_grid_keeps_unknown_cells_out_of_queries() -> None:
+    region = Region.box(0, 0, 2, 0)
+    cell_grid = CellGrid(region, [_cell(0, 0, "Sandstone"), None, _cell(2, 0, "Sandstone")])
+
+    grid = GridArrays.from_cell_grid(cell_grid)
+
+    assert grid.known.tolist() == [[True, False, True]]
+    assert grid.diggable_cells().tolist() == [[0, 0], [2, 0]]
+
+
+def test_runtime_cells_need_an_element_table_for_element_checks() -> None:
+    # What the runtime sends: phase flags and an element index, no name, mass or temperature.
+    element_ids = ["Oxygen", "SandStone", "Unobtanium"]
+    cells = [
+        {"x": x, "y": 0, "is_valid_cell": True, "is_solid": True, "is_liquid": False, "is_gas": False, "element_index": index}
+        for x, index in enumerate([1, 2, 1])
+    ]
+
+    assert GridArrays.from_cells(cells).diggable_cells().tolist() == [[0, 0], [1, 0], [2, 0]]
+    mapped = GridArrays.from_cells(cells, element_ids=element_ids)
+    assert mapped.diggable_cells().tolist() == [[0, 0], [2, 0]]
+    assert mapped.cell(1, 0)["element"] == "Unobtanium"
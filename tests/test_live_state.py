@@ -0,0 +1,131 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import oni_ai.ai_bridge as ai_bridge
+from oni_ai.client import OniApiClient
+from oni_ai.live_state import LiveStatePrefetch, fetched_endpoints, parse_endpoint_specs
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class _FakeOniApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    responses = {
+        "/state": {"state": {"context": {"cycle": 7}}},
+        "/priorities": {"priorities": []},
+        "/speed": {"speed": 2},
+    }
+    delay_seconds = {"/slow": 1.0}
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/truncated":
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b'{"state"')
+            self.close_connection = True
+            return
+        time.sleep(self.delay_seconds.get(self.path, 0.2))
+        body = json.dumps(self.responses.get(self.path, {"error": "not_found"})).encode("utf-8")
+        self.send_response(200 if self.path in self.responses else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def _start_fake_api() -> tuple[ThreadingHTTPServer, threading.Thread, str]:
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeOniApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def test_parse_endpoint_specs_applies_per_endpoint_timeouts() -> None:
+    assert parse_endpoint_specs("/state:3000, priorities ,/speed:bad", 1500) == [
+        ("/state", 3.0),
+        ("/priorities", 1.5),
+        ("/speed", 1.5),
+    ]
+
+
+def test_prefetch_fetches_endpoints_concurrently_and_reuses_connections() -> None:
+    server, thread, base_url = _start_fake_api()
+    client = OniApiClient(base_url)
+    try:
+        endpoints = parse_endpoint_specs("/state,/priorities,/speed,/slow:300", 2000)
+        started_at = time.monotonic()
+        snapshot = LiveStatePrefetch(client, endpoints).start().collect()
+        elapsed = time.monotonic() - started_at
+
+        assert elapsed < 0.55
+        assert fetched_endpoints(snapshot) == ["/state", "/priorities", "/speed"]
+        assert snapshot["endpoints"]["/state"]["body"]["state"]["context"]["cycle"] == 7
+        assert "timed out" in snapshot["endpoints"]["/slow"]["error"]
+
+        assert client.get_json("/speed").body == {"speed": 2}
+        assert client.stats()["connections_reused"] >= 1
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+
+
+def test_prefetch_reports_truncated_responses_as_endpoint_errors() -> None:
+    server, thread, base_url = _start_fake_api()
+    client = OniApiClient(base_url)
+    try:
+        snapshot = LiveStatePrefetch(client, [("/truncated", 2.0)]).start().collect()
+
+        assert snapshot["endpoints"]["/truncated"]["error"].startswith("IncompleteRead")
+        assert fetched_endpoints(snapshot) == []
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+
+
+def test_call_codex_exec_stages_live_state_and_points_prompt_at_it(monkeypatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    server, thread, base_url = _start_fake_api()
+    original_build_prompt = ai_bridge.build_prompt
+    prompt_calls = []
+
+    def recording_build_prompt(payload, has_screenshot, live_state_endpoints=None, has_state_digest=False, state_diff=None):
+        prompt_calls.append((live_state_endpoints, has_state_digest))
+        return original_build_prompt(payload, has_screenshot, live_state_endpoints, has_state_digest, state_diff)
+
+    monkeypatch.setattr(ai_bridge, "build_prompt", recording_build_prompt)
+    try:
+        ai_bridge.call_codex_exec({"request_dir": str(tmp_path), "api_base_url": base_url}, request_tag="live_001")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+    live_state = json.loads((tmp_path / "live_state.json").read_text(encoding="utf-8"))
+    digest = json.loads((tmp_path / "state_digest.json").read_text(encoding="utf-8"))
+    assert prompt_calls == [(["/state", "/priorities", "/speed"], True)]
+    assert digest["context"] == {"cycle": 7}
+    assert live_state["api_base_url"] == base_url
+    assert live_state["endpoints"]["/speed"]["body"] == {"speed": 2}
+
+    prompt = original_build_prompt({"api_base_url": base_url}, False, ["/state", "/speed"])
+    assert "./live_state.json was fetched by the bridge" in prompt
+    assert "GET /state, GET /speed" in prompt
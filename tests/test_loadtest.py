@@ -0,0 +1,125 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from oni_ai import ai_bridge, loadtest
+from oni_ai.metrics import percentile
+
+
+class _EvictingBridgeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: dict) -> None:
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._send(202, {"job_id": "gone", "status_url": "/analyze/gone"})
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._send(404, {"error": "job_not_found"})
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([7.0], 0.95) == 7.0
+    assert percentile([], 0.5) is None
+
+
+def test_load_test_reports_throughput_latency_and_resources() -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    try:
+        report = loadtest.run_load_test(
+            loadtest.LoadTestConfig(clients=3, requests=9, codex_latency_ms=10, backend="fake", poll_interval_ms=5, sample_interval_ms=20)
+        )
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    summary = report["summary"]
+    assert summary["completed"] == 9 and summary["failed"] == 0
+    assert summary["throughput_rps"] > 0
+    assert set(summary["latency_ms"]["end_to_end"]) == {"p50", "p95", "p99", "max", "mean"}
+    assert summary["latency_ms"]["end_to_end"]["p50"] >= 10
+    # Keep-alive status polls must not stall on delayed ACKs (~40ms each); assert
+    # the setting rather than a timing that depends on the machine's load.
+    assert ai_bridge.OniAiHandler.disable_nagle_algorithm is True
+    assert summary["latency_ms"]["poll"]["p50"] < 1000
+    assert summary["peak_threads"] >= 3
+    assert report["samples"] and {"t", "threads", "rss_bytes", "jobs_queued", "jobs_running"} <= set(report["samples"][0])
+
+
+def test_load_test_counts_evicted_jobs_as_failures(tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EvictingBridgeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        config = loadtest.LoadTestConfig(clients=1, requests=2, poll_interval_ms=5)
+        report = loadtest.LoadTest(config, f"http://127.0.0.1:{server.server_address[1]}", tmp_path).run()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert report["summary"]["completed"] == 0 and report["summary"]["failed"] == 2
+    assert "poll failed status=404" in report["errors"][0]
+
+
+def test_load_test_rebuilds_the_scheduler_from_its_config() -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    try:
+        ai_bridge.get_job_scheduler()
+        report = loadtest.run_load_test(
+            loadtest.LoadTestConfig(clients=1, requests=1, codex_latency_ms=0, backend="fake", job_workers=3, job_queue_size=5)
+        )
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert report["scheduler"] == {"workers": 3, "queue_size": 5, "policy": "reject"}
+
+
+def test_load_test_cli_drives_a_fake_codex_command(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_LOG_LEVEL", "WARNING")
+    output = tmp_path / "load.json"
+    try:
+        exit_code = loadtest.main(
+            ["--clients", "2", "--requests", "2", "--codex-latency-ms", "20", "--long-poll-seconds", "5", "--output", str(output)]
+        )
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert exit_code == 0
+    assert report["config"]["backend"] == "exec"
+    assert report["summary"]["completed"] == 2
+    assert report["summary"]["polls"] == 2
+
+
+def test_load_test_against_mock_oni_api_runs_live_state_and_cell_checks() -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    try:
+        report = loadtest.run_load_test(
+            loadtest.LoadTestConfig(clients=2, requests=4, codex_latency_ms=0, backend="fake", poll_interval_ms=5, mock_api=True)
+        )
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert report["summary"]["completed"] == 4
+    assert report["mock_api_counters"]["state"] >= 4
+    assert report["mock_api_counters"]["cells_get"] >= 1
@@ -0,0 +1,34 @@
+from oni_ai.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets_per_label() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("oni_ai_test_seconds", "Test latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05, {"stage": "codex"})
+    histogram.observe(0.5, {"stage": "codex"})
+    histogram.observe(3.0, {"stage": "codex"})
+    histogram.observe(0.2, {"stage": "queue_wait"})
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP oni_ai_test_seconds Test latency.", "# TYPE oni_ai_test_seconds histogram"]
+    assert 'oni_ai_test_seconds_bucket{stage="codex",le="0.1"} 1' in lines
+    assert 'oni_ai_test_seconds_bucket{stage="codex",le="1"} 2' in lines
+    assert 'oni_ai_test_seconds_bucket{stage="codex",le="+Inf"} 3' in lines
+    assert 'oni_ai_test_seconds_sum{stage="codex"} 3.55' in lines
+    assert 'oni_ai_test_seconds_count{stage="codex"} 3' in lines
+    assert 'oni_ai_test_seconds_count{stage="queue_wait"} 1' in lines
+
+
+def test_counter_escapes_labels_and_resets() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("oni_ai_test_total", "Test counter.")
+    assert registry.counter("oni_ai_test_total", "Duplicate registration.") is counter
+
+    counter.inc(labels={"reason": 'bad "quote"'})
+    counter.inc(2, labels={"reason": 'bad "quote"'})
+
+    assert 'oni_ai_test_total{reason="bad \\"quote\\""} 3' in registry.render()
+
+    registry.reset()
+    assert counter.value({"reason": 'bad "quote"'}) == 0
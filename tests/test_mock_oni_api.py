@@ -0,0 +1,137 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from oni_ai import ai_bridge
+from oni_ai.backends import FakeBackend
+from oni_ai.cells import CellInspector
+from oni_ai.client import OniApiClient, load_response_validators
+from oni_ai.mock_oni_api import ELEMENT_INDEX, MockOniApi, MockOniApiServer, MockWorld
+from oni_ai.plan_validator import PlanValidator
+
+
+def test_mock_server_starts_fast_and_simulates_dig_errands() -> None:
+    started_at = time.monotonic()
+    with MockOniApiServer() as server:
+        client = OniApiClient(server.base_url, cache_ttls={})
+        assert client.get_json("/health").body["ok"] is True
+        assert time.monotonic() - started_at < 1.0
+
+        before = client.get_json("/cells/30/30").body["cells"][0]
+        assert before["is_solid"] is True and before["is_dug"] is False
+
+        dug = client.request("POST", "/dig", {"points": [{"x": 30, "y": 30}, {"x": 30, "y": 50}]})
+        assert dug.status == 200 and dug.body["applied"] == 1
+        assert dug.body["skipped"] == [{"x": 30, "y": 50, "reason": "not_solid"}]
+
+        after = client.get_json("/cells?x=30&y=30&radius=0").body["cells"][0]
+        assert after["is_solid"] is False and after["is_dug"] is True
+        assert after["element_index"] == ELEMENT_INDEX["Oxygen"] and "element" not in after
+        pending = client.get_json("/actions/pending").body
+        assert pending["counts"]["with_current_action"] == 1
+        assert client.get_json("/state").body["pending_action_count"] == 1
+
+        assert client.request("POST", "/mock/advance", {"cycles": 1}).body["completed_errands"] == 1
+        assert client.get_json("/state").body["pending_action_count"] == 0
+        assert client.request("POST", "/dig", {"cells": [[1, 1]]}).status == 400
+        assert client.get_json("/cells?x=1&y=1&radius=21").status == 400
+
+        counters = client.get_json("/stats").body["counters"]
+        assert counters["dig_post"] == 2 and counters["state"] == 2 and counters["health"] == 1
+
+
+def test_mock_responses_match_openapi_schemas() -> None:
+    pytest.importorskip("yaml")
+    validators = load_response_validators()
+    assert validators
+
+    with MockOniApiServer() as server:
+        client = OniApiClient(server.base_url, cache_ttls={}, response_validators=validators)
+        responses = [
+            client.get_json(path)
+            for path in (
+                "/health",
+                "/runtime",
+                "/state",
+                "/speed",
+                "/pause",
+                "/camera",
+                "/priorities",
+                "/actions/pending",
+                "/buildings",
+                "/research",
+                "/cells?x=10&y=30&radius=2",
+                "/cells/200/200",
+            )
+        ]
+        responses += [
+            client.request("POST", "/speed", {"speed": 2}),
+            client.request("POST", "/pause", {"paused": True}),
+            client.request("POST", "/camera", {"x": 12, "y": 40}),
+            client.request("POST", "/dig", {"points": [{"x": 40, "y": 20}]}),
+            client.request("POST", "/build", {"building_id": "Ladder", "points": [{"x": 40, "y": 20}]}),
+            client.request("POST", "/deconstruct", {"points": [{"x": 40, "y": 20}]}),
+            client.request("POST", "/research", {"tech_id": "FarmingTech"}),
+            client.request("POST", "/priorities", {"priorities": [{"duplicant_id": "1001", "values": {"dig": 8}}]}),
+        ]
+
+    for response in responses:
+        assert response.status == 200
+        assert response.schema_errors == []
+
+
+def test_mock_latency_and_plan_validation_against_simulated_cells() -> None:
+    world = MockWorld(width=48, height=48, surface=40)
+    with MockOniApiServer(MockOniApi(world), latency_by_path={"/speed": 0.05}) as server:
+        client = OniApiClient(server.base_url, cache_ttls={})
+        started_at = time.monotonic()
+        client.get_json("/speed")
+        assert time.monotonic() - started_at >= 0.05
+
+        validator = PlanValidator(None, CellInspector(client))
+        plan = {
+            "actions": [
+                # (10, 27) sits on top of the water pocket; (5, 45) is open air.
+                {"id": "a", "type": "dig", "params": {"points": [{"x": 30, "y": 20}, {"x": 10, "y": 27}, {"x": 5, "y": 45}]}},
+                {"id": "b", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 30, "y": 20}]}},
+            ]
+        }
+        validated, report = validator.validate(plan, cycle=1)
+
+    assert validated["actions"] == [{"id": "a", "type": "dig", "params": {"points": [{"x": 30, "y": 20}]}}]
+    assert report.cells_error is None and len(report.rejected) == 2
+
+
+def test_bridge_against_python_mock_server(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_SCREENSHOT_WAIT_MS", "0")
+    monkeypatch.setenv("ONI_AI_LIVE_STATE", "1")
+    request_dir = tmp_path / "request"
+    (request_dir / "logs").mkdir(parents=True)
+    (request_dir / "screenshot.png").write_bytes(b"png")
+    plan = {"actions": [{"id": "d1", "type": "dig", "params": {"points": [{"x": 30, "y": 30}, {"x": 30, "y": 50}]}}]}
+
+    try:
+        with MockOniApiServer() as server:
+            payload = {
+                "request_id": "python_mock_001",
+                "request_dir": str(request_dir),
+                "api_base_url": server.base_url,
+                "screenshot_path": "screenshot.png",
+                "context": {"cycle": 3, "paused": True, "current_speed": 1, "previous_speed": 1},
+                "duplicants": [],
+                "pending_actions": [],
+                "priorities": [],
+            }
+            normalized = ai_bridge.call_codex_exec(payload, request_tag="python_mock", backend=FakeBackend(json.dumps(plan)))
+            counters = OniApiClient(server.base_url).get_json("/stats").body["counters"]
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    parsed = json.loads(normalized)
+    assert [action["params"]["points"] for action in parsed["actions"]] == [[{"x": 30, "y": 30}]]
+    assert counters["state"] >= 1 and counters["cells_get"] >= 1
+    assert os.path.isfile(request_dir / "logs" / ai_bridge.BRIDGE_RESPONSE_FILE_NAME)
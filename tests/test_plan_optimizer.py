@@ -0,0 +1,109 @@
+import json
+
+from oni_ai import ai_bridge
+from oni_ai.plan_optimizer import cells_to_rects, optimize_plan
+
+
+def test_cells_to_rects_covers_points_exactly() -> None:
+    block = [(x, y) for y in range(10, 13) for x in range(4, 8)]
+    ragged = block + [(8, 10), (20, 20)]
+
+    assert cells_to_rects(block) == [(4, 10, 7, 12)]
+    rects = cells_to_rects(ragged)
+    covered = {(x, y) for x0, y0, x1, y1 in rects for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)}
+    assert covered == set(ragged)
+    assert rects == [(4, 10, 8, 10), (4, 11, 7, 12), (20, 20, 20, 20)]
+
+
+def test_optimize_plan_merges_points_folds_priorities_and_optionally_reorders() -> None:
+    plan = {
+        "analysis": "a",
+        "actions": [
+            {"id": "speed", "type": "set_speed", "params": {"speed": 2}},
+            {"id": "dig_a", "type": "dig", "params": {"points": [{"x": 1, "y": 1}, {"x": 2, "y": 1}]}},
+            {"id": "dig_b", "type": "dig", "params": {"cells": [{"x": 1, "y": 2}, {"x": 2, "y": 2}, {"x": 2, "y": 1}]}},
+            {"id": "prio_a", "type": "set_duplicant_priority", "params": {"duplicant_id": "7", "priorities": {"dig": 5, "build": 3}}},
+            {"id": "prio_b", "type": "set_duplicant_priority", "params": {"duplicant_id": "7", "priorities": {"dig": 9}}},
+            {"id": "ladder", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 0, "y": 0}]}},
+            {"id": "tile", "type": "build", "params": {"building_id": "Tile", "points": [{"x": 0, "y": 2}, {"x": 0, "y": 1}]}},
+            {"id": "tile_again", "type": "build", "params": {"building_id": "Tile", "points": [{"x": 0, "y": 2}, {"x": 0, "y": 1}]}},
+            {"id": "dig_far", "type": "dig", "params": {"points": [{"x": 5, "y": 5}]}},
+            {"id": "research", "type": "research", "params": {"tech_id": "FarmingTech"}},
+            {"id": "dig_far_again", "type": "dig", "params": {"points": [{"x": 5, "y": 5}]}},
+            {"id": "stop", "type": "cancel", "params": {"target_action_id": "dig_c"}},
+            {"id": "dig_c", "type": "dig", "params": {"points": [{"x": 9, "y": 9}]}},
+        ],
+    }
+
+    optimized, report = optimize_plan(plan)
+
+    # Only neighbours are combined, and a repeat after another action is kept.
+    assert [action["id"] for action in optimized["actions"]] == [
+        "speed", "dig_a", "prio_a", "ladder", "tile", "dig_far", "research", "dig_far_again", "stop", "dig_c"
+    ]
+    dig = optimized["actions"][1]
+    assert dig["merged_ids"] == ["dig_b"]
+    assert dig["params"]["rects"] == [{"x0": 1, "y0": 1, "x1": 2, "y1": 2}]
+    assert dig["params"]["points"] == [{"x": 1, "y": 1}, {"x": 2, "y": 1}, {"x": 1, "y": 2}, {"x": 2, "y": 2}]
+    assert optimized["actions"][2]["params"]["priorities"] == {"dig": 9, "build": 3}
+    # Actions nothing was merged into are passed through as the model wrote them.
+    assert optimized["actions"][4] == plan["actions"][6]
+    assert optimized["actions"][5] == plan["actions"][8]
+    assert optimized["actions"][9] == plan["actions"][12]
+    assert optimized["analysis"] == "a"
+    assert report.as_dict() == {"input_actions": 13, "output_actions": 10, "merged": 1, "deduplicated": 2, "reordered": False}
+
+    reordered, reordered_report = optimize_plan(plan, reorder=True)
+    # set_speed keeps the slot the model gave it; everything else is grouped by phase.
+    assert [action["id"] for action in reordered["actions"]] == [
+        "speed", "stop", "prio_a", "research", "dig_a", "dig_far", "dig_far_again", "dig_c", "ladder", "tile"
+    ]
+    assert reordered_report.reordered is True
+
+
+def test_optimize_plan_does_not_merge_across_other_actions() -> None:
+    plan = {
+        "actions": [
+            {"id": "dig_a", "type": "dig", "params": {"points": [{"x": 1, "y": 1}]}},
+            {"id": "ladder", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 1, "y": 1}]}},
+            {"id": "dig_b", "type": "dig", "params": {"points": [{"x": 2, "y": 1}]}},
+            {"id": "prio_a", "type": "set_duplicant_priority", "params": {"duplicant_id": "7", "priorities": {"dig": 5}}},
+            {"id": "pause", "type": "pause", "params": {"paused": True}},
+            {"id": "prio_b", "type": "set_duplicant_priority", "params": {"duplicant_id": "7", "priorities": {"dig": 9}}},
+        ]
+    }
+
+    optimized, report = optimize_plan(plan)
+
+    assert optimized["actions"] == plan["actions"]
+    assert report.merged == 0 and report.deduplicated == 0
+
+
+def test_reorder_keeps_pause_and_speed_in_place() -> None:
+    plan = {
+        "actions": [
+            {"id": "pause", "type": "pause", "params": {"paused": True}},
+            {"id": "build", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 0, "y": 0}]}},
+            {"id": "dig", "type": "dig", "params": {"points": [{"x": 1, "y": 1}]}},
+            {"id": "speed", "type": "set_speed", "params": {"speed": 1}},
+            {"id": "research", "type": "research", "params": {"tech_id": "FarmingTech"}},
+        ]
+    }
+
+    optimized, _ = optimize_plan(plan, reorder=True)
+
+    assert [action["id"] for action in optimized["actions"]] == ["pause", "research", "dig", "speed", "build"]
+
+
+def test_bridge_optimization_is_opt_in(monkeypatch) -> None:
+    normalized = json.dumps(
+        {"actions": [{"id": f"dig_{x}", "type": "dig", "params": {"points": [{"x": x, "y": 0}]}} for x in range(5)]}
+    )
+    monkeypatch.delenv("ONI_AI_PLAN_OPTIMIZE", raising=False)
+    assert ai_bridge.optimize_plan_output(normalized, "test") == normalized
+
+    monkeypatch.setenv("ONI_AI_PLAN_OPTIMIZE", "1")
+    optimized = json.loads(ai_bridge.optimize_plan_output(normalized, "test"))
+    assert len(optimized["actions"]) == 1
+    assert optimized["actions"][0]["params"]["rects"] == [{"x0": 0, "y0": 0, "x1": 4, "y1": 0}]
+    assert optimized["optimization"]["merged"] == 4
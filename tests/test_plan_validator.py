@@ -0,0 +1,240 @@
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from oni_ai import ai_bridge
+from oni_ai.cells import CellInspector
+from oni_ai.client import OniApiClient
+from oni_ai.plan_validator import PlanValidator, load_action_validators, repair_points
+from oni_ai.schema_validation import NO_ERRORS, compile_schema
+
+
+BENCHMARK_ENV_FLAG = "ONI_AI_RUN_BENCHMARKS"
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _fake_cell(x: int, y: int) -> dict:
+    # Solid rock above y=20, a water pocket below, nothing left of x=0; (5, 5) is already dug.
+    if x < 0:
+        return {"x": x, "y": y, "is_valid_cell": False}
+    liquid = y >= 20
+    return {
+        "x": x,
+        "y": y,
+        "is_valid_cell": True,
+        "is_solid": not liquid and (x, y) != (5, 5),
+        "is_liquid": liquid,
+        "is_dug": (x, y) == (5, 5),
+    }
+
+
+class _FakeCellsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def do_GET(self) -> None:  # noqa: N802
+        query = {key: int(values[0]) for key, values in parse_qs(urlsplit(self.path).query).items()}
+        x, y, radius = query["x"], query["y"], query.get("radius", 0)
+        type(self).requests += 1
+        cells = [
+            _fake_cell(cx, cy)
+            for cy in range(y - radius, y + radius + 1)
+            for cx in range(x - radius, x + radius + 1)
+        ]
+        encoded = json.dumps({"observed_at_utc": "now", "requested_points": len(cells), "valid_cells": len(cells), "cells": cells}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def test_repair_points_moves_coordinates_into_points() -> None:
+    assert repair_points({"cells": [{"x": 1, "y": 2}], "priority": 5}) == {"priority": 5, "points": [{"x": 1, "y": 2}]}
+    assert repair_points({"building_id": "Ladder", "cell": {"x": 3, "y": 4}}) == {
+        "building_id": "Ladder",
+        "points": [{"x": 3, "y": 4}],
+    }
+    assert repair_points({"x": 7, "y": 8}) == {"points": [{"x": 7, "y": 8}]}
+    raw_ids = {"cells": [1024, 1025]}
+    assert repair_points(raw_ids) is raw_ids
+
+
+def test_schema_checks_drop_malformed_actions() -> None:
+    pytest.importorskip("yaml")
+    validator = PlanValidator(load_action_validators())
+    plan = {
+        "analysis": "a",
+        "actions": [
+            {"id": "speed", "type": "set_speed", "params": {"speed": 5}},
+            {"id": "dig", "type": "dig", "params": {"cells": [{"x": 1, "y": 1}]}},
+            {"id": "build", "type": "build", "params": {"cell": {"x": 1, "y": 1}}},
+            {"id": "research", "type": "research", "params": {"tech_id": "FarmingTech"}},
+            {"id": "raw", "type": "deconstruct", "params": {"cells": [1024]}},
+            {"id": "cancel", "type": "cancel", "params": {"target_action_id": "old"}},
+        ],
+    }
+
+    validated, report = validator.validate(plan)
+
+    assert [action["id"] for action in validated["actions"]] == ["dig", "research", "cancel"]
+    assert validated["actions"][0]["params"] == {"points": [{"x": 1, "y": 1}]}
+    assert validated["analysis"] == "a"
+    assert report.checked == 6 and report.repaired == 2
+    errors = {item["id"]: item["errors"] for item in report.rejected}
+    assert errors["speed"] == ["params.speed: must be one of [1, 2, 3]"]
+    assert "params.building_id: required" in errors["build"]
+    assert "params.points: required" in errors["raw"]
+
+
+def test_cell_checks_drop_unsafe_points_and_flag_mode_keeps_them() -> None:
+    _FakeCellsHandler.requests = 0
+    port = _find_free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeCellsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = OniApiClient(f"http://127.0.0.1:{port}")
+    plan = {
+        "actions": [
+            {"id": "dig", "type": "dig", "params": {"points": [{"x": 1, "y": 1}, {"x": 2, "y": 19}, {"x": 5, "y": 5}]}},
+            {"id": "void", "type": "dig", "params": {"points": [{"x": -3, "y": 1}]}},
+            {"id": "wall", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 3, "y": 3}]}},
+            {"id": "pool", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": 3, "y": 21}]}},
+        ],
+    }
+    try:
+        validator = PlanValidator(None, CellInspector(client), mode="drop")
+
+        validated, report = validator.validate(plan, cycle=7)
+        assert [action["id"] for action in validated["actions"]] == ["dig", "pool"]
+        assert validated["actions"][0]["params"]["points"] == [{"x": 1, "y": 1}]
+        assert {item["id"]: item["dropped"] for item in report.rejected} == {"dig": False, "void": True, "wall": True}
+        assert "cell (2,19): would breach liquid at (2,20)" in report.rejected[0]["errors"]
+        assert report.cells_checked > 0 and report.cells_error is None
+        requests_after_first_plan = _FakeCellsHandler.requests
+
+        flagged, _ = PlanValidator(None, validator.inspector, mode="flag").validate(plan, cycle=7)
+        assert _FakeCellsHandler.requests == requests_after_first_plan
+        assert [action["id"] for action in flagged["actions"]] == ["dig", "void", "wall", "pool"]
+        assert flagged["actions"][1]["validation_errors"] == ["cell (-3,1): outside the world"]
+        assert "validation_errors" not in flagged["actions"][3]
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=2)
+
+
+def test_bridge_validation_reports_rejections_and_survives_unreachable_cells(monkeypatch: pytest.MonkeyPatch) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_PLAN_VALIDATION_TIMEOUT_MS", "200")
+    payload = {"api_base_url": f"http://127.0.0.1:{_find_free_port()}"}
+    normalized = json.dumps({"actions": [{"id": "dig", "type": "dig", "params": {"points": [{"x": 1, "y": 1}]}}]})
+    try:
+        validated = json.loads(ai_bridge.validate_plan(normalized, payload, {"context": {"cycle": 3}}, "test"))
+        assert [action["id"] for action in validated["actions"]] == ["dig"]
+        assert validated["validation"]["mode"] == "drop"
+        assert validated["validation"]["cells_error"]
+
+        monkeypatch.setenv("ONI_AI_PLAN_VALIDATION", "off")
+        assert ai_bridge.validate_plan(normalized, payload, {}, "test") == normalized
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+def test_compiled_validators_report_nested_paths() -> None:
+    validator = compile_schema(
+        {
+            "type": "object",
+            "required": ["points"],
+            "properties": {
+                "points": {
+                    "type": "array",
+                    "minItems": 1,
+                    "items": {
+                        "type": "object",
+                        "required": ["x", "y"],
+                        "additionalProperties": False,
+                        "properties": {"x": {"type": "integer"}, "y": {"type": "integer"}},
+                    },
+                },
+                "tags": {"type": "object", "additionalProperties": {"type": "integer"}},
+            },
+        }
+    )
+
+    assert validator({"points": [{"x": 1, "y": 2}], "tags": {"a": 1}}) is NO_ERRORS
+    assert validator({"points": [{"x": True, "z": 0}], "tags": {"a": "high"}}) == [
+        ".points[0].y: required",
+        ".points[0].x: expected integer",
+        ".points[0].z: unexpected property",
+        ".tags.a: expected integer",
+    ]
+    assert validator({"points": []}) == [".points: needs at least 1 items"]
+    assert validator([]) == (": expected object",)
+
+
+def test_job_result_carries_per_action_validation_errors(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    pytest.importorskip("yaml")
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv(
+        "ONI_AI_FAKE_RESPONSE",
+        json.dumps({"actions": [{"id": "fast", "type": "set_speed", "params": {"speed": 9}}, {"id": "pause", "type": "pause", "params": {"paused": True}}]}),
+    )
+    try:
+        payload = {"request_id": "validate_001", "request_dir": str(tmp_path)}
+        job = ai_bridge.create_job(payload, "trace")
+        ai_bridge.run_job(str(job["job_id"]), payload)
+
+        finished = ai_bridge.get_job_state(str(job["job_id"]))
+        assert finished["status"] == "completed"
+        assert [action["id"] for action in json.loads(finished["response"])["actions"]] == ["pause"]
+        assert finished["validation"]["rejected"] == [
+            {"id": "fast", "type": "set_speed", "dropped": True, "errors": ["params.speed: must be one of [1, 2, 3]"]}
+        ]
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+
+@pytest.mark.benchmark
+def test_validation_cost_per_thousand_actions() -> None:
+    if os.getenv(BENCHMARK_ENV_FLAG) != "1":
+        pytest.skip(f"Set {BENCHMARK_ENV_FLAG}=1 to run this benchmark")
+    pytest.importorskip("yaml")
+    validators = load_action_validators()
+    assert validators is not None
+    actions = [
+        {"id": f"dig_{index}", "type": "dig", "params": {"points": [{"x": index, "y": 10}, {"x": index, "y": 11}]}}
+        if index % 3 == 0
+        else {"id": f"build_{index}", "type": "build", "params": {"building_id": "Ladder", "points": [{"x": index, "y": 12}]}}
+        if index % 3 == 1
+        else {"id": f"speed_{index}", "type": "set_speed", "params": {"speed": 1 + index % 3}}
+        for index in range(1000)
+    ]
+    validator = PlanValidator(validators)
+
+    rounds = 20
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        validated, report = validator.validate({"actions": actions})
+    elapsed_seconds = time.perf_counter() - started_at
+
+    assert len(validated["actions"]) == len(actions) and report.rejected == []
+    per_thousand_ms = elapsed_seconds * 1000 / rounds * 1000 / len(actions)
+    per_action_us = elapsed_seconds * 1_000_000 / (rounds * len(actions))
+    print(f"plan validation: {per_thousand_ms:.3f} ms per 1k actions, {per_action_us:.3f} us per action")
@@ -0,0 +1,120 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from oni_ai import ai_bridge, replay
+from oni_ai.mock_oni_api import MockOniApiServer
+
+
+FAKE_PLAN = {
+    "analysis": "Idle diggers",
+    "actions": [
+        {"id": "dig_a", "type": "dig", "params": {"points": [{"x": 1, "y": 1}]}},
+        {"id": "dig_b", "type": "dig", "params": {"points": [{"x": 2, "y": 1}]}},
+        {"id": "slow", "type": "set_speed", "params": {"speed": 1}},
+    ],
+}
+
+
+def _record_requests(monkeypatch: pytest.MonkeyPatch, root: Path, count: int) -> list[Path]:
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv("ONI_AI_FAKE_RESPONSE", json.dumps(FAKE_PLAN))
+    monkeypatch.setenv("ONI_AI_PLAN_OPTIMIZE", "1")
+    monkeypatch.setenv("ONI_AI_SCREENSHOT_WAIT_MS", "0")
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(root))
+    request_dirs = []
+    for index in range(count):
+        request_dir = root / f"request_{index}"
+        request_dir.mkdir()
+        payload = {"request_id": f"request_{index}", "request_dir": str(request_dir), "context": {"cycle": 10 + index}}
+        ai_bridge.call_codex_exec(payload, request_tag=payload["request_id"])
+        request_dirs.append(request_dir)
+    return request_dirs
+
+
+def test_bridge_records_payload_and_response_for_replay(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    try:
+        [request_dir] = _record_requests(monkeypatch, tmp_path, 1)
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    logs_dir = request_dir / "logs"
+    assert json.loads((logs_dir / ai_bridge.REQUEST_PAYLOAD_FILE_NAME).read_text(encoding="utf-8"))["context"] == {"cycle": 10}
+    recorded = json.loads((logs_dir / ai_bridge.BRIDGE_RESPONSE_FILE_NAME).read_text(encoding="utf-8"))
+    assert [action["id"] for action in recorded["actions"]] == ["dig_a", "slow"]
+    assert replay.discover_request_dirs([tmp_path]) == [request_dir]
+
+
+def test_replay_reports_stage_timings_and_plan_diffs(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    try:
+        request_dirs = _record_requests(monkeypatch, tmp_path, 3)
+        changed_path = request_dirs[1] / "logs" / ai_bridge.BRIDGE_RESPONSE_FILE_NAME
+        changed_plan = json.loads(changed_path.read_text(encoding="utf-8"))
+        changed_plan["actions"].pop()
+        changed_path.write_text(json.dumps(changed_plan), encoding="utf-8")
+        monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "exec")
+        monkeypatch.setenv("ONI_AI_CODEX_CMD", "false")
+
+        report = replay.replay_corpus(request_dirs, workers=1)
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    summary = report["summary"]
+    assert summary["requests"] == 3 and summary["failed"] == 0
+    assert summary["compared"] == 3 and summary["changed"] == 1
+    assert {"asset_staging", "normalization", "validation", "optimization"} <= set(summary["stages_ms"])
+    results = {result["request_id"]: result for result in report["results"]}
+    assert results["request_0"]["diff"] == [] and results["request_0"]["action_count"] == 2
+    assert any(line.startswith("+") and '"slow"' in line for line in results["request_1"]["diff"])
+    # Replays run in scratch copies and leave the recorded artifacts alone.
+    assert json.loads(changed_path.read_text(encoding="utf-8")) == changed_plan
+
+
+def test_replay_repeats_cell_checks_from_recorded_cells(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    plan = {"actions": [{"id": "dig", "type": "dig", "params": {"points": [{"x": 30, "y": 30}, {"x": 30, "y": 50}]}}]}
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv("ONI_AI_FAKE_RESPONSE", json.dumps(plan))
+    monkeypatch.setenv("ONI_AI_SCREENSHOT_WAIT_MS", "0")
+    monkeypatch.setenv("ONI_AI_REQUEST_ROOT", str(tmp_path))
+    request_dir = tmp_path / "request_live"
+    request_dir.mkdir()
+    try:
+        with MockOniApiServer() as server:
+            payload = {"request_id": "request_live", "request_dir": str(request_dir), "api_base_url": server.base_url}
+            recorded = json.loads(ai_bridge.call_codex_exec(payload, request_tag="request_live"))
+        report = replay.replay_corpus([request_dir], workers=1)
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert recorded["actions"][0]["params"]["points"] == [{"x": 30, "y": 30}]
+    assert recorded["validation"]["cells_checked"] > 0
+    assert (request_dir / "logs" / ai_bridge.VALIDATION_CELLS_FILE_NAME).is_file()
+    assert report["summary"]["changed"] == 0
+    assert json.loads(report["results"][0]["response"])["validation"] == recorded["validation"]
+
+
+def test_replay_cli_runs_a_process_pool_against_a_baseline(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    try:
+        _record_requests(monkeypatch, corpus, 2)
+        first_report = tmp_path / "first.json"
+        assert replay.main([str(corpus), "--workers", "2", "--output", str(first_report), "--fail-on-diff"]) == 0
+
+        baseline = json.loads(first_report.read_text(encoding="utf-8"))
+        baseline["results"][0]["response"] = json.dumps({"actions": []})
+        first_report.write_text(json.dumps(baseline), encoding="utf-8")
+        second_report = tmp_path / "second.json"
+        exit_code = replay.main(
+            [str(corpus), "--workers", "2", "--baseline", str(first_report), "--output", str(second_report), "--fail-on-diff"]
+        )
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert exit_code == 1
+    assert json.loads(second_report.read_text(encoding="utf-8"))["summary"]["changed"] == 1
@@ -0,0 +1,65 @@
+import os
+import tarfile
+import time
+from pathlib import Path
+
+from oni_ai.retention import RetentionPolicy, RetentionService
+
+
+def _request_dir(root: Path, name: str, size: int, age_seconds: float) -> Path:
+    request_dir = root / name
+    (request_dir / "logs").mkdir(parents=True)
+    payload = request_dir / "logs" / "codex_stdout.txt"
+    payload.write_bytes(b"x" * size)
+    stamp = time.time() - age_seconds
+    os.utime(payload, (stamp, stamp))
+    os.utime(request_dir / "logs", (stamp, stamp))
+    os.utime(request_dir, (stamp, stamp))
+    return request_dir
+
+
+def test_retention_sweep_enforces_age_count_and_bytes(tmp_path: Path) -> None:
+    _request_dir(tmp_path, "ancient", 10, 10_000)
+    _request_dir(tmp_path, "old", 400, 300)
+    _request_dir(tmp_path, "middle", 400, 200)
+    _request_dir(tmp_path, "new", 400, 100)
+    _request_dir(tmp_path, "active", 400, 50)
+    (tmp_path / ".asset_cache").mkdir()
+
+    service = RetentionService(
+        tmp_path,
+        RetentionPolicy(max_age_seconds=3600, max_total_bytes=900, max_count=3),
+        is_protected=lambda path: path.name == "active",
+    )
+    result = service.sweep()
+
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert remaining == [".asset_cache", "active", "middle", "new"]
+    assert result["deleted"] == 2
+    stats = service.stats()
+    assert stats["tracked_count"] == 2
+    assert stats["tracked_bytes"] == 800
+    assert stats["freed_bytes"] == 410
+
+
+def test_retention_sweep_archives_older_request_dirs(tmp_path: Path) -> None:
+    _request_dir(tmp_path, "older", 4096, 600)
+    _request_dir(tmp_path, "recent", 4096, 10)
+
+    service = RetentionService(
+        tmp_path,
+        RetentionPolicy(max_age_seconds=0, max_total_bytes=0, max_count=0, archive_after_seconds=300),
+    )
+    result = service.sweep()
+
+    archive = tmp_path / ".archive" / "older.tar.gz"
+    assert result["archived"] == 1
+    assert not (tmp_path / "older").exists()
+    assert (tmp_path / "recent").exists()
+    with tarfile.open(archive) as handle:
+        assert "older/logs/codex_stdout.txt" in handle.getnames()
+
+    service.policy.max_count = 1
+    service.sweep()
+    assert not archive.exists()
+    assert (tmp_path / "recent").exists()
@@ -0,0 +1,73 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from oni_ai.screenshot_wait import PNG_SIGNATURE, PNG_TRAILER, is_complete_png, wait_for_file_ready
+
+
+PNG_BYTES = PNG_SIGNATURE + b"\x00\x00\x00\x0dIHDR" + b"\x00" * 17 + PNG_TRAILER
+
+
+def _write_in_two_steps(path: Path, delay: float) -> threading.Thread:
+    def writer() -> None:
+        time.sleep(delay)
+        with open(path, "wb") as file:
+            file.write(PNG_BYTES[:20])
+            file.flush()
+            time.sleep(delay)
+            file.write(PNG_BYTES[20:])
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_is_complete_png_checks_signature_and_trailer(tmp_path: Path) -> None:
+    complete = tmp_path / "complete.png"
+    complete.write_bytes(PNG_BYTES)
+    truncated = tmp_path / "truncated.png"
+    truncated.write_bytes(PNG_BYTES[:-4])
+
+    assert is_complete_png(str(complete)) is True
+    assert is_complete_png(str(truncated)) is False
+    assert is_complete_png(str(tmp_path / "missing.png")) is False
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_wait_for_file_ready_wakes_on_close_write(tmp_path: Path) -> None:
+    target = tmp_path / "screenshot.png"
+    writer = _write_in_two_steps(target, 0.1)
+
+    started_at = time.monotonic()
+    ready, method = wait_for_file_ready(str(target), timeout_seconds=3.0, poll_seconds=5.0, watcher="inotify")
+    writer.join(timeout=2)
+
+    assert ready is True
+    assert method == "inotify"
+    assert time.monotonic() - started_at < 2.0
+
+
+def test_wait_for_file_ready_poll_fallback_waits_for_complete_png(tmp_path: Path) -> None:
+    target = tmp_path / "screenshot.png"
+    writer = _write_in_two_steps(target, 0.1)
+
+    ready, method = wait_for_file_ready(str(target), timeout_seconds=3.0, poll_seconds=0.02, watcher="poll")
+    writer.join(timeout=2)
+
+    assert ready is True
+    assert method == "poll"
+    assert is_complete_png(str(target))
+
+
+def test_wait_for_file_ready_times_out_on_truncated_png(tmp_path: Path) -> None:
+    target = tmp_path / "screenshot.png"
+    target.write_bytes(PNG_BYTES[:-4])
+
+    ready, _ = wait_for_file_ready(str(target), timeout_seconds=0.1, poll_seconds=0.02)
+    assert ready is False
+
+    ready, method = wait_for_file_ready(str(target), timeout_seconds=0.0, poll_seconds=0.02, validate_png=False)
+    assert (ready, method) == (True, "immediate")
@@ -0,0 +1,69 @@
+import copy
+import json
+from pathlib import Path
+
+import oni_ai.ai_bridge as ai_bridge
+from oni_ai.state_diff import diff_states
+
+
+EXAMPLE_STATE = Path(__file__).resolve().parents[1] / "examples" / "request_idle" / "state.json"
+
+
+def _example_state() -> dict:
+    return json.loads(EXAMPLE_STATE.read_text(encoding="utf-8"))
+
+
+def test_diff_states_reports_structural_changes() -> None:
+    previous = _example_state()
+    current = copy.deepcopy(previous)
+    current["context"]["cycle"] = 44
+    current["context"]["paused"] = False
+    current["duplicants"][0]["status"]["current_chore"] = "Dig"
+    current["duplicants"][0]["priority"]["dig"] = 9
+    current["duplicants"].append({"id": "1002", "name": "Bubbles", "status": {}})
+    current["priorities"][0]["values"]["build"] = 7
+    current["pending_actions"][0]["status"] = "in_progress"
+    current["pending_actions"].append({"id": "act_002", "type": "build", "priority": 7, "status": "queued"})
+
+    diff = diff_states(previous, current)
+
+    assert diff["cycle_delta"] == 2
+    assert diff["unchanged"] is False
+    assert diff["context"] == {"paused": [True, False]}
+    assert diff["duplicants"]["added"] == [{"id": "1002", "name": "Bubbles"}]
+    assert diff["duplicants"]["chore_changes"] == [{"id": "1001", "name": "Ada", "from": "Idle", "to": "Dig"}]
+    assert diff["duplicants"]["priority_changes"][0]["changes"] == {"dig": [6, 9]}
+    assert diff["priorities"][0]["changes"] == {"build": [5, 7]}
+    assert diff["pending_actions"]["added"][0]["key"] == "act_002"
+    assert diff["pending_actions"]["changed"] == [{"key": "act_001", "changes": {"status": ["queued", "in_progress"]}}]
+    assert diff_states(previous, copy.deepcopy(previous))["unchanged"] is True
+
+
+def test_call_codex_exec_stages_diff_against_previous_request_in_session(monkeypatch, tmp_path: Path) -> None:
+    ai_bridge.reset_runtime_state_for_tests()
+    monkeypatch.setenv("ONI_AI_DECISION_BACKEND", "fake")
+    monkeypatch.setenv("ONI_AI_LIVE_STATE", "0")
+    monkeypatch.setenv("ONI_AI_SCREENSHOT_WAIT_MS", "0")
+    first = {**_example_state(), "request_id": "diff_001", "session_id": "colony-a"}
+    second = copy.deepcopy(first)
+    second["request_id"] = "diff_002"
+    second["context"]["cycle"] = 43
+    other_session = {**copy.deepcopy(first), "request_id": "diff_003", "session_id": "colony-b"}
+
+    try:
+        for payload in (first, second, other_session):
+            request_dir = tmp_path / payload["request_id"]
+            request_dir.mkdir()
+            ai_bridge.call_codex_exec({**payload, "request_dir": str(request_dir)}, request_tag=payload["request_id"])
+    finally:
+        ai_bridge.reset_runtime_state_for_tests()
+
+    assert not (tmp_path / "diff_001" / "state_diff.json").exists()
+    assert not (tmp_path / "diff_003" / "state_diff.json").exists()
+    diff = json.loads((tmp_path / "diff_002" / "state_diff.json").read_text(encoding="utf-8"))
+    assert diff["previous_request_id"] == "diff_001"
+    assert diff["cycle_delta"] == 1
+    assert diff["unchanged"] is True
+
+    prompt = ai_bridge.build_prompt(second, False, state_diff=diff)
+    assert "./state_diff.json compares this state with the previous request diff_001" in prompt
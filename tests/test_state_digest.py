@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from oni_ai.ai_bridge import build_prompt
+from oni_ai.state_digest import build_state_digest, encoded_size
+
+
+EXAMPLE_STATE = Path(__file__).resolve().parents[1] / "examples" / "request_idle" / "state.json"
+
+
+def _large_state() -> dict:
+    state = json.loads(EXAMPLE_STATE.read_text(encoding="utf-8"))
+    state["duplicants"] = [
+        {
+            "id": str(index),
+            "name": f"Dupe{index}",
+            "status": {"current_chore": "Idle" if index % 4 == 0 else "Dig", "stress": float(index)},
+            "priority": {"dig": index % 9, "build": 5, "life_support": 8},
+            "skills": ["ImprovedDigging1"],
+        }
+        for index in range(120)
+    ]
+    state["pending_actions"] = [
+        {"id": f"act_{index:03d}", "type": "dig" if index % 2 else "build", "priority": index % 9, "status": "queued"}
+        for index in range(400)
+    ]
+    return state
+
+
+def test_state_digest_aggregates_and_drops_static_fields() -> None:
+    state = json.loads(EXAMPLE_STATE.read_text(encoding="utf-8"))
+
+    digest = build_state_digest(state)
+
+    assert digest["context"] == {"cycle": 42, "time_in_cycles": 42.52, "paused": True, "current_speed": 1}
+    assert digest["duplicants"]["idle"] == ["Ada"]
+    assert digest["duplicants"]["members"][0]["top_priorities"] == {"life_support": 8, "dig": 6, "build": 5}
+    assert digest["pending_actions"]["urgent"][0]["id"] == "act_001"
+    assert digest["priorities"]["dig"] == {"min": 6.0, "mean": 6.0, "max": 6.0}
+    assert digest["world"]["surrounding_elements"] == {"Oxygen": 1, "Sandstone": 1}
+    assert digest["omitted"] == ["assemblies", "scenes", "singletons", "runtime_config"]
+    assert "truncated" not in digest
+
+
+def test_state_digest_respects_byte_budget_and_keeps_most_urgent() -> None:
+    state = _large_state()
+
+    digest = build_state_digest(state, max_bytes=2048, top_n=20)
+
+    assert encoded_size(digest) <= 2048 < encoded_size(state)
+    assert digest["truncated"] is True
+    assert digest["duplicants"]["count"] == 120
+    assert digest["duplicants"]["stats"]["stress"] == {"min": 0.0, "mean": 59.5, "max": 119.0}
+    assert digest["duplicants"]["members"][0]["name"] == "Dupe119"
+    assert digest["pending_actions"]["count"] == 400
+    assert all(item["priority"] == 8 for item in digest["pending_actions"]["urgent"])
+
+
+def test_build_prompt_references_state_digest() -> None:
+    prompt = build_prompt({"api_base_url": "http://127.0.0.1:8766"}, False, has_state_digest=True)
+
+    assert "./state_digest.json is a compact digest" in prompt
+    assert "state_digest.json" not in build_prompt({}, False)